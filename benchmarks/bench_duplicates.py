@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate comment detection (duplicates.DuplicateIndex) on synthetic comments.
+
+Organic comments are random sentences over a few thousand made-up words,
+plus short stock replies; a share of the comments are spam waves, each a
+template copied with small edits (fake_graph.mutate). For every size the
+index is built from scratch; time per comment should stay flat as the
+corpus grows. Precision is the share of clustered comments that are spam
+of the cluster's majority wave, recall the share of spam comments found.
+
+    python benchmarks/bench_duplicates.py --sizes 25000 50000 100000 200000
+"""
+
+import argparse
+import random
+import sys
+import os
+import time
+from collections import Counter
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_graph import mutate
+from duplicates import DEFAULT_THRESHOLD, DuplicateIndex
+
+SYLLABLES = ["ma", "pe", "ri", "to", "la", "ne", "so", "cu", "ba", "di", "go", "fe", "li", "ra", "mo",
+             "sa", "te", "vi", "ca", "no", "es", "tar", "con", "pro", "que"]
+STOCK_REPLIES = ["Gracias!", "Me encanta 😍", "genial", "Qué rico", "Precio?", "info por favor", "👏👏👏"]
+
+
+def corpus(size: int, spam_share: float, waves: int, seed: int) -> tuple[list[str], list[int | None]]:
+    """Comments and, for each one, the spam wave it belongs to (None for organic comments)."""
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))) for _ in range(3000)]
+    templates = [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(10, 25))) for _ in range(waves)]
+    texts, labels = [], []
+    for _ in range(size):
+        if rng.random() < spam_share:
+            wave = rng.randrange(waves)
+            texts.append(mutate(templates[wave], rng))
+            labels.append(wave)
+        elif rng.random() < 0.15:
+            texts.append(rng.choice(STOCK_REPLIES))
+            labels.append(None)
+        else:
+            texts.append(" ".join(rng.choice(vocabulary) for _ in range(rng.randint(3, 40))))
+            labels.append(None)
+    return texts, labels
+
+
+def measure(texts: list[str], labels: list[int | None], threshold: float, min_size: int) -> dict[str, float]:
+    start = time.perf_counter()
+    index = DuplicateIndex(threshold)
+    positions = [index.add(text) for text in texts]
+    clusters = index.clusters(min_size)
+    elapsed = time.perf_counter() - start
+
+    label_at = {p: labels[i] for i, p in enumerate(positions) if p is not None}
+    clustered = correct = 0
+    for members in clusters:
+        waves = Counter(label_at[p] for p in members)
+        majority, count = waves.most_common(1)[0]
+        clustered += len(members)
+        correct += count if majority is not None else 0
+    spam = sum(label is not None for label in labels)
+    return {
+        "seconds": elapsed,
+        "us_per_comment": elapsed / len(texts) * 1e6,
+        "indexed": len(index),
+        "clusters": len(clusters),
+        "precision": correct / clustered if clustered else 1.0,
+        "recall": correct / spam if spam else 1.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[25000, 50000, 100000, 200000])
+    parser.add_argument("--spam-share", type=float, default=0.05)
+    parser.add_argument("--waves", type=int, default=40)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--min-cluster-size", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'comments':>9}{'indexed':>9}{'seconds':>9}{'us/comment':>12}{'clusters':>10}{'precision':>11}{'recall':>8}")
+    for size in args.sizes:
+        texts, labels = corpus(size, args.spam_share, args.waves, args.seed)
+        r = measure(texts, labels, args.threshold, args.min_cluster_size)
+        print(f"{size:>9}{r['indexed']:>9}{r['seconds']:>9.2f}{r['us_per_comment']:>12.1f}{r['clusters']:>10}"
+              f"{r['precision']:>11.1%}{r['recall']:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
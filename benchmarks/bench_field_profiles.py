@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Payload size of each field profile for get_my_last_post / get_page_posts.
+
+Graph responses are simulated from a representative post, so the numbers are
+reproducible without a token: a field is included only if it was requested,
+and summary edges carry their first page of data unless limit(0) is used.
+"""
+
+import json
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from capabilities import field_base_name
+from fields import PROFILES
+
+
+def _edge(total: int, items: int) -> dict:
+    return {
+        "data": [{"id": f"{1000000000000000 + i}", "name": f"Usuario de Prueba {i}"} for i in range(items)],
+        "paging": {"cursors": {"before": "QVFIUm" * 8, "after": "QVFIUn" * 8}, "next": "https://graph.facebook.com/v22.0/" + "x" * 120},
+        "summary": {"total_count": total, "can_like": True, "has_liked": False},
+    }
+
+
+SAMPLE_POST = {
+    "id": "123456789012345_987654321098765",
+    "message": "Receta de pizza casera paso a paso 🍕 " * 8,
+    "created_time": "2025-06-01T18:30:00+0000",
+    "updated_time": "2025-06-01T19:02:11+0000",
+    "permalink_url": "https://www.facebook.com/123456789012345/posts/987654321098765",
+    "full_picture": "https://scontent.xx.fbcdn.net/v/t39.30808-6/" + "p" * 180,
+    "picture": "https://scontent.xx.fbcdn.net/v/t39.30808-6/s130x130/" + "p" * 180,
+    "status_type": "added_photos",
+    "story": "Mi Página updated their status.",
+    "place": {"id": "110", "name": "Madrid, Spain", "location": {"city": "Madrid", "country": "Spain"}},
+    "privacy": {"value": "EVERYONE", "description": "Public", "friends": "", "allow": "", "deny": ""},
+    "shares": {"count": 42},
+    "likes": _edge(311, 25),
+    "comments": _edge(57, 25),
+    "reactions": _edge(402, 25),
+}
+
+
+def simulate_graph_response(fields: list[str]) -> dict:
+    """Build the response Graph would send for `fields`."""
+    post = {}
+    for field in fields:
+        name = field_base_name(field)
+        if name not in SAMPLE_POST:
+            continue
+        value = SAMPLE_POST[name]
+        if ".limit(0)" in field:
+            value = {"data": [], "summary": value["summary"]}
+        post[name] = value
+    return {"data": [post]}
+
+
+def main():
+    full_size = len(json.dumps(simulate_graph_response(PROFILES["post"]["full"])).encode())
+    unbounded = [f.replace(".limit(0)", "") for f in PROFILES["post"]["full"]]
+    before = len(json.dumps(simulate_graph_response(unbounded)).encode())
+
+    print(f"{'profile':<28}{'fields':>8}{'bytes':>10}{'vs before':>12}")
+    print(f"{'full (before, no limit(0))':<28}{len(unbounded):>8}{before:>10}{'100.0%':>12}")
+    for name, fields in PROFILES["post"].items():
+        size = len(json.dumps(simulate_graph_response(fields)).encode())
+        print(f"{name:<28}{len(fields):>8}{size:>10}{size / before:>11.1%}")
+    print(f"\nfull profile saves {before - full_size} bytes per post by using limit(0) on summary edges")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+End-to-end publish time of local phone photos, with and without preprocessing.
+
+Large noisy JPEGs with EXIF (like 10-20 MB phone photos) are written to a
+temporary folder and posted with post_media_to_facebook to the fake Graph
+server, which simulates the client's upload bandwidth. Variants: photos
+uploaded as they are, preprocessed in one process, and preprocessed on a
+process pool.
+
+    python benchmarks/bench_images.py --photos 6 --upload-mbps 20
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import facebook_api
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+from imaging import ImagePreprocessor
+
+
+def phone_photos(folder: str, count: int, size: tuple[int, int]) -> list[str]:
+    from PIL import Image
+    paths = []
+    for i in range(count):
+        image = Image.effect_noise(size, 20 + i).convert("RGB")
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        path = os.path.join(folder, f"IMG_{i:04}.jpg")
+        image.save(path, "JPEG", quality=95, exif=exif)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--photos", type=int, default=6)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--upload-mbps", type=float, default=20.0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    variants = {
+        "original": ImagePreprocessor(False),
+        "preprocess, 1 process": ImagePreprocessor(True, workers=1),
+    }
+    if args.workers > 1:
+        variants[f"preprocess, {args.workers} processes"] = ImagePreprocessor(True, workers=args.workers)
+    with tempfile.TemporaryDirectory() as folder, \
+            FakeGraphServer(FakeGraphConfig(upload_mbps=args.upload_mbps)) as server:
+        paths = phone_photos(folder, args.photos, (args.width, args.height))
+        facebook_api.GRAPH_API_BASE_URL = server.base_url
+        facebook_api.PAGE_ID = PAGE_ID
+        api = facebook_api.FacebookAPI()
+        # Start the pools first, so their start-up is not counted
+        for images in variants.values():
+            images.prepare(paths[:2])
+
+        print(f"{args.photos} photos of {args.width}x{args.height}, upload {args.upload_mbps:g} Mbit/s")
+        print(f"{'variant':<26}{'uploaded MB':>13}{'saved MB':>10}{'preprocess s':>14}{'publish s':>11}")
+        for name, images in variants.items():
+            api.images = images
+            start = time.perf_counter()
+            result = api.post_media_to_facebook(paths, "fotos de la receta")
+            elapsed = time.perf_counter() - start
+            report = result["preprocessing"]
+            print(f"{name:<26}{report['bytes'] / 1e6:>13.1f}{report['bytes_saved'] / 1e6:>10.1f}"
+                  f"{report['seconds']:>14.2f}{elapsed:>11.2f}")
+            images.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Decode time and memory of large Graph list responses: plain dicts vs slotted models.
+
+Pages of comments and posts are generated from the fake Graph data and
+serialized once; each variant then decodes the same bytes. "retained" is the
+memory held by the decoded page (tracemalloc), "boundary" is the cost of
+converting models back to dicts for an MCP result.
+
+    python benchmarks/bench_models.py --comments 20000 --posts 2000
+"""
+
+import argparse
+import gc
+import json
+import statistics
+import sys
+import os
+import time
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_graph import FakeGraphData
+from models import Comment, Post, decode_page, loads, orjson, to_plain
+
+# Bookkeeping keys of the fake objects that Graph does not return
+INTERNAL_KEYS = {"kind", "insights"}
+
+
+def fixture_pages(comments: int, posts: int) -> dict[str, tuple[bytes, type]]:
+    data = FakeGraphData(posts=max(posts, 1), comments_per_post=max(2 * comments // max(posts, 1), 2))
+    objects = [{k: v for k, v in o.items() if k not in INTERNAL_KEYS} for o in data.objects.values()]
+    pages = {
+        "comments": ([o for o in objects if o["id"].count("_") == 1 and "from" in o][:comments], Comment),
+        "posts": ([o for o in objects if "status_type" in o][:posts], Post),
+    }
+    return {name: (json.dumps({"data": items}).encode(), model) for name, (items, model) in pages.items()}
+
+
+def _time(fn, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def _retained(fn) -> int:
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def measure(body: bytes, model: type, runs: int) -> dict[str, dict[str, float]]:
+    variants = {
+        "dicts (json)": lambda: json.loads(body),
+        "models": lambda: decode_page(loads(body), model),
+    }
+    if orjson is not None:
+        variants["dicts (orjson)"] = lambda: orjson.loads(body)
+    results = {name: {"decode_ms": _time(fn, runs), "retained_bytes": _retained(fn)} for name, fn in variants.items()}
+    decoded = decode_page(loads(body), model)
+    results["models"]["boundary_ms"] = _time(lambda: to_plain(decoded), runs)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--comments", type=int, default=20000)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"parser: {'orjson' if orjson is not None else 'json (orjson not installed)'}")
+    print(f"{'page':<10}{'variant':<16}{'items':>8}{'decode ms':>11}{'boundary ms':>13}{'retained MB':>13}{'vs dicts':>10}")
+    for name, (body, model) in fixture_pages(args.comments, args.posts).items():
+        items = len(json.loads(body)["data"])
+        results = measure(body, model, args.runs)
+        baseline = results["dicts (json)"]["retained_bytes"]
+        for variant, r in results.items():
+            boundary = f"{r['boundary_ms']:.1f}" if "boundary_ms" in r else "-"
+            print(f"{name:<10}{variant:<16}{items:>8}{r['decode_ms']:>11.1f}{boundary:>13}"
+                  f"{r['retained_bytes'] / 1e6:>13.2f}{r['retained_bytes'] / baseline:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Cold start of the stdio server: time-to-initialize and time-to-first-tool-result.
+
+Launches `server.py` as a fresh subprocess the way MCP clients do, speaking
+JSON-RPC over stdin/stdout. The first tool call is answered by the local fake
+Graph API, so no token is needed. Exits 1 when the median of either
+measurement is over its target.
+
+    python benchmarks/bench_startup.py --runs 10 --initialize-target-ms 1200
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+
+
+def _send(process: subprocess.Popen, message: dict) -> None:
+    process.stdin.write(json.dumps(message) + "\n")
+    process.stdin.flush()
+
+
+def _receive(process: subprocess.Popen, request_id: int) -> dict:
+    while True:
+        line = process.stdout.readline()
+        if not line:
+            raise RuntimeError(f"Server exited before answering request {request_id}")
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            return message
+
+
+def measure(base_url: str, tool: str, arguments: dict) -> tuple[float, float]:
+    """Start the server once; return (time_to_initialize_ms, time_to_first_tool_result_ms)."""
+    env = {k: v for k, v in os.environ.items() if not k.startswith("FACEBOOK_")}
+    env.update({"FACEBOOK_GRAPH_API_BASE_URL": base_url, "FACEBOOK_PAGE_ID": PAGE_ID, "FACEBOOK_ACCESS_TOKEN": "fake-token"})
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, "server.py")], cwd=ROOT, env=env, text=True,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        _send(process, {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+            "protocolVersion": "2025-06-18", "capabilities": {}, "clientInfo": {"name": "bench_startup", "version": "1"},
+        }})
+        _receive(process, 1)
+        initialized = time.perf_counter()
+        _send(process, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        _send(process, {"jsonrpc": "2.0", "id": 2, "method": "tools/call", "params": {"name": tool, "arguments": arguments}})
+        result = _receive(process, 2)
+        first_result = time.perf_counter()
+        if "error" in result or result["result"].get("isError"):
+            raise RuntimeError(f"{tool} failed: {result}")
+    finally:
+        process.stdin.close()
+        process.wait(timeout=10)
+    return (initialized - start) * 1000, (first_result - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start of the stdio MCP server")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tool", default="get_page_posts")
+    parser.add_argument("--initialize-target-ms", type=float, default=1200.0)
+    parser.add_argument("--first-result-target-ms", type=float, default=1500.0)
+    args = parser.parse_args()
+
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        samples = [measure(server.base_url, args.tool, {}) for _ in range(args.runs)]
+
+    initialize = statistics.median(s[0] for s in samples)
+    first_result = statistics.median(s[1] for s in samples)
+    print(f"time-to-initialize          median {initialize:7.1f} ms  (target {args.initialize_target_ms:g} ms)")
+    print(f"time-to-first-tool-result   median {first_result:7.1f} ms  (target {args.first_result_target_ms:g} ms)")
+    if initialize > args.initialize_target_ms or first_result > args.first_result_target_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,689 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Facebook Graph API, for offline tests and benchmarks.
+
+Serves a deterministic page (posts, comments, photos, videos, insights) with
+configurable latency, error injection, cursor pagination and rate-limit
+usage headers. Point the server at it with FACEBOOK_GRAPH_API_BASE_URL.
+
+    python benchmarks/fake_graph.py --port 8765 --latency-ms 120
+"""
+
+import argparse
+import calendar
+import email.policy
+import json
+import mimetypes
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+
+PAGE_ID = "1000000000000"
+
+# Post attachment fields removed in Graph v3.3
+DEPRECATED_POST_FIELDS = {"caption", "description", "link", "name", "object_id", "source", "type"}
+
+# Valid fields that are simply absent on the fake objects
+OPTIONAL_FIELDS = {"parent", "place", "attachment", "message_tags"}
+
+INSIGHT_METRICS = {
+    "post_impressions", "post_impressions_unique", "post_impressions_paid", "post_impressions_organic",
+    "post_clicks", "post_reactions_like_total", "post_reactions_love_total", "post_reactions_wow_total",
+    "post_reactions_haha_total", "post_reactions_sorry_total", "post_reactions_anger_total",
+}
+
+# Reaction type -> insights metric holding its count
+REACTION_TYPE_METRICS = {
+    "LIKE": "post_reactions_like_total", "LOVE": "post_reactions_love_total", "WOW": "post_reactions_wow_total",
+    "HAHA": "post_reactions_haha_total", "SORRY": "post_reactions_sorry_total", "ANGRY": "post_reactions_anger_total",
+}
+
+WORDS = ["pizza", "receta", "casera", "oferta", "pedido", "envío", "gracias", "genial", "problem", "bad",
+         "love", "great", "tutorial", "video", "foto", "precio", "tienda", "nuevo", "hoy", "mañana"]
+
+# Messages of the spam waves, each copied with small edits onto many posts
+SPAM_TEMPLATES = [
+    "Gana 500€ al día desde casa sin experiencia, escríbeme por WhatsApp y te explico cómo",
+    "Oferta exclusiva: iPhone 15 gratis para los primeros 100, entra en premios-ya.example y reclama el tuyo",
+    "Tu página ha sido reportada por infringir las normas, verifica tu cuenta aquí: soporte-pagina.example/verify",
+    "Sigue mi perfil para más recetas caseras como esta, publico trucos de cocina todos los días",
+]
+
+
+@dataclass
+class FakeGraphConfig:
+    """Behaviour knobs of the fake server."""
+
+    latency_ms: float = 0.0         # Base latency added to every request
+    jitter_ms: float = 0.0          # Uniform random extra latency
+    slow_rate: float = 0.0          # Fraction of requests that hit the slow tail
+    slow_ms: float = 0.0            # Extra latency of slow-tail requests
+    error_rate: float = 0.0         # Fraction of requests answered with a transient error
+    upload_mbps: float = 0.0        # Client upload bandwidth for request bodies (0 = unlimited)
+    rate_limit_calls: int = 4800    # Calls per window that count as 100% usage
+    rate_limit_window: float = 3600.0
+    unsupported_endpoints: set[str] = field(default_factory=lambda: {"stories"})
+    seed: int = 1234
+
+
+class FakeGraphData:
+    """Deterministic page content."""
+
+    def __init__(self, posts: int = 60, comments_per_post: int = 40, photos: int = 80, videos: int = 20, seed: int = 1234):
+        rng = random.Random(seed)
+        start = 1_735_689_600  # 2025-01-01T00:00:00Z
+        self.objects: dict[str, dict[str, Any]] = {}
+        self.edges: dict[tuple[str, str], list[str]] = {}
+        self.next_id = 9_000_000
+
+        self.page = {"id": PAGE_ID, "name": "Página de Prueba", "fan_count": 15234, "kind": "page"}
+        self.objects[PAGE_ID] = self.page
+
+        post_ids = []
+        for i in range(posts):
+            post_id = f"{PAGE_ID}_{100000 + i}"
+            created = start + (posts - i) * 3 * 3600
+            comment_ids = []
+            for j in range(rng.randint(comments_per_post // 2, comments_per_post * 3 // 2)):
+                comment_id = f"{100000 + i}_{200000 + j}"
+                author = rng.randint(1, 300)
+                self.objects[comment_id] = {
+                    "kind": "comment", "id": comment_id,
+                    "message": " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 25))),
+                    "from": {"id": str(5000 + author), "name": f"Usuario {author}"},
+                    "created_time": _iso(created + 60 * (j + 1)),
+                    "like_count": rng.randint(0, 30), "comment_count": rng.randint(0, 4),
+                    "is_hidden": False,
+                    "permalink_url": f"https://www.facebook.com/{PAGE_ID}/posts/{100000 + i}?comment_id={200000 + j}",
+                }
+                comment_ids.append(comment_id)
+            self.edges[(post_id, "comments")] = comment_ids
+            self.objects[post_id] = {
+                "kind": "post", "id": post_id,
+                "message": " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 80))),
+                "created_time": _iso(created), "updated_time": _iso(created + 600),
+                "permalink_url": f"https://www.facebook.com/{PAGE_ID}/posts/{100000 + i}",
+                "full_picture": f"https://scontent.example/{post_id}.jpg",
+                "picture": f"https://scontent.example/{post_id}_s.jpg",
+                "status_type": "added_photos", "story": "", "privacy": {"value": "EVERYONE"},
+                "shares": {"count": rng.randint(0, 200)},
+                "likes": rng.randint(0, 2000), "reactions": rng.randint(0, 2500),
+                "insights": {m: rng.randint(0, 50000) for m in INSIGHT_METRICS},
+            }
+            post_ids.append(post_id)
+        self.edges[(PAGE_ID, "posts")] = post_ids
+        self.edges[(PAGE_ID, "feed")] = post_ids
+        self.edges[(PAGE_ID, "scheduled_posts")] = []
+
+        for kind, count in (("photos", photos), ("videos", videos)):
+            ids = []
+            for i in range(count):
+                media_id = f"{kind[0]}{300000 + i}"
+                created = start + (count - i) * 5 * 3600 + (0 if kind == "photos" else 1800)
+                media = {
+                    "kind": kind[:-1], "id": media_id, "created_time": _iso(created),
+                    "permalink_url": f"https://www.facebook.com/{media_id}",
+                    "source": f"https://scontent.example/{media_id}",
+                }
+                if kind == "photos":
+                    media["images"] = [{"source": f"https://scontent.example/{media_id}_720.jpg", "width": 720}]
+                    media["name"] = " ".join(rng.choice(WORDS) for _ in range(8))
+                else:
+                    media["picture"] = f"https://scontent.example/{media_id}_thumb.jpg"
+                    media["description"] = " ".join(rng.choice(WORDS) for _ in range(8))
+                self.objects[media_id] = media
+                ids.append(media_id)
+            self.edges[(PAGE_ID, kind)] = ids
+
+        # Reply threads: every comment has `comment_count` replies, and a few
+        # replies have one of their own. A separate generator keeps the rest
+        # of the data the same as before replies existed.
+        replies_rng = random.Random(seed + 1)
+        parents = [c for c in self.objects.values() if c["kind"] == "comment"]
+        depth = 1
+        while parents:
+            depth += 1
+            nested = []
+            for parent in parents:
+                reply_ids = []
+                for k in range(parent["comment_count"]):
+                    reply_id = f"{parent['id']}_{k}"
+                    author = replies_rng.randint(1, 300)
+                    self.objects[reply_id] = {
+                        "kind": "comment", "id": reply_id,
+                        "message": " ".join(replies_rng.choice(WORDS) for _ in range(replies_rng.randint(2, 12))),
+                        "from": {"id": str(5000 + author), "name": f"Usuario {author}"},
+                        "created_time": _iso(_timestamp(parent["created_time"]) + 120 * (k + 1)),
+                        "like_count": replies_rng.randint(0, 5),
+                        "comment_count": 1 if depth == 2 and replies_rng.random() < 0.1 else 0,
+                        "is_hidden": False, "parent": {"id": parent["id"]},
+                        "permalink_url": f"{parent['permalink_url']}&reply_comment_id={k}",
+                    }
+                    reply_ids.append(reply_id)
+                    nested.append(self.objects[reply_id])
+                self.edges[(parent["id"], "comments")] = reply_ids
+            parents = [r for r in nested if r["comment_count"]]
+
+        # Spam waves: each template posted, with small edits, by different
+        # accounts on many posts. Comment IDs of wave w are <post>_29wnnn.
+        spam_rng = random.Random(seed + 2)
+        self.spam_waves: list[list[str]] = []
+        for w, template in enumerate(SPAM_TEMPLATES):
+            wave = []
+            for n in range(spam_rng.randint(12, 30)):
+                i = spam_rng.randrange(posts)
+                post_id = post_ids[i]
+                comment_id = f"{100000 + i}_{290000 + w * 1000 + n}"
+                account = spam_rng.randint(1, 500)
+                self.objects[comment_id] = {
+                    "kind": "comment", "id": comment_id, "message": mutate(template, spam_rng),
+                    "from": {"id": str(8000 + account), "name": f"Cuenta {account}"},
+                    "created_time": _iso(_timestamp(self.objects[post_id]["created_time"]) + spam_rng.randint(60, 7200)),
+                    "like_count": 0, "comment_count": 0, "is_hidden": False,
+                    "permalink_url": f"https://www.facebook.com/{PAGE_ID}/posts/{100000 + i}?comment_id={290000 + w * 1000 + n}",
+                }
+                self.edges[(post_id, "comments")].append(comment_id)
+                wave.append(comment_id)
+            self.spam_waves.append(wave)
+
+    def create(self, kind: str, parent: str, edge: str, fields: dict[str, Any]) -> str:
+        self.next_id += 1
+        object_id = f"{parent}_{self.next_id}" if kind == "post" else str(self.next_id)
+        self.objects[object_id] = {"kind": kind, "id": object_id, "created_time": _iso(time.time()), **fields}
+        self.edges.setdefault((parent, edge), []).insert(0, object_id)
+        if kind == "post":
+            # New posts start with an empty comments edge, as on Graph
+            self.edges[(object_id, "comments")] = []
+        return object_id
+
+
+@dataclass
+class FakeGraphStats:
+    """Traffic seen by the fake server."""
+
+    calls: int = 0
+    errors: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    endpoints: dict[str, int] = field(default_factory=dict)
+
+
+class FakeGraphServer:
+    """Threaded HTTP server speaking a subset of the Graph API.
+
+    Usage:
+        with FakeGraphServer(FakeGraphConfig(latency_ms=50)) as graph:
+            os.environ["FACEBOOK_GRAPH_API_BASE_URL"] = graph.base_url
+    """
+
+    def __init__(self, config: FakeGraphConfig = None, data: FakeGraphData = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeGraphConfig()
+        self.data = data or FakeGraphData(seed=self.config.seed)
+        self.stats = FakeGraphStats()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_calls = 0
+        # Files served by the fake media host: name -> (content type, bytes)
+        self.media: dict[str, tuple[str, int]] = {}
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v22.0"
+
+    def media_url(self, name: str, content_type: str = None, size: int = 2_000_000) -> str:
+        """URL of a file on the fake media host, which answers HEAD with its type and size."""
+        self.media[name] = (content_type or mimetypes.guess_type(name)[0] or "application/octet-stream", size)
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/media/{name}"
+
+    def start(self) -> "FakeGraphServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeGraphServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def reset_stats(self) -> FakeGraphStats:
+        """Return the stats collected so far and start counting from zero."""
+        with self._lock:
+            stats, self.stats = self.stats, FakeGraphStats()
+        return stats
+
+    # Request handling
+
+    def _delay(self) -> tuple[float, bool]:
+        with self._lock:
+            delay = self.config.latency_ms + self._rng.uniform(0, self.config.jitter_ms)
+            if self.config.slow_rate and self._rng.random() < self.config.slow_rate:
+                delay += self.config.slow_ms
+            fail = self.config.error_rate and self._rng.random() < self.config.error_rate
+        return delay / 1000, bool(fail)
+
+    def _usage_headers(self) -> dict[str, str]:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start > self.config.rate_limit_window:
+                self._window_start, self._window_calls = now, 0
+            self._window_calls += 1
+            percent = min(100, round(100 * self._window_calls / self.config.rate_limit_calls))
+        usage = {"call_count": percent, "total_cputime": percent // 2, "total_time": percent // 2}
+        return {
+            "X-App-Usage": json.dumps(usage),
+            "X-Business-Use-Case-Usage": json.dumps({PAGE_ID: [{"type": "pages", **usage, "estimated_time_to_regain_access": 0}]}),
+        }
+
+    def handle(self, method: str, path: str, query: dict[str, str], body: dict[str, Any], base_url: str) -> tuple[int, dict[str, Any]]:
+        delay, fail = self._delay()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            return 500, _error(2, "An unexpected error has occurred. Please retry your request later.", transient=True)
+
+        return self._route(method, path, query, body, base_url)
+
+    def _route(self, method: str, path: str, query: dict[str, str], body: dict[str, Any], base_url: str) -> tuple[int, dict[str, Any]]:
+        parts = [p for p in path.split("/") if p]
+        if parts and re.fullmatch(r"v\d+\.\d+", parts[0]):
+            parts = parts[1:]
+        if not parts and method == "POST" and "batch" in {**query, **body}:
+            return self._batch(json.loads({**query, **body}["batch"]), base_url)
+        if not parts and method == "GET" and "ids" in query:
+            return self._multi_ids(query)
+        if not parts:
+            return 400, _error(100, "Unsupported request")
+        if parts == ["me", "messages"] and method == "POST":
+            return 200, {"recipient_id": body.get("recipient", {}).get("id"), "message_id": f"m_{self.data.create('message', 'me', 'messages', body)}"}
+
+        object_id = parts[0]
+        edge = parts[1] if len(parts) > 1 else None
+        if edge in self.config.unsupported_endpoints:
+            return 400, _error(10, f"(#10) This endpoint requires the 'pages_read_user_content' permission to access '{edge}'")
+        obj = self.data.objects.get(object_id)
+        if obj is None:
+            return 400, _error(100, f"Unsupported get request. Object with ID '{object_id}' does not exist", subcode=33)
+
+        if method == "DELETE" and edge is None:
+            self.data.objects.pop(object_id, None)
+            return 200, {"success": True}
+        if method == "POST":
+            return self._handle_post(obj, edge, {**query, **body})
+        if edge == "insights":
+            return self._insights(obj, query)
+        if edge is not None:
+            return self._edge(object_id, edge, query, base_url + path)
+        return self._select(obj, query.get("fields", "id"))
+
+    def _batch(self, operations: list[dict[str, Any]], base_url: str) -> tuple[int, Any]:
+        """Graph batch request: every operation is routed as its own request, in one round trip."""
+        if len(operations) > 50:
+            return 400, _error(100, "(#100) Too many requests in batch message. Maximum batch size is 50")
+        responses = []
+        named: dict[str, tuple[int, Any]] = {}
+        for op in operations:
+            try:
+                relative_url = _BATCH_REFERENCE.sub(lambda m: _batch_result(named, m.group(1), m.group(2)), op["relative_url"])
+                raw_body = _BATCH_REFERENCE.sub(lambda m: _batch_result(named, m.group(1), m.group(2)), op.get("body", ""))
+                if op.get("depends_on") and named.get(op["depends_on"], (400,))[0] != 200:
+                    raise LookupError(op["depends_on"])
+            except LookupError as e:
+                status, payload = 400, _error(100, f"(#100) Batch operation depends on a failed or unknown operation: {e}")
+            else:
+                relative = urlsplit(relative_url)
+                query = {k: v[-1] for k, v in parse_qs(relative.query).items()}
+                body = {k: v[-1] for k, v in parse_qs(raw_body).items()}
+                status, payload = self._route(op["method"].upper(), "/" + relative.path.lstrip("/"), query, body, base_url)
+            if op.get("name"):
+                named[op["name"]] = (status, payload)
+                if status == 200 and op.get("omit_response_on_success", True):
+                    # Graph leaves out the responses of named operations unless asked
+                    responses.append(None)
+                    continue
+            responses.append({"code": status, "body": json.dumps(payload, ensure_ascii=False)})
+        return 200, responses
+
+    def _multi_ids(self, query: dict[str, str]) -> tuple[int, dict[str, Any]]:
+        """GET /?ids=a,b,c: several objects in one request, keyed by ID."""
+        ids = [i for i in query["ids"].split(",") if i]
+        if len(ids) > 50:
+            return 400, _error(100, "(#100) Too many IDs. Maximum: 50")
+        missing = [i for i in ids if i not in self.data.objects]
+        if missing:
+            return 400, _error(100, f"(#100) Some of the aliases you requested do not exist: {','.join(missing)}")
+        result = {}
+        for object_id in ids:
+            status, item = self._select(self.data.objects[object_id], query.get("fields", "id"))
+            if status != 200:
+                return status, item
+            result[object_id] = item
+        return 200, result
+
+    def _handle_post(self, obj: dict[str, Any], edge: str | None, params: dict[str, Any]) -> tuple[int, dict[str, Any]]:
+        if edge == "feed" and "scheduled_publish_time" in params:
+            when = int(params["scheduled_publish_time"])
+            if not time.time() + 600 <= when <= time.time() + 75 * 86400:
+                return 400, _error(100, "(#100) The specified scheduled publish time is invalid.")
+            fields = {k: v for k, v in params.items() if k not in ("access_token", "published", "scheduled_publish_time")}
+            new_id = self.data.create("post", obj["id"], "scheduled_posts", {**fields, "scheduled_publish_time": when, "is_published": False})
+            return 200, {"id": new_id}
+        if edge is None:
+            obj.update({k: v for k, v in params.items() if k != "access_token"})
+            return 200, {"success": True}
+        kind = {"feed": "post", "photos": "photo", "videos": "video", "comments": "comment"}.get(edge)
+        if kind is None:
+            return 400, _error(100, f"Unsupported post request to edge '{edge}'")
+        new_id = self.data.create(kind, obj["id"], edge, {k: v for k, v in params.items() if k != "access_token"})
+        if kind == "photo":
+            return 200, {"id": new_id, "post_id": f"{PAGE_ID}_{new_id}"}
+        return 200, {"id": new_id}
+
+    def _edge(self, object_id: str, edge: str, query: dict[str, str], url: str) -> tuple[int, dict[str, Any]]:
+        ids = self.data.edges.get((object_id, edge))
+        if ids is None:
+            return 400, _error(100, f"(#100) Tried accessing nonexisting field ({edge})")
+        ids = [i for i in ids if i in self.data.objects]  # skip deleted objects
+        if "since" in query or "until" in query:
+            since, until = int(query.get("since", 0)), int(query.get("until", 2 ** 40))
+            ids = [i for i in ids if since <= _timestamp(self.data.objects[i].get("created_time")) <= until]
+        limit = int(query.get("limit", 25))
+        offset = int(query.get("after", 0))
+        items = []
+        for item_id in ids[offset:offset + limit]:
+            status, item = self._select(self.data.objects[item_id], query.get("fields", "id"))
+            if status != 200:
+                return status, item
+            items.append(item)
+        page: dict[str, Any] = {"data": items}
+        if items:
+            end = offset + len(items)
+            page["paging"] = {"cursors": {"before": str(offset), "after": str(end)}}
+            if end < len(ids):
+                page["paging"]["next"] = f"{url}?{urlencode({**query, 'after': str(end)})}"
+        return 200, page
+
+    def _select(self, obj: dict[str, Any], fields: str) -> tuple[int, dict[str, Any]]:
+        result: dict[str, Any] = {}
+        for requested in split_fields(fields):
+            name = re.split(r"[.{]", requested, maxsplit=1)[0]
+            alias = re.search(r"\.as\((\w+)\)", requested)
+            if obj["kind"] == "post" and name in DEPRECATED_POST_FIELDS:
+                return 400, _error(12, "(#12) deprecate_post_aggregated_fields_for_attachement is deprecated for versions v3.3 and higher")
+            reaction_type = re.search(r"\.type\((\w+)\)", requested)
+            if "{" in requested and (obj["id"], name) in self.data.edges:
+                status, edge = self._nested_edge(obj["id"], name, requested)
+                if status != 200:
+                    return status, edge
+                result[alias.group(1) if alias else name] = edge
+            elif name == "reactions" and reaction_type and obj["kind"] == "post":
+                metric = REACTION_TYPE_METRICS.get(reaction_type.group(1))
+                if metric is None:
+                    return 400, _error(100, f"(#100) type must be one of the following values: {', '.join(REACTION_TYPE_METRICS)}")
+                result[alias.group(1) if alias else name] = _summary_edge(_reaction_count(obj, metric), requested)
+            elif name in ("likes", "reactions") and obj["kind"] == "post":
+                result[alias.group(1) if alias else name] = _summary_edge(obj[name], requested)
+            elif name == "comments" and (obj["id"], "comments") in self.data.edges:
+                result[name] = _summary_edge(len(self.data.edges[(obj["id"], "comments")]), requested)
+            elif name in obj and name not in ("kind", "insights"):
+                if obj[name] not in ("", None):
+                    result[name] = obj[name]
+            elif name != "id" and name not in OPTIONAL_FIELDS:
+                return 400, _error(100, f"(#100) Tried accessing nonexisting field ({name}) on node type ({obj['kind'].title()})")
+        result["id"] = obj["id"]
+        return 200, result
+
+    def _nested_edge(self, object_id: str, edge: str, requested: str) -> tuple[int, dict[str, Any]]:
+        """Field expansion of an edge, e.g. comments.limit(10){id,message}: its first page inline."""
+        modifiers, subfields = requested.split("{", 1)
+        limit = re.search(r"\.limit\((\d+)\)", modifiers)
+        limit = int(limit.group(1)) if limit else 25
+        ids = [i for i in self.data.edges[(object_id, edge)] if i in self.data.objects]
+        items = []
+        for item_id in ids[:limit]:
+            status, item = self._select(self.data.objects[item_id], subfields.rstrip("}"))
+            if status != 200:
+                return status, item
+            items.append(item)
+        page: dict[str, Any] = {"data": items}
+        if items:
+            page["paging"] = {"cursors": {"before": "0", "after": str(len(items))}}
+            if len(items) < len(ids):
+                page["paging"]["next"] = f"https://graph.facebook.com/{object_id}/{edge}?after={len(items)}&limit={limit}"
+        return 200, page
+
+    def _insights(self, obj: dict[str, Any], query: dict[str, str]) -> tuple[int, dict[str, Any]]:
+        metrics = [m for m in query.get("metric", "").split(",") if m]
+        if not metrics or any(m not in INSIGHT_METRICS for m in metrics):
+            return 400, _error(100, "(#100) The value must be a valid insights metric")
+        values = obj.get("insights", {})
+        period = query.get("period", "lifetime")
+        return 200, {"data": [
+            {"name": m, "period": period, "values": [{"value": values.get(m, 0)}], "id": f"{obj['id']}/insights/{m}/{period}"}
+            for m in metrics
+        ]}
+
+
+def split_fields(fields: str) -> list[str]:
+    """Split a Graph fields parameter on top-level commas ("a,b{c,d},e")."""
+    parts, depth, current = [], 0, ""
+    for char in fields:
+        if char in "{(":
+            depth += 1
+        elif char in "})":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+    if current:
+        parts.append(current)
+    return [p.strip() for p in parts if p.strip()]
+
+
+def mutate(text: str, rng: random.Random) -> str:
+    """Copy of `text` with the small edits spammers make to dodge exact matching."""
+    chars = list(text)
+    for _ in range(rng.randint(1, 3)):
+        i = rng.randrange(len(chars))
+        edit = rng.random()
+        if edit < 0.4:
+            chars[i] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        elif edit < 0.7:
+            del chars[i]
+        else:
+            chars.insert(i, rng.choice("aeiou "))
+    text = "".join(chars)
+    if rng.random() < 0.3:
+        text = text.upper()
+    return text + rng.choice(["", "", " 🔥", "!!", " 💯💯", " ✅"])
+
+
+def _reaction_count(post: dict[str, Any], metric: str) -> int:
+    """Share of the post's reactions of one type, in proportion to its reaction insights."""
+    insights = post.get("insights", {})
+    weights = sum(insights.get(m, 0) for m in REACTION_TYPE_METRICS.values())
+    return post["reactions"] * insights.get(metric, 0) // weights if weights else 0
+
+
+def _summary_edge(total: int, requested: str) -> dict[str, Any]:
+    limit = re.search(r"\.limit\((\d+)\)", requested)
+    shown = min(total, int(limit.group(1)) if limit else 25)
+    edge: dict[str, Any] = {"data": [{"id": str(7000 + i), "name": f"Usuario {i}"} for i in range(shown)]}
+    if re.search(r"summary\((true|total_count)\)", requested):
+        edge["summary"] = {"total_count": total, "can_like": True, "has_liked": False}
+    return edge
+
+
+def _error(code: int, message: str, subcode: int = None, transient: bool = False) -> dict[str, Any]:
+    error = {"message": message, "type": "OAuthException", "code": code, "is_transient": transient, "fbtrace_id": "FakeGraph"}
+    if subcode is not None:
+        error["error_subcode"] = subcode
+    return {"error": error}
+
+
+# {result=<operation name>:$.<path>} in a batch operation's URL or body
+_BATCH_REFERENCE = re.compile(r"\{result=([^:}]+):\$\.?([^}]*)\}")
+
+
+def _multipart(raw_body: bytes, content_type: str) -> dict[str, Any]:
+    """Form fields of a multipart upload; files become their name, type and size."""
+    message = BytesParser(policy=email.policy.HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + raw_body)
+    body = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        payload = part.get_payload(decode=True)
+        if part.get_filename():
+            body[name] = {"filename": part.get_filename(), "content_type": part.get_content_type(), "bytes": len(payload)}
+        else:
+            body[name] = payload.decode()
+    return body
+
+
+def _batch_result(named: dict[str, tuple[int, Any]], name: str, path: str) -> str:
+    """Value of an earlier named batch operation's response (JSONPath with dotted keys and indexes)."""
+    status, value = named.get(name, (400, None))
+    if status != 200:
+        raise LookupError(name)
+    for part in filter(None, path.split(".")):
+        if isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        elif isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            raise LookupError(f"{name}:$.{path}")
+    return str(value)
+
+
+def _timestamp(iso: str | None) -> int:
+    if not iso:
+        return 0
+    return calendar.timegm(time.strptime(iso, "%Y-%m-%dT%H:%M:%S+0000"))
+
+
+def _iso(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S+0000", time.gmtime(timestamp))
+
+
+def _make_handler(server: FakeGraphServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately; with keep-alive clients,
+        # Nagle's algorithm would add a delayed-ACK stall to every response
+        disable_nagle_algorithm = True
+
+        def _dispatch(self, method: str):
+            url = urlsplit(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            length = int(self.headers.get("Content-Length") or 0)
+            raw_body = self.rfile.read(length) if length else b""
+            if server.config.upload_mbps:
+                time.sleep(len(raw_body) * 8 / (server.config.upload_mbps * 1e6))
+            body = {}
+            if raw_body:
+                if "json" in self.headers.get("Content-Type", ""):
+                    body = json.loads(raw_body)
+                elif "multipart/form-data" in self.headers.get("Content-Type", ""):
+                    body = _multipart(raw_body, self.headers["Content-Type"])
+                else:
+                    body = {k: v[-1] for k, v in parse_qs(raw_body.decode()).items()}
+
+            try:
+                status, payload = server.handle(method, url.path, query, body, f"http://{self.headers.get('Host')}")
+            except Exception as e:
+                status, payload = 500, _error(1, f"Fake Graph server error: {e!r}")
+            data = json.dumps(payload, ensure_ascii=False).encode()
+
+            # Count before responding so the client never sees stale stats
+            endpoint = re.sub(r"/[a-z]?\d[\w]*", "/{id}", url.path)
+            with server._lock:
+                stats = server.stats
+                stats.calls += 1
+                stats.errors += status >= 400
+                stats.bytes_in += len(self.requestline) + len(str(self.headers)) + len(raw_body)
+                stats.bytes_out += len(data)
+                stats.endpoints[f"{method} {endpoint}"] = stats.endpoints.get(f"{method} {endpoint}", 0) + 1
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=UTF-8")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in server._usage_headers().items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._dispatch("GET")
+
+        def do_HEAD(self):
+            # Media host: type and size of a registered file, no body
+            name = urlsplit(self.path).path.removeprefix("/media/")
+            with server._lock:
+                server.stats.calls += 1
+                server.stats.endpoints["HEAD /media"] = server.stats.endpoints.get("HEAD /media", 0) + 1
+            if name not in server.media:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            content_type, size = server.media[name]
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+
+        def do_POST(self):
+            self._dispatch("POST")
+
+        def do_DELETE(self):
+            self._dispatch("DELETE")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Facebook Graph API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = FakeGraphConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, slow_rate=args.slow_rate,
+                             slow_ms=args.slow_ms, error_rate=args.error_rate)
+    server = FakeGraphServer(config, host=args.host, port=args.port)
+    print(f"Fake Graph API on {server.base_url} (page id {PAGE_ID})")
+    print(f"export FACEBOOK_GRAPH_API_BASE_URL={server.base_url} FACEBOOK_PAGE_ID={PAGE_ID}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Per-tool benchmark suite, run against the local fake Graph API.
+
+Drives every public Manager method and reports p50/p99 latency, Graph calls
+per tool and bytes transferred. Save a run with --json and compare a later
+run against it with --compare to catch regressions.
+
+    python benchmarks/run_benchmarks.py --latency-ms 100 --json bench_output.json
+    python benchmarks/run_benchmarks.py --latency-ms 100 --compare bench_output.json
+"""
+
+import argparse
+import inspect
+import itertools
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+
+
+class Fixture:
+    """IDs from the fake page handed out to the scenarios.
+
+    Destructive scenarios take fresh comment and post IDs on every call so
+    repeated iterations never hit already-deleted objects.
+    """
+
+    def __init__(self, server: FakeGraphServer):
+        self.data = server.data
+        posts = self.data.edges[(PAGE_ID, "posts")]
+        self.post_id = posts[0]
+        self.comment_id = self.data.edges[(self.post_id, "comments")][0]
+        self.comments = {"data": [self.data.objects[c] for c in self.data.edges[(self.post_id, "comments")]]}
+        self._spare_comments = [c for p in reversed(posts) for c in self.data.edges[(p, "comments")]]
+        # Photos and a clip on the fake media host, so pre-flight HEAD checks stay local
+        self.media = [server.media_url("foto1.jpg"), server.media_url("foto2.png"), server.media_url("clip.mp4", size=20_000_000)]
+        self.serial = itertools.count()
+        self._schedule_day = itertools.count(2)
+
+    def take_comments(self, n: int) -> list[str]:
+        taken, self._spare_comments = self._spare_comments[:n], self._spare_comments[n:]
+        return taken
+
+    def take_comment(self) -> str:
+        return self.take_comments(1)[0]
+
+    def schedule_entries(self, n: int) -> list[dict[str, Any]]:
+        """`n` posts half an hour apart, starting on a day no earlier call has used."""
+        start = int(time.time()) // 86400 * 86400 + next(self._schedule_day) * 86400
+        return [{"message": f"Publicación programada {i}", "publish_time": start + i * 1800} for i in range(n)]
+
+    def with_trend_history(self, manager):
+        """Six hours of 5-minute engagement samples of every post, recorded once without Graph traffic."""
+        history = manager.trends.history
+        if not history.samples:
+            posts = [self.data.objects[p] for p in self.data.edges[(PAGE_ID, "posts")] if p in self.data.objects]
+            start = int(time.time()) - 6 * 3600
+            for k in range(73):
+                history.record(start + k * 300, {post["id"]: {
+                    "reactions": post.get("reactions", 0) + k * (i % 7), "comments": k * (i % 3) + k * k * (i % 2) // 10,
+                    "shares": post.get("shares", {}).get("count", 0), "message": post.get("message", "")[:100],
+                } for i, post in enumerate(posts)})
+        return manager
+
+    def job_id(self, manager) -> str:
+        jobs = manager.list_jobs()
+        return jobs[0]["id"] if jobs else "unknown"
+
+    def take_post(self) -> str:
+        # Created directly in the fake data so setup is not counted as traffic
+        return self.data.create("post", PAGE_ID, "feed", {"message": "Publicación temporal"})
+
+
+# Manager method -> call made by the benchmark. Methods that only take a
+# post_id are added automatically.
+SCENARIOS: dict[str, Callable[[Any, Fixture], Any]] = {
+    "post_to_facebook": lambda m, f: m.post_to_facebook("Hola desde el benchmark"),
+    "reply_to_comment": lambda m, f: m.reply_to_comment(f.post_id, f.comment_id, "¡Gracias!"),
+    "get_page_posts": lambda m, f: m.get_page_posts(),
+    "get_post_comments": lambda m, f: m.get_post_comments(f.post_id),
+    "delete_comment": lambda m, f: m.delete_comment(f.take_comment()),
+    "hide_comment": lambda m, f: m.hide_comment(f.comment_id),
+    "unhide_comment": lambda m, f: m.unhide_comment(f.comment_id),
+    "delete_comment_from_post": lambda m, f: m.delete_comment_from_post(f.post_id, f.take_comment()),
+    "filter_negative_comments": lambda m, f: m.filter_negative_comments(f.comments),
+    "delete_post": lambda m, f: m.delete_post(f.take_post()),
+    "post_image_to_facebook": lambda m, f: m.post_image_to_facebook(f.media[0], "Foto del día"),
+    "send_dm_to_user": lambda m, f: m.send_dm_to_user("5001", "Hola"),
+    "send_dm_media_to_user": lambda m, f: m.send_dm_media_to_user("5001", "Mira esto", f.media),
+    "update_post": lambda m, f: m.update_post(f.post_id, "Mensaje actualizado"),
+    "schedule_post": lambda m, f: m.schedule_post("Programado", int(time.time()) + 86400),
+    "get_page_fan_count": lambda m, f: m.get_page_fan_count(),
+    "bulk_delete_comments": lambda m, f: m.bulk_delete_comments(f.take_comments(10)),
+    "bulk_hide_comments": lambda m, f: m.bulk_hide_comments(f.take_comments(10)),
+    "create_storie_list_media": lambda m, f: m.create_storie_list_media(f.media),
+    "post_video_to_facebook": lambda m, f: m.post_video_to_facebook(f.media[2], "Tutorial de cocina"),
+    "generate_captions": lambda m, f: m.generate_captions("Tutorial de cocina", 10),
+    "create_page_media_post": lambda m, f: m.create_page_media_post(PAGE_ID, f.media, "Recetas italianas"),
+    "post_media_to_facebook": lambda m, f: m.post_media_to_facebook(f.media, "Recetas italianas"),
+    "get_my_stories": lambda m, f: m.get_my_stories(10),
+    "get_my_last_post": lambda m, f: m.get_my_last_post(),
+    # Submit a fresh drop (new URLs, so it is not deduplicated) and wait for the job
+    "submit_post_media_to_facebook": lambda m, f: m.jobs.wait(
+        m.submit_post_media_to_facebook([f"{url}?v={next(f.serial)}" for url in f.media], "Recetas italianas")["id"]),
+    "submit_create_page_media_post": lambda m, f: m.jobs.wait(
+        m.submit_create_page_media_post(PAGE_ID, [f"{f.media[0]}?v={next(f.serial)}"], "Recetas italianas")["id"]),
+    "submit_create_storie_list_media": lambda m, f: m.jobs.wait(
+        m.submit_create_storie_list_media([f"{f.media[0]}?v={next(f.serial)}"])["id"]),
+    "schedule_posts_bulk": lambda m, f: m.schedule_posts_bulk(f.schedule_entries(60)),
+    "list_scheduled_posts": lambda m, f: m.list_scheduled_posts(int(time.time()), int(time.time()) + 30 * 86400),
+    "get_comment_tree": lambda m, f: m.get_comment_tree(f.post_id),
+    "get_post_top_commenters": lambda m, f: m.get_post_top_commenters(f.post_id, include_replies=True),
+    "find_duplicate_comments": lambda m, f: m.find_duplicate_comments(since="2024-12-01T00:00:00Z"),
+    "search_comments": lambda m, f: m.search_comments("pizza receta*"),
+    "get_trending_posts": lambda m, f: f.with_trend_history(m).get_trending_posts("1h"),
+    "get_page_engagement_report": lambda m, f: m.get_page_engagement_report("2025-01-01T00:00:00Z", "2025-01-08T00:00:00Z"),
+    "list_jobs": lambda m, f: m.list_jobs(),
+    "get_job_status": lambda m, f: m.get_job_status(f.job_id(m)),
+    "cancel_job": lambda m, f: m.cancel_job(f.job_id(m)),
+    # Read branch plus a post/edit chain and moderation folded into one batch
+    "execute_plan": lambda m, f: m.execute_plan([
+        {"id": "comments", "op": "get_post_comments", "args": {"post_id": f.post_id}},
+        {"id": "negative", "op": "filter_negative_comments", "args": {"comments": "$comments"}},
+        {"id": "post", "op": "post_to_facebook", "args": {"message": "Hola desde un plan"}},
+        {"id": "edit", "op": "update_post", "args": {"post_id": "$post.id", "new_message": "Editado"}},
+        {"id": "hide", "op": "bulk_hide_comments", "args": {"comment_ids": f.take_comments(10)}},
+        {"id": "fans", "op": "get_page_fan_count"},
+    ]),
+}
+
+
+def build_scenarios(manager_class: type) -> dict[str, Callable[[Any, Fixture], Any]]:
+    """Scenarios for every public Manager method; fails if one has no scenario."""
+    scenarios = {}
+    missing = []
+    for name, method in inspect.getmembers(manager_class, inspect.isfunction):
+        if name.startswith("_"):
+            continue
+        if name in SCENARIOS:
+            scenarios[name] = SCENARIOS[name]
+        elif list(inspect.signature(method).parameters)[1:] == ["post_id"]:
+            scenarios[name] = lambda m, f, name=name: getattr(m, name)(f.post_id)
+        else:
+            missing.append(name)
+    if missing:
+        raise SystemExit(f"No benchmark scenario for Manager methods: {', '.join(missing)}")
+    return scenarios
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def run(iterations: int, config: FakeGraphConfig, only: list[str] = None) -> dict[str, dict[str, Any]]:
+    with FakeGraphServer(config) as server:
+        os.environ["FACEBOOK_GRAPH_API_BASE_URL"] = server.base_url
+        os.environ["FACEBOOK_PAGE_ID"] = PAGE_ID
+        os.environ.setdefault("FACEBOOK_ACCESS_TOKEN", "fake-token")
+        os.environ["FACEBOOK_MCP_JOBS_FILE"] = os.path.join(tempfile.mkdtemp(prefix="fb-mcp-bench-"), "jobs.json")
+        # The fake page's posts are dated early 2025: keep them all in the search index
+        os.environ.setdefault("FACEBOOK_MCP_SEARCH_SYNC_DAYS", "3650")
+        from manager import Manager
+
+        manager = Manager()
+        fixture = Fixture(server)
+        results = {}
+        for name, scenario in sorted(build_scenarios(Manager).items()):
+            if only and name not in only:
+                continue
+            latencies, calls, bytes_in, bytes_out, errors = [], 0, 0, 0, 0
+            for _ in range(iterations):
+                server.reset_stats()
+                start = time.perf_counter()
+                scenario(manager, fixture)
+                latencies.append((time.perf_counter() - start) * 1000)
+                stats = server.reset_stats()
+                calls += stats.calls
+                errors += stats.errors
+                bytes_in += stats.bytes_in
+                bytes_out += stats.bytes_out
+            results[name] = {
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+                "calls": round(calls / iterations, 2),
+                "errors": round(errors / iterations, 2),
+                "bytes_in": bytes_in // iterations,
+                "bytes_out": bytes_out // iterations,
+            }
+        return results
+
+
+def print_table(results: dict[str, dict[str, Any]]) -> None:
+    print(f"{'tool':<36}{'p50 ms':>9}{'p99 ms':>9}{'calls':>7}{'errors':>8}{'bytes in':>10}{'bytes out':>11}")
+    for name, r in results.items():
+        print(f"{name:<36}{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['calls']:>7g}{r['errors']:>8g}{r['bytes_in']:>10}{r['bytes_out']:>11}")
+
+
+def compare(results: dict[str, dict[str, Any]], baseline: dict[str, dict[str, Any]], threshold: float) -> list[str]:
+    """List regressions: slower p50 beyond `threshold` (fraction), or more Graph calls/bytes."""
+    regressions = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        # Ignore sub-millisecond noise
+        if r["p50_ms"] > base["p50_ms"] * (1 + threshold) and r["p50_ms"] - base["p50_ms"] > 1:
+            regressions.append(f"{name}: p50 {base['p50_ms']} -> {r['p50_ms']} ms")
+        if r["calls"] > base["calls"]:
+            regressions.append(f"{name}: Graph calls {base['calls']} -> {r['calls']}")
+        if r["bytes_out"] > base["bytes_out"] * (1 + threshold):
+            regressions.append(f"{name}: bytes out {base['bytes_out']} -> {r['bytes_out']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every Manager method against a fake Graph API")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--only", nargs="*", help="Benchmark only these Manager methods")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Baseline results file; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative slowdown (default 0.2)")
+    args = parser.parse_args()
+
+    config = FakeGraphConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, slow_rate=args.slow_rate,
+                             slow_ms=args.slow_ms, error_rate=args.error_rate)
+    results = run(args.iterations, config, args.only)
+    print_table(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import hashlib
+import re
+import threading
+import time
+from typing import Any
+
+
+# Graph error codes that keep failing until the page/app setup changes:
+# 10 and 200-299 are permission errors, 12 is a deprecated field or edge,
+# 100 is an invalid parameter (unknown field, metric or edge).
+# Transient errors (rate limits, timeouts, temporary outages) are never cached.
+PERMISSION_ERROR_CODES = {10} | set(range(200, 300))
+DEPRECATED_ERROR_CODES = {12}
+INVALID_PARAMETER_ERROR_CODES = {100}
+
+# Subcode 33 means the object itself does not exist, which says nothing
+# about whether the endpoint is supported.
+MISSING_OBJECT_SUBCODES = {33}
+
+# Post attachment fields removed in Graph v3.3 (reported as error #12)
+DEPRECATED_ATTACHMENT_FIELDS = {"caption", "description", "link", "name", "object_id", "source", "type"}
+
+_FIELD_IN_MESSAGE = re.compile(r"field \(([^)]+)\)")
+
+
+def is_capability_error(error: dict[str, Any]) -> bool:
+    """Return True if a Graph error means the request will keep failing."""
+    if not isinstance(error, dict):
+        return False
+    code = error.get("code")
+    if error.get("error_subcode") in MISSING_OBJECT_SUBCODES:
+        return False
+    return code in PERMISSION_ERROR_CODES or code in DEPRECATED_ERROR_CODES or code in INVALID_PARAMETER_ERROR_CODES
+
+
+def field_base_name(field: str) -> str:
+    """Strip modifiers and expansions from a field, e.g. 'likes.summary(true)' -> 'likes'."""
+    return re.split(r"[.{]", field, maxsplit=1)[0]
+
+
+def unsupported_fields_in_error(error: dict[str, Any], fields: list[str]) -> list[str]:
+    """Work out which of the requested fields a Graph error refers to."""
+    message = error.get("message", "")
+    named = set(_FIELD_IN_MESSAGE.findall(message))
+    if error.get("code") in DEPRECATED_ERROR_CODES and "attachement" in message:
+        named |= DEPRECATED_ATTACHMENT_FIELDS
+    return [f for f in fields if field_base_name(f) in named]
+
+
+def token_fingerprint(token: str) -> str:
+    """Short, non-reversible identifier for an access token."""
+    return hashlib.sha256((token or "").encode()).hexdigest()[:12]
+
+
+class CapabilityCache:
+    """Remembers endpoints, fields and metrics that are unavailable for a scope.
+
+    A scope identifies the page/token pair the probe was made with. Entries
+    expire after `ttl` seconds so that granted permissions or re-enabled
+    features are picked up again.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[tuple[str, str, str], tuple[float, dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, scope: str, kind: str, name: str) -> dict[str, Any] | None:
+        """Return the recorded error if `name` is known to be unsupported, else None."""
+        key = (scope, kind, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, error = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return error
+
+    def is_unsupported(self, scope: str, kind: str, name: str) -> bool:
+        return self.get(scope, kind, name) is not None
+
+    def mark_unsupported(self, scope: str, kind: str, name: str, error: dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[(scope, kind, name)] = (time.monotonic() + self.ttl, error)
+
+    def partition(self, scope: str, kind: str, names: list[str]) -> tuple[list[str], list[str]]:
+        """Split names into (possibly supported, known unsupported), keeping order."""
+        supported, unsupported = [], []
+        for name in names:
+            (unsupported if self.is_unsupported(scope, kind, name) else supported).append(name)
+        return supported, unsupported
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        """List the live entries with the seconds left before each one expires."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {"scope": scope, "kind": kind, "name": name, "expires_in": round(expires_at - now), "error": error}
+                for (scope, kind, name), (expires_at, error) in self._entries.items()
+                if expires_at > now
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,114 @@
+import datetime
+import json
+import os
+import random
+import string
+from functools import lru_cache
+from typing import Any
+
+
+CAPTIONS_DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "viral_captions.json")
+
+# Template fields filled from the request rather than from a phrase pool
+CONTEXT_FIELDS = ("prompt", "prompt_upper", "year")
+
+
+class CompiledTemplate:
+    """A caption template compiled once into a positional format string.
+
+    Fields are renumbered so rendering is a single str.format call:
+    {0}-{2} are the context fields, {3}... one phrase per pool in `slots`.
+    """
+
+    __slots__ = ("fmt", "slots", "pools", "combinations")
+
+    def __init__(self, template: str, pools: dict[str, list[str]]):
+        parsed = list(string.Formatter().parse(template))
+        # Pools this template draws from, in first-use order
+        self.slots: list[str] = list(dict.fromkeys(
+            field for _, field, _, _ in parsed if field and field not in CONTEXT_FIELDS
+        ))
+        unknown = [slot for slot in self.slots if slot not in pools]
+        if unknown:
+            raise ValueError(f"Caption template uses unknown phrase pools: {', '.join(unknown)}")
+        positions = {field: i for i, field in enumerate(CONTEXT_FIELDS + tuple(self.slots))}
+        self.fmt = "".join(
+            literal.replace("{", "{{").replace("}", "}}") + (f"{{{positions[field]}}}" if field else "")
+            for literal, field, _, _ in parsed
+        )
+        self.pools: list[list[str]] = [pools[slot] for slot in self.slots]
+        self.combinations = 1
+        for pool in self.pools:
+            self.combinations *= len(pool)
+
+    def render(self, context: tuple[str, str, str], phrases: list[str]) -> str:
+        return self.fmt.format(*context, *phrases)
+
+
+class CaptionEngine:
+    """Generates viral copyright captions from precompiled templates and phrase pools.
+
+    Args:
+        data: {"pools": {name: [phrases]}, "templates": [format strings]}
+        seed: Optional seed for reproducible output
+    """
+
+    def __init__(self, data: dict[str, Any], seed: int = None):
+        self.pools: dict[str, list[str]] = data["pools"]
+        self.templates = [CompiledTemplate(t, self.pools) for t in data["templates"]]
+        self.total_variants = sum(t.combinations for t in self.templates)
+        self.rng = random.Random(seed)
+
+    def _context(self, prompt: str) -> tuple[str, str, str]:
+        return prompt, prompt.upper(), str(datetime.date.today().year)
+
+    def _render_variant(self, template: CompiledTemplate, index: int, context: tuple[str, str, str]) -> str:
+        """Render phrase combination number `index` of a template."""
+        # Decode the index as a mixed-radix number over the template's pools
+        phrases = []
+        for pool in template.pools:
+            index, choice = divmod(index, len(pool))
+            phrases.append(pool[choice])
+        return template.render(context, phrases)
+
+    def generate(self, prompt: str, rng: random.Random = None) -> str:
+        """Generate one caption, picking a template and one phrase per pool."""
+        rng = rng or self.rng
+        template = rng.choice(self.templates)
+        return template.render(self._context(prompt), [rng.choice(pool) for pool in template.pools])
+
+    def generate_batch(self, prompt: str, n: int, seed: int = None) -> list[str]:
+        """Generate up to `n` distinct captions for the same prompt.
+
+        Templates take turns, in a random order, so a batch covers as many of
+        them as it can however many phrase combinations each one has; within a
+        template, combinations are sampled without replacement, so no caption
+        repeats. Returns fewer than `n` only when fewer distinct variants exist
+        (none when `n` is not positive).
+        """
+        rng = random.Random(seed) if seed is not None else self.rng
+        context = self._context(prompt)
+        order = rng.sample(self.templates, len(self.templates))
+        # Captions per template: one each per round, until a template runs out
+        quotas = dict.fromkeys(order, 0)
+        remaining = max(0, min(n, self.total_variants))
+        while remaining:
+            for template in order:
+                if remaining and quotas[template] < template.combinations:
+                    quotas[template] += 1
+                    remaining -= 1
+        picks = {t: iter(rng.sample(range(t.combinations), quota)) for t, quota in quotas.items()}
+        captions = []
+        for _ in range(max(quotas.values(), default=0)):
+            for template in order:
+                index = next(picks[template], None)
+                if index is not None:
+                    captions.append(self._render_variant(template, index, context))
+        return captions
+
+
+@lru_cache(maxsize=None)
+def load_caption_data(path: str = CAPTIONS_DATA_FILE) -> dict[str, Any]:
+    """Read templates and phrase pools from disk (once per path)."""
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
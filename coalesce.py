@@ -0,0 +1,59 @@
+import copy
+import threading
+from typing import Any, Callable
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls into one.
+
+    While a call for a key is running, other callers with the same key wait
+    for it and get a copy of its result (or its exception) instead of
+    repeating the work. Used for Graph reads shared by concurrent sessions.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Run `fn` once for all concurrent callers of `key`.
+
+        Returns:
+            tuple: (result, shared) where shared is True if another caller's
+            call was reused
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result), True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                followers = call.followers
+            call.done.set()
+        # Callers may modify the response they get, so each one gets its own
+        return (copy.deepcopy(call.result) if followers else call.result), False
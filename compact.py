@@ -0,0 +1,199 @@
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+# Keys that only repeat data present elsewhere in the same result
+REDUNDANT_KEYS = {
+    "engagement_summary",  # get_my_last_post: same counts as *_count / engagement_totals
+    "post_age_info",       # get_my_last_post: same as data.created_time / updated_time
+    "original_prompt",     # media publishers: echo of the tool input
+}
+
+# Graph paging URLs are long and embed the access token; cursors are kept
+PAGING_URL_KEYS = {"next", "previous"}
+
+# Shortest a text field is cut to when the budget is very tight
+MIN_TEXT_LENGTH = 40
+
+# Bytes reserved for the "pagination" section added to a cut result
+PAGINATION_OVERHEAD = 160
+
+
+def serialized_size(value: Any) -> int:
+    """Size in bytes of `value` as sent to the MCP client."""
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode())
+
+
+class PageStore:
+    """Holds the items cut from over-budget results until the client asks for them."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 900):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._pages: OrderedDict[str, tuple[float, list[Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, items: list[Any]) -> str:
+        handle = secrets.token_urlsafe(6)
+        with self._lock:
+            self._pages[handle] = (time.monotonic() + self.ttl, items)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+        return handle
+
+    def pop(self, handle: str) -> list[Any] | None:
+        with self._lock:
+            entry = self._pages.pop(handle, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+
+class SizeStats:
+    """Serialized result sizes per tool, before and after compaction."""
+
+    def __init__(self):
+        self._tools: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, tool: str, raw_bytes: int, sent_bytes: int) -> None:
+        with self._lock:
+            stats = self._tools.setdefault(tool, {"calls": 0, "raw_bytes": 0, "sent_bytes": 0, "max_raw_bytes": 0})
+            stats["calls"] += 1
+            stats["raw_bytes"] += raw_bytes
+            stats["sent_bytes"] += sent_bytes
+            stats["max_raw_bytes"] = max(stats["max_raw_bytes"], raw_bytes)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {
+                tool: {
+                    **stats,
+                    "avg_raw_bytes": stats["raw_bytes"] // stats["calls"],
+                    "avg_sent_bytes": stats["sent_bytes"] // stats["calls"],
+                }
+                for tool, stats in sorted(self._tools.items())
+            }
+
+
+def prune(value: Any, max_text: int) -> Any:
+    """Drop empty and redundant fields and truncate long text, keeping key order stable."""
+    if isinstance(value, dict):
+        pruned = {}
+        for key, item in value.items():
+            if key in REDUNDANT_KEYS:
+                continue
+            if key == "paging" and isinstance(item, dict):
+                item = {k: v for k, v in item.items() if k not in PAGING_URL_KEYS}
+            item = prune(item, max_text)
+            if item is None or item == "" or item == [] or item == {}:
+                continue
+            pruned[key] = item
+        return pruned
+    if isinstance(value, list):
+        return [prune(item, max_text) for item in value]
+    if isinstance(value, str) and len(value) > max_text:
+        return f"{value[:max_text]}… (+{len(value) - max_text} chars)"
+    return value
+
+
+def _largest_list(value: Any, owner: Any = None, key: Any = None) -> tuple[int, Any, Any, list[Any]] | None:
+    """Find the splittable list with the biggest serialized size.
+
+    Returns:
+        (size, container, key, list), or None if there is no list with 2+ items
+    """
+    best = None
+    if isinstance(value, list) and len(value) > 1:
+        best = (serialized_size(value), owner, key, value)
+    children = value.items() if isinstance(value, dict) else enumerate(value) if isinstance(value, list) else ()
+    for child_key, child in children:
+        if isinstance(child, (dict, list)):
+            found = _largest_list(child, value, child_key)
+            if found and (best is None or found[0] > best[0]):
+                best = found
+    return best
+
+
+def fit_to_budget(result: Any, budget: int, store: PageStore, max_text: int) -> Any:
+    """Shrink a result below `budget` bytes.
+
+    Fields are pruned first, then the largest lists are cut and the rest of
+    their items parked in `store` behind a pagination handle. Text fields
+    are shortened further only if that is still not enough.
+    """
+    result = prune(result, max_text)
+    remainders: dict[int, tuple[Any, list[Any]]] = {}  # id(kept list) -> (key, cut items)
+    while serialized_size(result) > budget:
+        found = _largest_list(result)
+        if found is None:
+            break
+        _, owner, key, items = found
+        # Keep the longest prefix that fits, but always at least one item
+        excess = serialized_size(result) - budget + PAGINATION_OVERHEAD * (len(remainders) + 1)
+        keep, cut = len(items), 0
+        while keep > 1 and cut < excess:
+            keep -= 1
+            cut += serialized_size(items[keep]) + 2  # item plus ", " separator
+        kept = items[:keep]
+        _, previously_cut = remainders.pop(id(items), (key, []))
+        remainders[id(kept)] = (key, items[keep:] + previously_cut)
+        if owner is None:
+            result = kept
+        else:
+            owner[key] = kept
+    while serialized_size(result) > budget and max_text > MIN_TEXT_LENGTH:
+        max_text //= 2
+        result = prune(result, max_text)
+    if remainders:
+        more = {
+            "more": [{"field": key, "handle": store.put(rest), "remaining": len(rest)} for key, rest in remainders.values()],
+            "hint": "Call get_more_results(handle) for the remaining items",
+        }
+        if isinstance(result, dict):
+            result["pagination"] = more
+        elif isinstance(result, list):
+            result.append({"pagination": more})
+    return result
+
+
+class OutputShaper:
+    """Compact output stage applied to every tool result.
+
+    Args:
+        enabled: Compact every result server-wide
+        default_budget: Byte budget used when no per-call budget is given
+        max_text: Longest text field kept as-is
+        metrics: Optional MetricsRegistry that also receives the result sizes
+    """
+
+    def __init__(self, enabled: bool, default_budget: int, max_text: int, metrics: Any = None):
+        self.enabled = enabled
+        self.default_budget = default_budget
+        self.max_text = max_text
+        self.pages = PageStore()
+        self.stats = SizeStats()
+        self.metrics = metrics
+
+    def shape(self, tool: str, result: Any, budget: int = None) -> Any:
+        """Compact a result when compact mode is on or a budget is given, and record its size."""
+        raw_bytes = sent_bytes = serialized_size(result)
+        raw_result = result
+        if (self.enabled or budget) and isinstance(result, (dict, list)):
+            result = fit_to_budget(result, budget or self.default_budget, self.pages, self.max_text)
+            sent_bytes = serialized_size(result)
+        self.stats.record(tool, raw_bytes, sent_bytes)
+        if self.metrics is not None:
+            self.metrics.record_tool_result(tool, raw_result, sent_bytes)
+        return result
+
+    def more(self, handle: str, budget: int = None) -> dict[str, Any]:
+        """Return the next items parked behind a pagination handle."""
+        items = self.pages.pop(handle)
+        if items is None:
+            return {"error": f"Unknown or expired pagination handle: {handle}"}
+        return fit_to_budget({"data": items}, budget or self.default_budget, self.pages, self.max_text)
@@ -7,4 +7,93 @@ load_dotenv()
 GRAPH_API_VERSION = "v22.0"
 PAGE_ACCESS_TOKEN = os.getenv("FACEBOOK_ACCESS_TOKEN")
 PAGE_ID = os.getenv("FACEBOOK_PAGE_ID")
-GRAPH_API_BASE_URL = f"https://graph.facebook.com/{GRAPH_API_VERSION}"
+GRAPH_API_BASE_URL = os.getenv("FACEBOOK_GRAPH_API_BASE_URL", f"https://graph.facebook.com/{GRAPH_API_VERSION}")
+
+# How long (seconds) an endpoint, field or metric that Graph rejected for this
+# page/token is skipped before it is probed again
+CAPABILITY_CACHE_TTL = int(os.getenv("FACEBOOK_CAPABILITY_CACHE_TTL", "21600"))
+
+# Compact tool output: prune duplicated/empty fields, shorten long text and
+# paginate lists so each result stays under a byte budget
+COMPACT_OUTPUT = os.getenv("FACEBOOK_MCP_COMPACT_OUTPUT", "").lower() in ("1", "true", "yes")
+OUTPUT_BUDGET = int(os.getenv("FACEBOOK_MCP_OUTPUT_BUDGET", "8000"))
+MAX_TEXT_LENGTH = int(os.getenv("FACEBOOK_MCP_MAX_TEXT_LENGTH", "500"))
+
+# Seed for the viral caption generator, for reproducible captions (unset = random)
+CAPTION_SEED = int(os.getenv("FACEBOOK_CAPTION_SEED")) if os.getenv("FACEBOOK_CAPTION_SEED") else None
+
+# Port for a Prometheus text endpoint (GET /metrics) on localhost (unset = off)
+METRICS_PORT = int(os.getenv("FACEBOOK_MCP_METRICS_PORT")) if os.getenv("FACEBOOK_MCP_METRICS_PORT") else None
+
+# Journal every Graph request/response (tokens redacted) to this file, or
+# serve responses back from such a journal instead of calling Graph
+GRAPH_RECORD_FILE = os.getenv("FACEBOOK_GRAPH_RECORD")
+GRAPH_REPLAY_FILE = os.getenv("FACEBOOK_GRAPH_REPLAY")
+GRAPH_REPLAY_LATENCY = os.getenv("FACEBOOK_GRAPH_REPLAY_LATENCY", "").lower() in ("1", "true", "yes")
+
+# Transport for `python server.py`: "stdio", "sse" or "streamable-http". The
+# HTTP transports serve many concurrent sessions from one process, sharing
+# one Graph client, its caches and its connection pool
+MCP_TRANSPORT = os.getenv("FACEBOOK_MCP_TRANSPORT", "stdio")
+MCP_HOST = os.getenv("FACEBOOK_MCP_HOST", "127.0.0.1")
+MCP_PORT = int(os.getenv("FACEBOOK_MCP_PORT", "8000"))
+# Kept-alive connections to Graph (roughly the number of concurrent requests)
+HTTP_POOL_SIZE = int(os.getenv("FACEBOOK_HTTP_POOL_SIZE", "32"))
+# Graph requests in flight at once; beyond that, requests queue and are sent
+# by priority class (see priorities.py). Per-tool classes override the
+# defaults as "tool=class,..." (classes: interactive, normal, bulk)
+GRAPH_CONCURRENCY = int(os.getenv("FACEBOOK_GRAPH_CONCURRENCY", "0")) or HTTP_POOL_SIZE
+TOOL_PRIORITIES = {name.strip(): priority.strip()
+                   for name, _, priority in (entry.partition("=") for entry in os.getenv("FACEBOOK_MCP_TOOL_PRIORITIES", "").split(","))
+                   if name.strip()}
+
+# Background jobs (long media uploads): state file and number of workers
+JOBS_FILE = os.getenv("FACEBOOK_MCP_JOBS_FILE", os.path.join(os.path.expanduser("~"), ".facebook-mcp", "jobs.json"))
+JOB_WORKERS = int(os.getenv("FACEBOOK_MCP_JOB_WORKERS", "2"))
+
+# Seconds the local calendar of scheduled posts is trusted before reloading it from Graph
+SCHEDULE_CALENDAR_TTL = int(os.getenv("FACEBOOK_SCHEDULE_CALENDAR_TTL", "300"))
+
+# Hedged reads: when a GET is slower than HEDGE_PERCENTILE of the endpoint's
+# recent latencies, send a second copy and use whichever answers first.
+# HEDGE_MAX_EXTRA caps the extra requests as a fraction of reads
+HEDGE_READS = os.getenv("FACEBOOK_HEDGE_READS", "").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("FACEBOOK_HEDGE_PERCENTILE", "95"))
+HEDGE_MAX_EXTRA = float(os.getenv("FACEBOOK_HEDGE_MAX_EXTRA", "0.05"))
+HEDGE_MIN_DELAY_MS = float(os.getenv("FACEBOOK_HEDGE_MIN_DELAY_MS", "50"))
+
+# Steps of an execute_plan request that run at the same time
+PLAN_WORKERS = int(os.getenv("FACEBOOK_MCP_PLAN_WORKERS", "4"))
+
+# Resize local photos to Facebook's display size (longest side in pixels),
+# drop their metadata and re-encode them before upload. Needs Pillow; runs
+# on IMAGE_WORKERS processes (0 = one per CPU)
+PREPROCESS_IMAGES = os.getenv("FACEBOOK_MCP_PREPROCESS_IMAGES", "").lower() in ("1", "true", "yes")
+IMAGE_MAX_DIMENSION = int(os.getenv("FACEBOOK_MCP_IMAGE_MAX_DIMENSION", "2048"))
+IMAGE_QUALITY = int(os.getenv("FACEBOOK_MCP_IMAGE_QUALITY", "85"))
+IMAGE_WORKERS = int(os.getenv("FACEBOOK_MCP_IMAGE_WORKERS", "0")) or None
+
+# Media pre-flight checks: seconds a HEAD answer for a media URL is reused,
+# and how long to wait for one
+PREFLIGHT_CACHE_TTL = int(os.getenv("FACEBOOK_MCP_PREFLIGHT_CACHE_TTL", "600"))
+PREFLIGHT_TIMEOUT = float(os.getenv("FACEBOOK_MCP_PREFLIGHT_TIMEOUT", "5"))
+
+# Time budget in seconds of every tool call (0 = none), and per-tool
+# overrides as "tool=seconds,..." (e.g. "bulk_delete_comments=120"). When it
+# runs out no further Graph request is sent and the finished items are returned
+TOOL_TIMEOUT = float(os.getenv("FACEBOOK_MCP_TOOL_TIMEOUT", "0")) or None
+TOOL_TIMEOUTS = {name.strip(): float(seconds) or None
+                 for name, _, seconds in (entry.partition("=") for entry in os.getenv("FACEBOOK_MCP_TOOL_TIMEOUTS", "").split(","))
+                 if name.strip()}
+
+# Engagement trends: seconds between background samples of the counters of
+# recent posts (0 = off; each sample costs one Graph read per 50 posts) and
+# the age in hours of the oldest post sampled
+TRENDS_INTERVAL = int(os.getenv("FACEBOOK_MCP_TRENDS_INTERVAL", "0"))
+TRENDS_MAX_AGE_HOURS = int(os.getenv("FACEBOOK_MCP_TRENDS_MAX_AGE_HOURS", "48"))
+
+# Comment search index: seconds it is trusted before a search syncs it with
+# Graph (only posts with new or deleted comments are re-read), and how many
+# days of posts it covers
+SEARCH_SYNC_TTL = int(os.getenv("FACEBOOK_MCP_SEARCH_SYNC_TTL", "300"))
+SEARCH_SYNC_DAYS = int(os.getenv("FACEBOOK_MCP_SEARCH_SYNC_DAYS", "30"))
@@ -0,0 +1,89 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+
+class Cancelled(BaseException):
+    """Raised in a tool call once its deadline has passed or it was cancelled.
+
+    A BaseException, like asyncio.CancelledError, so the `except Exception`
+    handlers around single items of a bulk operation don't swallow it.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Deadline:
+    """Time budget and cancellation flag of one tool call or job.
+
+    Work checks it before every Graph request (see `check`), so once it
+    expires or is cancelled no further request is sent; requests already
+    sent wait at most the remaining time. Bulk operations record here each
+    item they finish, so a stopped call can say exactly what was done.
+
+    Args:
+        seconds: Time budget from now (None = no limit)
+    """
+
+    def __init__(self, seconds: float | None = None):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds if seconds else None
+        self.reason: str | None = None
+        self.completed: list[dict[str, Any]] = []
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def cancel(self, reason: str = "Cancelled by the client") -> None:
+        """Stop the work at its next check."""
+        with self._lock:
+            if self.reason is None:
+                self.reason = reason
+
+    def remaining(self) -> float | None:
+        """Seconds left, or None without a time budget."""
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def check(self) -> None:
+        """Raise Cancelled if the work has to stop."""
+        if self.reason is None and self.expires_at is not None and time.monotonic() >= self.expires_at:
+            self.cancel(f"Time budget of {self.seconds:g} s exceeded")
+        if self.reason is not None:
+            raise Cancelled(self.reason)
+
+    def report(self) -> dict[str, Any]:
+        """Result of a stopped call: why it stopped and the items finished before."""
+        report = {"error": f"Stopped: {self.reason}", "stopped": True, "completed": self.completed,
+                  "completed_count": len(self.completed)}
+        if self.total:
+            report["not_started_count"] = self.total - len(self.completed)
+        return report
+
+
+_current_deadline: ContextVar[Deadline | None] = ContextVar("current_deadline", default=None)
+
+
+@contextmanager
+def enforcing(deadline: Deadline | None) -> Iterator[None]:
+    """Make `deadline` the one checked by work run in this context."""
+    token = _current_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def current() -> Deadline | None:
+    return _current_deadline.get()
+
+
+def check() -> None:
+    """Raise Cancelled if the current tool call has to stop (no-op outside one)."""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check()
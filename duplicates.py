@@ -0,0 +1,134 @@
+import operator
+import re
+import unicodedata
+import zlib
+from array import array
+from typing import Iterable
+
+# Characters per shingle: long enough that common words alone do not match,
+# short enough that a one-letter edit only changes a few shingles
+SHINGLE_SIZE = 5
+
+# MinHash values per text
+SIGNATURE_SIZE = 64
+
+# LSH bands of SIGNATURE_SIZE / BANDS values; texts about 50% similar or more
+# usually land in the same bucket of at least one band
+BANDS = 16
+
+# Share of equal MinHash values above which two texts are duplicates
+DEFAULT_THRESHOLD = 0.6
+
+# Shorter texts ("gracias", "genial!!") repeat legitimately and are left out
+MIN_TEXT_LENGTH = 25
+
+_ROWS = SIGNATURE_SIZE // BANDS
+_BIN_MASK = SIGNATURE_SIZE - 1
+_MASK32 = (1 << 32) - 1
+_MIX = 0x9E3779B1  # odd 32-bit constant, tells apart values borrowed from different distances
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop accents, punctuation and emoji, collapse whitespace."""
+    text = text.lower()
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def shingles(text: str) -> list[int]:
+    """Hashes of the overlapping SHINGLE_SIZE-character pieces of normalized text."""
+    data = text.encode()
+    crc32 = zlib.crc32
+    return [crc32(data[i:i + SHINGLE_SIZE]) for i in range(len(data) - SHINGLE_SIZE + 1)]
+
+
+def signature(hashes: Iterable[int]) -> list[int]:
+    """MinHash signature of a shingle set, with one hash per shingle.
+
+    Each shingle hash falls in one of SIGNATURE_SIZE bins by its low bits
+    and a bin keeps its smallest hash (one-permutation hashing). Empty bins, common with short texts, borrow the value of the
+    next filled bin to their right, mixed with the distance, so two texts
+    still agree on a bin with probability close to their Jaccard similarity.
+    """
+    # Largest first, so the smallest value of each bin is the one left in the dict
+    smallest = {h & _BIN_MASK: h for h in sorted(hashes, reverse=True)}
+    bins = [smallest.get(i) for i in range(SIGNATURE_SIZE)]
+    if len(smallest) == SIGNATURE_SIZE:
+        return bins
+    result = list(bins)
+    following = next(i for i, v in enumerate(bins) if v is not None) + SIGNATURE_SIZE
+    for i in range(SIGNATURE_SIZE - 1, -1, -1):
+        if bins[i] is not None:
+            following = i
+        else:
+            result[i] = bins[following % SIGNATURE_SIZE] ^ (((following - i) * _MIX) & _MASK32)
+    return result
+
+
+class DuplicateIndex:
+    """Groups near-identical texts in one pass, in time linear in the number of texts.
+
+    Each text gets a MinHash signature, split into BANDS bands. A band value
+    seen before points to the first text that had it; the new text is
+    compared with that text only, and joined to its group when enough of
+    their signature values are equal. Groups are kept with union-find, so
+    texts that only match through a third one end up together.
+
+    Args:
+        threshold: Estimated Jaccard similarity of character shingles (0-1) above which texts are duplicates
+        min_length: Normalized texts shorter than this are ignored
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, min_length: int = MIN_TEXT_LENGTH):
+        self.threshold = threshold
+        self.min_length = min_length
+        self._signatures = array("I")
+        self._buckets: list[dict[int, int]] = [{} for _ in range(BANDS)]
+        self._parent: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._parent)
+
+    def add(self, text: str) -> int | None:
+        """Index a text; returns its position, or None when it is too short to judge."""
+        text = normalize(text or "")
+        if len(text) < self.min_length:
+            return None
+        sig = signature(shingles(text))
+        index = len(self._parent)
+        self._parent.append(index)
+        self._signatures.extend(sig)
+        needed = self.threshold * SIGNATURE_SIZE
+        keys = [hash(tuple(sig[start:start + _ROWS])) for start in range(0, SIGNATURE_SIZE, _ROWS)]
+        for buckets, key in zip(self._buckets, keys):
+            other = buckets.setdefault(key, index)
+            if other != index and self._find(other) != self._find(index) and self._agreement(sig, other) >= needed:
+                self._parent[self._find(index)] = self._find(other)
+        return index
+
+    def clusters(self, min_size: int = 2) -> list[list[int]]:
+        """Groups of at least `min_size` duplicate texts, largest first, by position."""
+        groups: dict[int, list[int]] = {}
+        for index in range(len(self._parent)):
+            groups.setdefault(self._find(index), []).append(index)
+        return sorted((g for g in groups.values() if len(g) >= min_size), key=len, reverse=True)
+
+    def similarity(self, a: int, b: int) -> float:
+        """Estimated Jaccard similarity of two indexed texts."""
+        return self._agreement(self._signature(a), b) / SIGNATURE_SIZE
+
+    def _signature(self, index: int) -> array:
+        return self._signatures[index * SIGNATURE_SIZE:(index + 1) * SIGNATURE_SIZE]
+
+    def _agreement(self, sig: list[int] | array, other: int) -> int:
+        return sum(map(operator.eq, sig, self._signature(other)))
+
+    def _find(self, index: int) -> int:
+        parent = self._parent
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
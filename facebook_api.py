@@ -1,15 +1,276 @@
-import requests
-from typing import Any
-from config import GRAPH_API_BASE_URL, PAGE_ID, PAGE_ACCESS_TOKEN
+import heapq
+import json as jsonlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from functools import cached_property
+from itertools import islice
+from typing import Any, Callable, Iterator
+from urllib.parse import urlencode
+from capabilities import CapabilityCache, is_capability_error, token_fingerprint, unsupported_fields_in_error
+from captions import CaptionEngine, load_caption_data
+from coalesce import SingleFlight
+import deadlines
+from deadlines import Cancelled
+from duplicates import DEFAULT_THRESHOLD, DuplicateIndex
+from config import (GRAPH_API_BASE_URL, PAGE_ID, PAGE_ACCESS_TOKEN, CAPABILITY_CACHE_TTL, CAPTION_SEED,
+                    GRAPH_RECORD_FILE, GRAPH_REPLAY_FILE, GRAPH_REPLAY_LATENCY, HTTP_POOL_SIZE,
+                    SCHEDULE_CALENDAR_TTL, HEDGE_READS, HEDGE_PERCENTILE, HEDGE_MAX_EXTRA, HEDGE_MIN_DELAY_MS,
+                    PREPROCESS_IMAGES, IMAGE_MAX_DIMENSION, IMAGE_QUALITY, IMAGE_WORKERS, PREFLIGHT_CACHE_TTL,
+                    PREFLIGHT_TIMEOUT, SEARCH_SYNC_TTL, SEARCH_SYNC_DAYS, GRAPH_CONCURRENCY)
+from fields import project, requested_base_fields, resolve_fields
+from hedging import HedgePolicy
+from imaging import ImagePreprocessor, local_path
+from journal import GraphRecorder, GraphReplayer, request_key
+from metrics import MetricsRegistry, endpoint_template
+from models import Comment, GraphObject, InsightValue, Photo, Post, Video, decode_page, loads
+from preflight import LIMITS, MB, MediaInspector, check, type_from_extension
+from priorities import RequestScheduler
+from progress import Progress
+from scheduling import MAX_BATCH_SIZE, ScheduleCalendar, iso_time, parse_publish_time
+from search import SearchIndex
+
+
+ENGAGEMENT_FIELDS = {"likes", "comments", "reactions", "shares"}
+
+# Graph accepts at most 50 IDs in one multi-ID (?ids=) request
+MAX_IDS_PER_REQUEST = 50
+
+# Multi-ID requests kept in flight at once by reports and thread expansion
+MULTI_ID_CONCURRENCY = 4
+
+# Replies read inline per parent comment when expanding a thread
+REPLIES_PER_PARENT = 100
+
+# Media items get_my_stories returns when no limit is given (one Graph page)
+DEFAULT_MEDIA_LIMIT = 25
+
+COMMENT_TREE_FIELDS = "id,message,from,created_time,comment_count"
+
+DUPLICATE_SCAN_FIELDS = "id,message,from,created_time"
+
+REACTION_TYPES = ("LIKE", "LOVE", "WOW", "HAHA", "SORRY", "ANGRY")
+
+# Engagement of a post in one read: shares, comment count, reaction total and one aliased count per reaction type
+REPORT_FIELDS = ",".join([
+    "shares", "comments.limit(0).summary(true)", "reactions.limit(0).summary(true)",
+    *(f"reactions.type({t}).limit(0).summary(total_count).as(reactions_{t.lower()})" for t in REACTION_TYPES),
+])
+
+# Post text and comment count read by each search index sync; comments are
+# re-read only for posts whose count changed
+SEARCH_POST_FIELDS = "id,message,created_time,comments.limit(0).summary(true)"
+SEARCH_COMMENT_FIELDS = "id,message,from,created_time"
+
+# Counters sampled for engagement trends: shares, comment count and reaction total
+SNAPSHOT_FIELDS = "shares,comments.limit(0).summary(true),reactions.limit(0).summary(true)"
+
+# Keys of the get_my_last_post output that come from differently named fields
+LAST_POST_SOURCES = {
+    "likes_count": {"likes"},
+    "comments_count": {"comments"},
+    "reactions_count": {"reactions"},
+    "shares_count": {"shares"},
+    "engagement_summary": ENGAGEMENT_FIELDS,
+}
 
 
 class FacebookAPI:
+    def __init__(self, metrics: MetricsRegistry = None):
+        # Endpoints, fields and metrics Graph has rejected for this page/token
+        self.capabilities = CapabilityCache(CAPABILITY_CACHE_TTL)
+        # Viral caption templates and phrase pools, compiled once
+        self.captions = CaptionEngine(load_caption_data(), CAPTION_SEED)
+        # Latency, errors and bytes per Graph endpoint and per MCP tool
+        self.metrics = metrics or MetricsRegistry()
+        # Journal Graph traffic to disk, or serve it back from a journal
+        if GRAPH_RECORD_FILE and GRAPH_REPLAY_FILE:
+            raise ValueError("FACEBOOK_GRAPH_RECORD and FACEBOOK_GRAPH_REPLAY cannot both be set")
+        self.recorder = GraphRecorder(GRAPH_RECORD_FILE) if GRAPH_RECORD_FILE else None
+        self.replayer = GraphReplayer(GRAPH_REPLAY_FILE, GRAPH_REPLAY_LATENCY) if GRAPH_REPLAY_FILE else None
+        # Identical GETs in flight at the same time (e.g. from concurrent sessions) share one request
+        self._inflight = SingleFlight()
+        # Caps Graph requests in flight; queued ones go out by priority class, fairly across sessions
+        self.scheduler = RequestScheduler(GRAPH_CONCURRENCY, on_wait=self.metrics.record_queue_wait)
+        # Scheduled posts indexed by publish time
+        self.schedule = ScheduleCalendar(SCHEDULE_CALENDAR_TTL)
+        # Send a backup copy of reads that are slower than usual
+        self.hedging = HedgePolicy(HEDGE_PERCENTILE, HEDGE_MAX_EXTRA, HEDGE_MIN_DELAY_MS / 1000) if HEDGE_READS else None
+        # Local photos: read for upload, and shrunk first when preprocessing is on
+        self.images = ImagePreprocessor(PREPROCESS_IMAGES, IMAGE_MAX_DIMENSION, IMAGE_QUALITY, IMAGE_WORKERS)
+        # Type, size and duration of media, checked before any upload
+        self.media = MediaInspector(self._head, PREFLIGHT_CACHE_TTL, propagate=self.metrics.propagate)
+        # Full-text index of post and comment text, synced incrementally; concurrent syncs share one run
+        self.search = SearchIndex()
+        self._search_comment_counts: dict[str, int] = {}
+        self._search_synced_at: float | None = None
+        self._search_syncs = SingleFlight()
+
+    @cached_property
+    def _http(self):
+        """Shared HTTP session, so connections to Graph are kept alive and reused."""
+        # Imported on first request: requests is a large share of startup time
+        import requests
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @property
+    def page_id(self) -> str:
+        return PAGE_ID
+
+    @cached_property
+    def _hedge_pool(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE, thread_name_prefix="graph-read")
+
     # Generic Graph API request method
-    def _request(self, method: str, endpoint: str, params: dict[str, Any], json: dict[str, Any] = None) -> dict[str, Any]:
-        url = f"{GRAPH_API_BASE_URL}/{endpoint}"
+    def _request(self, method: str, endpoint: str, params: dict[str, Any], json: dict[str, Any] = None,
+                 files: dict[str, Any] = None, form: dict[str, Any] = None) -> dict[str, Any]:
         params["access_token"] = PAGE_ACCESS_TOKEN
-        response = requests.request(method, url, params=params, json=json)
-        return response.json()
+        # Nothing new is sent once the tool call's deadline passed or it was cancelled
+        deadlines.check()
+        if self.replayer is not None:
+            start = time.perf_counter()
+            data = self.replayer.respond(method, endpoint, {**params, **(form or {})}, json)
+            self.metrics.record_graph_call(method, endpoint, time.perf_counter() - start,
+                                           _error_code(data), 0, 0)
+            return data
+        if method != "GET":
+            return self._send(method, endpoint, params, json, files, form=form)
+        key = request_key(method, endpoint, params, json)
+        try:
+            data, shared = self._inflight.do(key, lambda: self._read(endpoint, params))
+        except Cancelled:
+            # The shared read may have been stopped by another caller's deadline
+            deadlines.check()
+            data, shared = self._read(endpoint, params), False
+        if shared:
+            self.metrics.hit("coalesced")
+        return data
+
+    def _read(self, endpoint: str, params: dict[str, Any]) -> dict[str, Any]:
+        """GET, hedged when enabled: if the response is slower than the endpoint's
+        usual tail latency, a second copy is sent and the first answer wins. Time
+        spent queued in the scheduler counts neither towards the delay nor the latency."""
+        if self.hedging is None:
+            return self._send("GET", endpoint, params)
+        key = endpoint_template(endpoint)
+        delay = self.hedging.delay(key)
+        self.hedging.earn()
+        if delay is None:
+            return self._timed_read(key, endpoint, params)
+        send = self.metrics.propagate(self._timed_read)
+        sent = threading.Event()
+        primary = self._hedge_pool.submit(send, key, endpoint, params, sent)
+        # A primary that stops before getting a slot (cancelled) ends the wait as well
+        primary.add_done_callback(lambda _: sent.set())
+        # Still queued: a copy would queue behind it
+        sent.wait()
+        done, _ = wait([primary], timeout=delay)
+        if done or not self.hedging.spend():
+            return primary.result()
+        self.metrics.event("hedged_requests")
+        backup = self._hedge_pool.submit(send, key, endpoint, params)
+        for future in as_completed((primary, backup)):
+            if future.exception() is None:
+                if future is backup:
+                    self.metrics.event("hedges_won")
+                return future.result()
+        # Both copies failed
+        return primary.result()
+
+    def _timed_read(self, key: str, endpoint: str, params: dict[str, Any],
+                    sent: threading.Event = None) -> dict[str, Any]:
+        return self._send("GET", endpoint, params, sent=sent,
+                          observe=lambda seconds: self.hedging.observe(key, seconds))
+
+    def _head(self, url: str) -> tuple[int, Any]:
+        """HEAD a media URL (not Graph) for the pre-flight checks."""
+        if self.replayer is not None:
+            raise ConnectionError("Media URLs are not checked while replaying a journal")
+        deadlines.check()
+        response = self._http.head(url, allow_redirects=True, timeout=_timeout(PREFLIGHT_TIMEOUT))
+        return response.status_code, response.headers
+
+    def _send(self, method: str, endpoint: str, params: dict[str, Any], json: dict[str, Any] = None,
+              files: dict[str, Any] = None, sent: threading.Event = None,
+              observe: Callable[[float], None] = None, form: dict[str, Any] = None) -> dict[str, Any]:
+        """Send one Graph request once the scheduler admits it.
+
+        `params` go in the query string, `form` (for large payloads such as
+        batches) in a form-encoded body.
+
+        `sent` is set when the request leaves the queue, and `observe` gets the
+        seconds it then took, for the hedging latency estimate.
+        """
+        import requests
+        url = f"{GRAPH_API_BASE_URL}/{endpoint}"
+        try:
+            # Queued behind higher-priority work when all slots are taken; latency is measured from the send
+            with self.scheduler.slot():
+                start = time.perf_counter()
+                if sent is not None:
+                    sent.set()
+                # Only reads are cut short by the deadline: a write stopped midway would leave its outcome unknown
+                timeout = _timeout() if method == "GET" else None
+                response = self._http.request(method, url, params=params, data=form, json=json, files=files,
+                                              timeout=timeout)
+            data = loads(response.content)
+        except (requests.RequestException, ValueError) as e:
+            self.metrics.record_graph_call(method, endpoint, time.perf_counter() - start, type(e).__name__, 0, 0)
+            if isinstance(e, requests.Timeout):
+                # A request cut short by the deadline stops the call rather than failing one item
+                deadlines.check()
+            raise
+        elapsed = time.perf_counter() - start
+        if observe is not None:
+            observe(elapsed)
+        size = len(response.request.url or "") + len(response.request.body or b"")
+        self.metrics.record_graph_call(method, endpoint, elapsed, _error_code(data), size, len(response.content))
+        if self.recorder is not None:
+            self.recorder.record(method, endpoint, {**params, **(form or {})}, json, response.status_code, elapsed, data)
+        return data
+
+    def _capability_scope(self) -> str:
+        return f"{PAGE_ID}:{token_fingerprint(PAGE_ACCESS_TOKEN)}"
+
+    def _get_with_fields(self, endpoint: str, fields: list[str], params: dict[str, Any] = None,
+                         model: type[GraphObject] = None) -> dict[str, Any]:
+        """GET an object or edge, leaving out fields Graph is known to reject.
+        
+        If Graph rejects a field that is not cached yet, it is recorded and the
+        request is retried without it.
+        
+        Args:
+            endpoint: Graph object or edge to read
+            fields: Requested fields (may include modifiers such as "likes.summary(true)")
+            params: Extra query parameters
+            model: Decode the items of a list response into this model
+        
+        Returns:
+            dict: Graph response, plus "skipped_fields" when any field was left out
+        """
+        scope = self._capability_scope()
+        fields, skipped = self.capabilities.partition(scope, "field", fields)
+        if skipped:
+            self.metrics.hit("capability_cache", len(skipped))
+        while True:
+            response = self._request("GET", endpoint, {**(params or {}), "fields": ",".join(fields)})
+            error = response.get("error")
+            if not error or not is_capability_error(error):
+                break
+            rejected = unsupported_fields_in_error(error, fields)
+            if not rejected or len(rejected) == len(fields):
+                break
+            for field in rejected:
+                self.capabilities.mark_unsupported(scope, "field", field, error)
+            fields = [f for f in fields if f not in rejected]
+            skipped += rejected
+        if skipped:
+            response["skipped_fields"] = skipped
+        return decode_page(response, model) if model is not None else response
 
     def post_message(self, message: str) -> dict[str, Any]:
         return self._request("POST", f"{PAGE_ID}/feed", {"message": message})
@@ -17,17 +278,28 @@ class FacebookAPI:
     def reply_to_comment(self, comment_id: str, message: str) -> dict[str, Any]:
         return self._request("POST", f"{comment_id}/comments", {"message": message})
 
-    def get_posts(self) -> dict[str, Any]:
-        return self._request("GET", f"{PAGE_ID}/posts", {"fields": "id,message,created_time"})
+    def get_posts(self, profile: str = None, fields: str | list[str] = None) -> dict[str, Any]:
+        return self._get_with_fields(f"{PAGE_ID}/posts", resolve_fields("post", profile, fields, default="lean"), model=Post)
 
-    def get_comments(self, post_id: str) -> dict[str, Any]:
-        return self._request("GET", f"{post_id}/comments", {"fields": "id,message,from,created_time"})
+    def get_comments(self, post_id: str, profile: str = None, fields: str | list[str] = None) -> dict[str, Any]:
+        return self._get_with_fields(f"{post_id}/comments", resolve_fields("comment", profile, fields, default="lean"), model=Comment)
 
     def delete_post(self, post_id: str) -> dict[str, Any]:
-        return self._request("DELETE", f"{post_id}", {})
+        response = self._request("DELETE", f"{post_id}", {})
+        if "error" not in response:
+            self._unindex(post_id)
+        return response
 
     def delete_comment(self, comment_id: str) -> dict[str, Any]:
-        return self._request("DELETE", f"{comment_id}", {})
+        response = self._request("DELETE", f"{comment_id}", {})
+        if "error" not in response:
+            self.search.remove(comment_id)
+        return response
+
+    def _unindex(self, object_id: str) -> None:
+        """Drop a deleted post (with its comments) or comment from the search index."""
+        for doc_id in self.search.ids(post_id=object_id) | {object_id}:
+            self.search.remove(doc_id)
 
     def hide_comment(self, comment_id: str) -> dict[str, Any]:
         """Hide a comment from the Page."""
@@ -38,18 +310,138 @@ class FacebookAPI:
         return self._request("POST", f"{comment_id}", {"is_hidden": False})
 
     def get_insights(self, post_id: str, metric: str, period: str = "lifetime") -> dict[str, Any]:
-        return self._request("GET", f"{post_id}/insights", {"metric": metric, "period": period})
+        scope = self._capability_scope()
+        metrics, skipped = self.capabilities.partition(scope, "metric", metric.split(","))
+        if skipped:
+            self.metrics.hit("capability_cache", len(skipped))
+        if not metrics:
+            # Every metric is known to fail, answer with the recorded error
+            return {"error": self.capabilities.get(scope, "metric", skipped[0]), "skipped_metrics": skipped}
+        response = decode_page(self._fetch_insights(post_id, metrics, period, scope), InsightValue)
+        if skipped:
+            response["skipped_metrics"] = skipped
+        return response
+
+    def _fetch_insights(self, post_id: str, metrics: list[str], period: str, scope: str) -> dict[str, Any]:
+        """Request insights, isolating metrics Graph rejects.
+        
+        A single invalid or deprecated metric fails the whole request, so on a
+        metric error the list is bisected until the bad metrics are found and
+        cached. The data of the halves that succeed is merged.
+        """
+        response = self._request("GET", f"{post_id}/insights", {"metric": ",".join(metrics), "period": period})
+        error = response.get("error")
+        if not error or not is_capability_error(error) or "metric" not in error.get("message", "").lower():
+            return response
+        if len(metrics) == 1:
+            self.capabilities.mark_unsupported(scope, "metric", metrics[0], error)
+            return response
+        middle = len(metrics) // 2
+        halves = [self._fetch_insights(post_id, part, period, scope) for part in (metrics[:middle], metrics[middle:])]
+        data = [item for half in halves for item in half.get("data", [])]
+        if not data:
+            return response
+        return {"data": data, "skipped_metrics": [m for m in metrics if self.capabilities.is_unsupported(scope, "metric", m)]}
 
     def get_bulk_insights(self, post_id: str, metrics: list[str], period: str = "lifetime") -> dict[str, Any]:
         metric_str = ",".join(metrics)
         return self.get_insights(post_id, metric_str, period)
 
     def post_image_to_facebook(self, image_url: str, caption: str) -> dict[str, Any]:
-        params = {
-            "url": image_url,
-            "caption": caption
+        types, rejected = self._preflight([image_url], "post", expected="image")
+        if rejected:
+            return rejected
+        if types[image_url] != "image":
+            return {"error": f"Invalid media type. Expected image, got: {types[image_url]}", "provided_url": image_url}
+        if not local_path(image_url):
+            return self._post_photo(PAGE_ID, image_url, {"caption": caption}, {})
+        start = time.perf_counter()
+        report: dict[str, Any] = {}
+        uploads = self._prepare_uploads([image_url], report)
+        response = self._post_photo(PAGE_ID, image_url, {"caption": caption}, uploads)
+        return {**response, **report, "publish_seconds": round(time.perf_counter() - start, 3)}
+
+    def _preflight(self, media_urls: list[str], destination: str,
+                   expected: str = None) -> tuple[dict[str, str], dict[str, Any] | None]:
+        """Check every media item before anything is uploaded.
+        
+        Args:
+            media_urls: Local file paths or URLs
+            destination: "post", "story" or "message" (see preflight.LIMITS)
+            expected: Type the caller sends items of unknown type as ("image" or "video");
+                by default photos for posts and stories, file attachments for messages
+        
+        Returns:
+            tuple: The media type of each URL ("image", "video" or "file"), and an
+            error result listing every rejected item, or None when all passed
+        """
+        infos = self.media.inspect(media_urls)
+        rejected, unknown = [], 0
+        for url in dict.fromkeys(media_urls):
+            problem = check(infos[url], destination, self.images.enabled)
+            if problem:
+                rejected.append({"media_url": url, "error": problem})
+        types = {url: info["type"] for url, info in infos.items()}
+        for url, info in infos.items():
+            if info.get("unknown"):
+                # Type unknown (no extension, HEAD failed): sent as the caller expects and Graph decides
+                types[url] = expected or ("file" if destination == "message" else "image")
+                unknown += 1
+        if unknown:
+            self.metrics.event("media_unchecked", unknown)
+        if not rejected:
+            return types, None
+        self.metrics.event("media_rejected", len(rejected))
+        return types, {
+            "error": f"{len(rejected)} of {len(media_urls)} media items failed pre-flight checks; nothing was uploaded",
+            "rejected": rejected,
         }
-        return self._request("POST", f"{PAGE_ID}/photos", params)
+
+    def _prepare_uploads(self, image_urls: list[str], report: dict[str, Any]) -> dict[str, dict[str, Any]]:
+        """Read the local photos among image_urls, preprocessed in parallel when enabled.
+        
+        Args:
+            image_urls: Image URLs or local paths; URLs are left to Graph
+            report: Result dict that gets a "preprocessing" summary (bytes before
+                and after, bytes saved, seconds) when there are local photos
+        
+        Returns:
+            dict: Upload (see imaging.preprocess_image) per local image URL
+        """
+        local = {url: path for url in image_urls if (path := local_path(url))}
+        if not local:
+            return {}
+        start = time.perf_counter()
+        uploads = dict(zip(local, self.images.prepare(list(local.values()))))
+        original = sum(u["original_bytes"] for u in uploads.values())
+        final = sum(u["bytes"] for u in uploads.values())
+        processed = sum(u["processed"] for u in uploads.values())
+        largest = LIMITS["post"]["image"]
+        for upload in uploads.values():
+            # Pre-flight let it through to be shrunk, but it could not be
+            if not upload["processed"] and upload["bytes"] > largest:
+                upload["error"] = f"Image is {upload['bytes'] / MB:.1f} MB and could not be shrunk; the limit is {largest // MB} MB"
+        self.metrics.event("images_preprocessed", processed)
+        self.metrics.event("image_bytes_saved", original - final)
+        report["preprocessing"] = {
+            "images": len(uploads), "processed": processed, "original_bytes": original, "bytes": final,
+            "bytes_saved": original - final, "seconds": round(time.perf_counter() - start, 3),
+        }
+        warnings = [{"media_url": url, "warning": u["warning"]} for url, u in uploads.items() if "warning" in u]
+        if warnings:
+            report["preprocessing"]["warnings"] = warnings
+        return uploads
+
+    def _post_photo(self, target: str, image_url: str, params: dict[str, Any], uploads: dict[str, dict[str, Any]],
+                    url_field: str = "url") -> dict[str, Any]:
+        """POST a photo to target/photos: uploaded from `uploads` when local, else by URL."""
+        upload = uploads.get(image_url)
+        if upload is None:
+            return self._request("POST", f"{target}/photos", {url_field: image_url, **params})
+        if "error" in upload:
+            return {"error": upload["error"]}
+        return self._request("POST", f"{target}/photos", params,
+                             files={"source": (upload["filename"], upload["data"], upload["content_type"])})
     
     def send_dm_to_user(self, user_id: str, message: str) -> dict[str, Any]:
         payload = {
@@ -70,14 +462,18 @@ class FacebookAPI:
         Returns:
             dict: Response from Facebook Messenger API
         """
+        types, rejected = self._preflight(media_urls, "message")
+        if rejected:
+            return rejected
+
         # First send the text message
         text_response = self.send_dm_to_user(user_id, message)
         
         # Then send each media attachment
         media_responses = []
+        progress = Progress(len(media_urls))
         for media_url in media_urls:
-            # Determine if it's an image or video based on file extension
-            media_type = self._get_media_type(media_url)
+            media_type = types[media_url]
             
             if media_type == "image":
                 payload = {
@@ -116,6 +512,7 @@ class FacebookAPI:
             
             response = self._request("POST", "me/messages", {}, json=payload)
             media_responses.append({"media_url": media_url, "response": response})
+            progress.step(media_url, response, media_responses[-1])
         
         return {
             "text_message": text_response,
@@ -124,14 +521,8 @@ class FacebookAPI:
         }
     
     def _get_media_type(self, url: str) -> str:
-        """Determine media type based on file extension."""
-        url_lower = url.lower()
-        if any(ext in url_lower for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']):
-            return "image"
-        elif any(ext in url_lower for ext in ['.mp4', '.mov', '.avi', '.mkv', '.webm']):
-            return "video"
-        else:
-            return "file"
+        """Determine media type based on file extension (see _preflight for the checked type)."""
+        return type_from_extension(url)
     
     def update_post(self, post_id: str, new_message: str) -> dict[str, Any]:
         return self._request("POST", f"{post_id}", {"message": new_message})
@@ -142,7 +533,112 @@ class FacebookAPI:
             "published": False,
             "scheduled_publish_time": publish_time,
         }
-        return self._request("POST", f"{PAGE_ID}/feed", params)
+        response = self._request("POST", f"{PAGE_ID}/feed", params)
+        if "id" in response:
+            self.schedule.add(response["id"], message, int(publish_time))
+        return response
+
+    def _batch(self, operations: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Run operations through Graph batch requests, 50 per HTTP request.
+        
+        Args:
+            operations: Dicts with "method", "relative_url", an optional "body" (params
+                or an encoded string) and optional "name", "depends_on" and
+                "omit_response_on_success" for references between operations
+        
+        Returns:
+            list: The decoded response of each operation, in order
+        """
+        results = []
+        for start in range(0, len(operations), MAX_BATCH_SIZE):
+            chunk = operations[start:start + MAX_BATCH_SIZE]
+            batch = [
+                {"method": op["method"], "relative_url": op["relative_url"],
+                 **({"body": op["body"] if isinstance(op["body"], str) else urlencode(op["body"])} if op.get("body") else {}),
+                 **{k: op[k] for k in ("name", "depends_on", "omit_response_on_success") if k in op}}
+                for op in chunk
+            ]
+            # In the body: 50 operations with full messages are far too long for a URL
+            response = self._request("POST", "", {}, form={"batch": jsonlib.dumps(batch), "include_headers": "false"})
+            if not isinstance(response, list):
+                # The whole batch failed; every operation gets the error
+                results.extend(dict(response) for _ in chunk)
+                continue
+            for item in response:
+                if item is None:
+                    results.append({"error": {"message": "Batch operation timed out and was not run", "code": 2}})
+                else:
+                    results.append(jsonlib.loads(item.get("body") or "{}"))
+        return results
+
+    def _refresh_schedule(self, force: bool = False) -> dict[str, Any] | None:
+        """Reload the calendar from Graph when stale; returns the Graph error if that fails."""
+        if not force and not self.schedule.is_stale():
+            return None
+        endpoint = f"{PAGE_ID}/scheduled_posts"
+        params = {"fields": "id,message,scheduled_publish_time", "limit": 100}
+        first_page = self._request("GET", endpoint, dict(params))
+        if "error" in first_page:
+            return first_page
+        self.schedule.load(list(self._iter_edge(endpoint, params, first_page, Post)))
+        return None
+
+    def schedule_posts_bulk(self, entries: list[dict[str, Any]], min_gap_minutes: int = 30, dry_run: bool = False) -> dict[str, Any]:
+        """Validate entries against the calendar and schedule them with batched requests.
+        
+        Args:
+            entries: Dicts with "message" and "publish_time" (unix timestamp or ISO 8601)
+            min_gap_minutes: Minimum spacing between scheduled posts
+            dry_run: Only validate, schedule nothing
+        
+        Returns:
+            dict: Per-entry results and how many were scheduled or rejected
+        """
+        error = self._refresh_schedule()
+        if error:
+            return error
+        results = self.schedule.validate(entries, min_gap_minutes * 60)
+        accepted = [r for r in results if r["status"] == "ok"]
+        if accepted and not dry_run:
+            responses = self._batch([
+                {"method": "POST", "relative_url": f"{PAGE_ID}/feed",
+                 "body": {"message": r["message"], "published": "false", "scheduled_publish_time": r["publish_time"]}}
+                for r in accepted
+            ])
+            for result, response in zip(accepted, responses):
+                if "id" in response:
+                    result.update(status="scheduled", post_id=response["id"])
+                    self.schedule.add(response["id"], result["message"], result["publish_time"])
+                else:
+                    result.update(status="failed", errors=[response.get("error", {}).get("message", "Unknown error")])
+        for result in results:
+            result.pop("message", None)
+            if result["publish_time"] is not None:
+                result["scheduled_time"] = iso_time(result["publish_time"])
+        counts = {status: sum(r["status"] == status for r in results) for status in ("ok", "scheduled", "rejected", "failed")}
+        return {
+            "dry_run": dry_run,
+            "scheduled": counts["scheduled"],
+            "valid": counts["ok"] + counts["scheduled"],
+            "rejected": counts["rejected"],
+            "failed": counts["failed"],
+            "results": results,
+        }
+
+    def list_scheduled_posts(self, start: int | str = None, end: int | str = None, refresh: bool = False) -> dict[str, Any]:
+        """Scheduled posts with publish time in [start, end], from the local calendar."""
+        try:
+            start_time = parse_publish_time(start) if start not in (None, "") else None
+            end_time = parse_publish_time(end) if end not in (None, "") else None
+        except ValueError as e:
+            return {"error": str(e)}
+        error = self._refresh_schedule(force=refresh)
+        if error:
+            return error
+        posts = self.schedule.between(start_time, end_time)
+        for post in posts:
+            post["scheduled_time"] = iso_time(post["publish_time"])
+        return {"data": posts, "count": len(posts)}
 
     def get_page_fan_count(self) -> int:
         data = self._request("GET", f"{PAGE_ID}", {"fields": "fan_count"})
@@ -151,6 +647,438 @@ class FacebookAPI:
     def get_post_share_count(self, post_id: str) -> int:
         data = self._request("GET", f"{post_id}", {"fields": "shares"})
         return data.get("shares", {}).get("count", 0)
+
+    def get_comment_tree(self, post_id: str, max_depth: int = 3) -> dict[str, Any]:
+        """Read a post's comments with their reply threads, breadth-first.
+        
+        Top-level comments are read from the post's comments edge. Each
+        further level is read with multi-ID requests that expand the replies
+        of up to 50 parent comments at once (comments.limit(100){...}), a few
+        requests at a time; only comments with replies are expanded. Parents
+        with more replies than fit inline are paged separately.
+        
+        Args:
+            post_id: Post whose comments are read
+            max_depth: Levels to read; 1 is top-level comments only
+        
+        Returns:
+            dict: "comments" as a flat breadth-first list where each comment has a
+            "parent_id" (None at the top), its "depth" and "author_id"; "authors"
+            maps author IDs to names. "truncated" is True when replies deeper
+            than max_depth were left out
+        """
+        max_depth = max(1, min(int(max_depth), 10))
+        params = {"fields": COMMENT_TREE_FIELDS, "limit": 100}
+        first_page = self._request("GET", f"{post_id}/comments", {**params, "filter": "toplevel"})
+        if "error" in first_page:
+            return first_page
+
+        nodes: list[dict[str, Any]] = []
+        authors: dict[str, str] = {}
+        errors = []
+
+        def add(comment: Comment, parent_id: str | None, depth: int) -> bool:
+            author = comment.get("from") or {}
+            if author.get("id"):
+                authors[author["id"]] = author.get("name")
+            nodes.append({
+                "id": comment["id"],
+                "parent_id": parent_id,
+                "depth": depth,
+                "author_id": author.get("id"),
+                "message": comment.get("message", ""),
+                "created_time": comment.get("created_time"),
+                "reply_count": comment.get("comment_count", 0),
+            })
+            return bool(comment.get("comment_count"))
+
+        level = [c["id"] for c in self._iter_edge(f"{post_id}/comments", {**params, "filter": "toplevel"}, first_page, Comment)
+                 if add(c, None, 1)]
+        depth = 1
+        fetch = self.metrics.propagate(self._request)
+        expand = f"comments.limit({REPLIES_PER_PARENT}){{{COMMENT_TREE_FIELDS}}}"
+        with ThreadPoolExecutor(max_workers=MULTI_ID_CONCURRENCY) as executor:
+            while level and depth < max_depth:
+                depth += 1
+                chunks = [level[i:i + MAX_IDS_PER_REQUEST] for i in range(0, len(level), MAX_IDS_PER_REQUEST)]
+                requests = [executor.submit(fetch, "GET", "", {"ids": ",".join(chunk), "fields": expand}) for chunk in chunks]
+                level = []
+                for chunk, request in zip(chunks, requests):
+                    response = request.result()
+                    if "error" in response:
+                        errors.append(response["error"])
+                        continue
+                    for parent_id in chunk:
+                        replies = response.get(parent_id, {}).get("comments", {"data": []})
+                        for reply in self._iter_edge(f"{parent_id}/comments", params, replies, Comment):
+                            if add(reply, parent_id, depth):
+                                level.append(reply["id"])
+
+        result = {
+            "post_id": post_id,
+            "comments": nodes,
+            "authors": authors,
+            "count": len(nodes),
+            "depth": max((n["depth"] for n in nodes), default=0),
+            "truncated": bool(level),
+        }
+        if errors:
+            result["errors"] = errors
+        return result
+
+    def find_duplicate_comments(self, post_ids: list[str] = None, since: int | str = None,
+                                threshold: float = DEFAULT_THRESHOLD, min_cluster_size: int = 3) -> dict[str, Any]:
+        """Find groups of near-identical comments, such as spam copied across posts.
+        
+        Comments of up to 50 posts are read per multi-ID request, a few requests
+        at a time, and indexed as they arrive (see duplicates.DuplicateIndex),
+        so the scan is linear in the number of comments. Comments that differ
+        only by a few characters, case, punctuation or emoji are grouped.
+        
+        Args:
+            post_ids: Posts to scan. Defaults to the page's posts since `since`
+            since: Start of the post window (unix timestamp or ISO 8601) when post_ids is not given. Defaults to 7 days ago
+            threshold: Similarity (0-1) above which two comments are duplicates
+            min_cluster_size: Smallest group reported
+        
+        Returns:
+            dict: "clusters", largest first, each with a sample "message", its
+            "comment_ids", "post_ids", "author_count" and the lowest estimated
+            similarity to the sample ("min_similarity"); "comment_ids" lists the
+            comments of all clusters, ready for bulk_hide_comments
+        """
+        if not 0 < threshold <= 1:
+            return {"error": "threshold must be between 0 and 1"}
+        if post_ids is None:
+            try:
+                since_time = parse_publish_time(since) if since is not None else int(time.time()) - 7 * 86400
+            except ValueError as e:
+                return {"error": str(e)}
+            endpoint = f"{PAGE_ID}/posts"
+            params = {"fields": "id", "since": since_time, "limit": 100}
+            first_page = self._request("GET", endpoint, dict(params))
+            if "error" in first_page:
+                return first_page
+            post_ids = (post["id"] for post in self._iter_edge(endpoint, params, first_page))
+
+        index = DuplicateIndex(threshold)
+        comments: list[tuple[str, dict[str, Any]]] = []
+        errors = []
+        scanned_posts = 0
+        fetch = self.metrics.propagate(self._request)
+        params = {"fields": DUPLICATE_SCAN_FIELDS, "limit": 100}
+        expand = f"comments.limit(100){{{DUPLICATE_SCAN_FIELDS}}}"
+        with ThreadPoolExecutor(max_workers=MULTI_ID_CONCURRENCY) as executor:
+            requests, chunk = [], []
+            for post_id in post_ids:
+                scanned_posts += 1
+                chunk.append(post_id)
+                if len(chunk) == MAX_IDS_PER_REQUEST:
+                    requests.append((chunk, executor.submit(fetch, "GET", "", {"ids": ",".join(chunk), "fields": expand})))
+                    chunk = []
+            if chunk:
+                requests.append((chunk, executor.submit(fetch, "GET", "", {"ids": ",".join(chunk), "fields": expand})))
+            for chunk, request in requests:
+                response = request.result()
+                if "error" in response:
+                    errors.append(response["error"])
+                    continue
+                for post_id in chunk:
+                    page = response.get(post_id, {}).get("comments", {"data": []})
+                    for comment in self._iter_edge(f"{post_id}/comments", params, page, Comment):
+                        if index.add(comment.get("message")) is not None:
+                            comments.append((post_id, comment))
+
+        clusters = []
+        for members in index.clusters(min_cluster_size):
+            found = [comments[i] for i in members]
+            clusters.append({
+                "size": len(found),
+                "message": found[0][1].get("message", ""),
+                "min_similarity": round(min(index.similarity(members[0], i) for i in members[1:]), 2),
+                "comment_ids": [comment["id"] for _, comment in found],
+                "post_ids": sorted({post_id for post_id, _ in found}),
+                "author_count": len({(comment.get("from") or {}).get("id") for _, comment in found}),
+            })
+        result = {
+            "clusters": clusters,
+            "comment_ids": [cid for cluster in clusters for cid in cluster["comment_ids"]],
+            "posts_scanned": scanned_posts,
+            "comments_scanned": len(index),
+        }
+        if errors:
+            result["errors"] = errors
+        return result
+
+    def sync_search_index(self, full: bool = False) -> dict[str, Any]:
+        """Bring the search index up to date with the page's recent posts and their comments.
+        
+        Posts of the last SEARCH_SYNC_DAYS are listed with their comment count.
+        Post text is (re)indexed from the listing. Comments are read, 50 posts
+        per multi-ID request, only for posts whose count changed since the last
+        sync, and comments that are gone are dropped. Coalesced: concurrent
+        callers asking for the same kind of sync (incremental or full) share one.
+        
+        Args:
+            full: Re-read the comments of every post (picks up edited comments)
+        
+        Returns:
+            dict: Posts listed and refreshed, comments added and removed, and the index size
+        """
+        result, _ = self._search_syncs.do(("sync", full), lambda: self._sync_search_index(full))
+        return result
+
+    def _sync_search_index(self, full: bool) -> dict[str, Any]:
+        start = time.perf_counter()
+        endpoint = f"{PAGE_ID}/posts"
+        cutoff = int(time.time()) - SEARCH_SYNC_DAYS * 86400
+        params = {"fields": SEARCH_POST_FIELDS, "since": cutoff, "limit": 100}
+        first_page = self._request("GET", endpoint, dict(params))
+        if "error" in first_page:
+            return first_page
+
+        counts, changed, listed = self._search_comment_counts, {}, 0
+        for post in self._iter_edge(endpoint, params, first_page):
+            listed += 1
+            self.search.add(post["id"], "post", post.get("message"), post_id=post["id"],
+                            created_time=_timestamp(post.get("created_time")))
+            count = _summary_total(post, "comments")
+            if full or counts.get(post["id"]) != count:
+                changed[post["id"]] = count
+
+        added = removed = 0
+        # Posts that aged out of the window leave with their comments
+        for post_id in self.search.ids("post", before=cutoff):
+            removed += sum(self.search.remove(c) for c in self.search.ids("comment", post_id))
+            self.search.remove(post_id)
+            counts.pop(post_id, None)
+        errors = []
+        ids = list(changed)
+        chunks = [ids[i:i + MAX_IDS_PER_REQUEST] for i in range(0, len(ids), MAX_IDS_PER_REQUEST)]
+        params = {"fields": SEARCH_COMMENT_FIELDS, "limit": 100}
+        expand = f"comments.limit(100){{{SEARCH_COMMENT_FIELDS}}}"
+        fetch = self.metrics.propagate(self._request)
+        with ThreadPoolExecutor(max_workers=MULTI_ID_CONCURRENCY) as executor:
+            requests = [(chunk, executor.submit(fetch, "GET", "", {"ids": ",".join(chunk), "fields": expand}))
+                        for chunk in chunks]
+            for chunk, request in requests:
+                response = request.result()
+                if "error" in response:
+                    errors.append(response["error"])
+                    continue
+                for post_id in chunk:
+                    page = response.get(post_id, {}).get("comments", {"data": []})
+                    seen = set()
+                    for comment in self._iter_edge(f"{post_id}/comments", params, page, Comment):
+                        seen.add(comment["id"])
+                        author = comment.get("from") or {}
+                        added += self.search.add(comment["id"], "comment", comment.get("message"), post_id=post_id,
+                                                 author_id=author.get("id"), author_name=author.get("name"),
+                                                 created_time=_timestamp(comment.get("created_time")))
+                    for gone in self.search.ids("comment", post_id) - seen:
+                        removed += self.search.remove(gone)
+                    counts[post_id] = changed[post_id]
+
+        self._search_synced_at = time.monotonic()
+        self.metrics.event("search_index_syncs")
+        result = {
+            "posts_listed": listed,
+            "posts_refreshed": len(changed),
+            "comments_added": added,
+            "comments_removed": removed,
+            "documents": len(self.search),
+            "terms": self.search.term_count,
+            "sync_seconds": round(time.perf_counter() - start, 3),
+        }
+        if errors:
+            result["errors"] = errors
+        return result
+
+    def search_comments(self, query: str, post_id: str = None, author_id: str = None, since: int | str = None,
+                        until: int | str = None, kind: str = "comment", limit: int = 20,
+                        refresh: bool = False) -> dict[str, Any]:
+        """Full-text search over the page's comments (and posts) from the local index.
+        
+        The index is synced first when it is older than SEARCH_SYNC_TTL (only
+        posts with new or deleted comments are re-read) or when `refresh` is
+        set; otherwise no Graph call is made.
+        
+        Args:
+            query: Words to find, accents and case ignored; "word*" matches by prefix
+            post_id: Only comments of this post
+            author_id: Only comments by this user
+            since: Only items created from this time (unix timestamp or ISO 8601)
+            until: Only items created before this time
+            kind: "comment", "post" or "all"
+            limit: Results returned
+            refresh: Sync now, re-reading every post's comments
+        
+        Returns:
+            dict: Ranked "results" with their message, author, post and score, the
+            "total" number of matches and "index" status (size, last sync)
+        """
+        if kind not in ("comment", "post", "all"):
+            return {"error": "kind must be 'comment', 'post' or 'all'"}
+        try:
+            since_time = parse_publish_time(since) if since is not None else None
+            until_time = parse_publish_time(until) if until is not None else None
+        except ValueError as e:
+            return {"error": str(e)}
+        sync = None
+        if refresh or self._search_synced_at is None or time.monotonic() - self._search_synced_at > SEARCH_SYNC_TTL:
+            sync = self.sync_search_index(full=refresh)
+            if "error" in sync and not len(self.search):
+                return sync
+        start = time.perf_counter()
+        found = self.search.search(query, None if kind == "all" else kind, post_id, author_id, since_time, until_time, limit)
+        found["search_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        found["index"] = {
+            "documents": len(self.search),
+            "synced_seconds_ago": round(time.monotonic() - self._search_synced_at) if self._search_synced_at else None,
+        }
+        if sync is not None:
+            found["sync"] = sync
+        return found
+
+    def get_page_engagement_report(self, since: int | str = None, until: int | str = None) -> dict[str, Any]:
+        """Rank the page's posts in a time window by engagement.
+        
+        Posts are listed from the posts edge with since/until. Their engagement
+        (shares, comment count, reactions by type) is read with multi-ID
+        requests of up to 50 posts, a few at a time, each one sent as soon as
+        its posts have been listed. Totals, rankings and top posts are then
+        computed locally.
+        
+        Args:
+            since: Start of the window (unix timestamp or ISO 8601). Defaults to 7 days before `until`
+            until: End of the window. Defaults to now
+        
+        Returns:
+            dict: "posts" ranked by engagement (reactions + comments + shares) with
+            their reaction mix, page "totals" and the "top" post for each metric
+        """
+        try:
+            until_time = parse_publish_time(until) if until is not None else int(time.time())
+            since_time = parse_publish_time(since) if since is not None else until_time - 7 * 86400
+        except ValueError as e:
+            return {"error": str(e)}
+        if since_time > until_time:
+            return {"error": "since must be before until"}
+        endpoint = f"{PAGE_ID}/posts"
+        params = {"fields": "id,message,created_time,permalink_url", "since": since_time, "until": until_time, "limit": 100}
+        first_page = self._request("GET", endpoint, dict(params))
+        if "error" in first_page:
+            return first_page
+
+        posts, requests = [], []
+        with ThreadPoolExecutor(max_workers=MULTI_ID_CONCURRENCY) as executor:
+            fetch = self.metrics.propagate(self._request)
+            batch = []
+            for post in self._iter_edge(endpoint, params, first_page, Post):
+                posts.append(post)
+                batch.append(post["id"])
+                if len(batch) == MAX_IDS_PER_REQUEST:
+                    requests.append(executor.submit(fetch, "GET", "", {"ids": ",".join(batch), "fields": REPORT_FIELDS}))
+                    batch = []
+            if batch:
+                requests.append(executor.submit(fetch, "GET", "", {"ids": ",".join(batch), "fields": REPORT_FIELDS}))
+            engagement, errors = {}, []
+            for request in requests:
+                response = request.result()
+                if "error" in response:
+                    errors.append(response["error"])
+                else:
+                    engagement.update(response)
+
+        mix_keys = [t.lower() for t in REACTION_TYPES]
+        totals = {"reactions": 0, "comments": 0, "shares": 0, "engagement": 0, "reaction_mix": dict.fromkeys(mix_keys, 0)}
+        top: dict[str, dict[str, Any]] = {}
+        rows, unavailable = [], []
+        for post in posts:
+            data = engagement.get(post["id"])
+            if data is None:
+                unavailable.append(post["id"])
+                continue
+            row = {
+                "id": post["id"],
+                "message": post.get("message", ""),
+                "created_time": post.get("created_time"),
+                "permalink_url": post.get("permalink_url"),
+                "reactions": _summary_total(data, "reactions"),
+                "comments": _summary_total(data, "comments"),
+                "shares": data.get("shares", {}).get("count", 0),
+                "reaction_mix": {key: _summary_total(data, f"reactions_{key}") for key in mix_keys},
+            }
+            row["engagement"] = row["reactions"] + row["comments"] + row["shares"]
+            for metric in ("reactions", "comments", "shares", "engagement"):
+                totals[metric] += row[metric]
+                if metric not in top or row[metric] > top[metric]["value"]:
+                    top[metric] = {"id": row["id"], "value": row[metric]}
+            for key, count in row["reaction_mix"].items():
+                totals["reaction_mix"][key] += count
+            rows.append(row)
+        rows.sort(key=lambda r: r["engagement"], reverse=True)
+        for rank, row in enumerate(rows, 1):
+            row["rank"] = rank
+
+        report = {
+            "since": iso_time(since_time),
+            "until": iso_time(until_time),
+            "post_count": len(rows),
+            "totals": totals,
+            "top": top,
+            "posts": rows,
+        }
+        if unavailable:
+            report["unavailable"] = unavailable
+            report["errors"] = errors
+        return report
+    
+    def sample_engagement(self, max_age: int) -> dict[str, Any]:
+        """Current engagement counters of the posts published in the last `max_age` seconds.
+        
+        One listing of the posts edge, then one multi-ID read per 50 posts, a
+        few at a time. Used by the engagement snapshotter (see trends).
+        
+        Args:
+            max_age: Age in seconds of the oldest post sampled
+        
+        Returns:
+            dict: Sample "time" and "posts" by ID, each with reactions, comments,
+            shares, message, created_time and permalink_url; "error" when some or
+            all counters could not be read
+        """
+        now = int(time.time())
+        endpoint = f"{PAGE_ID}/posts"
+        params = {"fields": "id,message,created_time,permalink_url", "since": now - max_age, "limit": 100}
+        first_page = self._request("GET", endpoint, dict(params))
+        if "error" in first_page:
+            return {"time": now, "posts": {}, "error": first_page["error"]}
+        posts = {post["id"]: post for post in self._iter_edge(endpoint, params, first_page, Post)}
+        ids = list(posts)
+        chunks = [ids[i:i + MAX_IDS_PER_REQUEST] for i in range(0, len(ids), MAX_IDS_PER_REQUEST)]
+        fetch = self.metrics.propagate(self._request)
+        with ThreadPoolExecutor(max_workers=MULTI_ID_CONCURRENCY) as executor:
+            responses = list(executor.map(lambda chunk: fetch("GET", "", {"ids": ",".join(chunk), "fields": SNAPSHOT_FIELDS}), chunks))
+        sample, errors = {}, []
+        for response in responses:
+            if "error" in response:
+                errors.append(response["error"])
+                continue
+            for post_id, data in response.items():
+                post = posts[post_id]
+                sample[post_id] = {
+                    "reactions": _summary_total(data, "reactions"),
+                    "comments": _summary_total(data, "comments"),
+                    "shares": data.get("shares", {}).get("count", 0),
+                    "message": (post.get("message") or "")[:100],
+                    "created_time": post.get("created_time"),
+                    "permalink_url": post.get("permalink_url"),
+                }
+        result = {"time": int(time.time()), "posts": sample}
+        if errors:
+            result["error"] = errors[0]
+        return result
     
     def create_storie_list_media(self, media_urls: list[str]) -> dict[str, Any]:
         """Create and publish Facebook Stories from a list of media URLs.
@@ -161,18 +1089,21 @@ class FacebookAPI:
         Returns:
             dict: Response with results from all story creations
         """
+        start = time.perf_counter()
+        types, rejected = self._preflight(media_urls, "story")
+        if rejected:
+            return rejected
         story_responses = []
+        report: dict[str, Any] = {}
+        uploads = self._prepare_uploads([url for url in media_urls if types[url] == "image"], report)
+        progress = Progress(len(media_urls))
         
         for media_url in media_urls:
-            media_type = self._get_media_type(media_url)
+            media_type = types[media_url]
             
             if media_type == "image":
                 # Create image story
-                params = {
-                    "source": media_url,
-                    "published": True
-                }
-                response = self._request("POST", f"{PAGE_ID}/photos", params)
+                response = self._post_photo(PAGE_ID, media_url, {"published": True}, uploads, url_field="source")
                 
             elif media_type == "video":
                 # Create video story
@@ -195,18 +1126,21 @@ class FacebookAPI:
                 "media_type": media_type,
                 "response": response
             })
+            progress.step(media_url, response, story_responses[-1])
         
         return {
             "stories_created": len([r for r in story_responses if "error" not in r["response"]]),
             "total_media_processed": len(media_urls),
-            "results": story_responses
+            "results": story_responses,
+            **report,
+            "publish_seconds": round(time.perf_counter() - start, 3),
         }
     
     def get_my_stories(self, limit: int = None) -> dict[str, Any]:
         """Get the list of recent stories from the page.
         
         Args:
-            limit: Optional number of stories to retrieve. If None, gets all available stories.
+            limit: Optional number of stories to retrieve. If None, one page of the most recent ones.
         
         Returns:
             dict: Response with list of stories and metadata
@@ -224,65 +1158,20 @@ class FacebookAPI:
         # Note: Facebook Graph API uses different endpoints for stories
         # We'll try to get recent media posts that could include stories
         try:
+            # Skip the stories endpoint when it is known to fail for this page
+            scope = self._capability_scope()
+            if self.capabilities.is_unsupported(scope, "endpoint", "stories"):
+                self.metrics.hit("capability_cache")
+                return self._get_recent_media(limit)
+            
             # First try to get stories directly (if available)
             stories_response = self._request("GET", f"{PAGE_ID}/stories", params)
             
             # If stories endpoint doesn't work, fallback to recent media
             if "error" in stories_response:
-                # Fallback: get recent photos and videos which might include story content
-                media_params = {
-                    "fields": "id,created_time,permalink_url,source,images,videos,caption",
-                    "type": "uploaded"
-                }
-                if limit is not None and limit > 0:
-                    media_params["limit"] = limit
-                
-                photos_response = self._request("GET", f"{PAGE_ID}/photos", media_params)
-                videos_response = self._request("GET", f"{PAGE_ID}/videos", media_params)
-                
-                # Combine and format the results
-                all_media = []
-                
-                # Add photos
-                if "data" in photos_response:
-                    for photo in photos_response["data"]:
-                        all_media.append({
-                            "id": photo.get("id"),
-                            "created_time": photo.get("created_time"),
-                            "permalink_url": photo.get("permalink_url"),
-                            "media_type": "photo",
-                            "media_url": photo.get("source"),
-                            "thumbnail_url": photo.get("images", [{}])[0].get("source") if photo.get("images") else None,
-                            "caption": photo.get("caption", "")
-                        })
-                
-                # Add videos
-                if "data" in videos_response:
-                    for video in videos_response["data"]:
-                        all_media.append({
-                            "id": video.get("id"),
-                            "created_time": video.get("created_time"),
-                            "permalink_url": video.get("permalink_url"),
-                            "media_type": "video",
-                            "media_url": video.get("source"),
-                            "thumbnail_url": video.get("picture"),
-                            "caption": video.get("description", "")
-                        })
-                
-                # Sort by creation time (most recent first)
-                all_media.sort(key=lambda x: x.get("created_time", ""), reverse=True)
-                
-                # Apply limit if specified
-                if limit is not None and limit > 0:
-                    all_media = all_media[:limit]
-                
-                return {
-                    "data": all_media,
-                    "total_count": len(all_media),
-                    "limit_applied": limit,
-                    "source": "fallback_media_endpoint",
-                    "message": "Retrieved recent media content (photos and videos) as story data"
-                }
+                if is_capability_error(stories_response["error"]):
+                    self.capabilities.mark_unsupported(scope, "endpoint", "stories", stories_response["error"])
+                return self._get_recent_media(limit)
             
             # If stories endpoint worked, return the stories
             stories_data = stories_response.get("data", [])
@@ -302,20 +1191,121 @@ class FacebookAPI:
                 "limit_applied": limit
             }
     
-    def get_my_last_post(self) -> dict[str, Any]:
+    def _get_recent_media(self, limit: int = None) -> dict[str, Any]:
+        """Get recent photos and videos merged newest-first, as story data.
+        
+        Both edges are read concurrently and paged lazily. Graph returns each
+        edge already ordered by creation time, so the two streams are merged
+        with a heap and only the first `limit` items are ever materialized.
+        
+        Args:
+            limit: Number of items to return. If None, the DEFAULT_MEDIA_LIMIT most recent ones;
+                the library is never read further than the items returned need.
+        
+        Returns:
+            dict: Response with the merged media list and metadata
+        """
+        # Each edge only gets fields that exist on its node type, otherwise
+        # Graph rejects the whole request
+        photo_params = {
+            "fields": "id,created_time,permalink_url,source,images,name",
+            "type": "uploaded"
+        }
+        video_params = {
+            "fields": "id,created_time,permalink_url,source,picture,description",
+            "type": "uploaded"
+        }
+        if limit is None or limit <= 0:
+            limit = DEFAULT_MEDIA_LIMIT
+        # No stream can contribute more than `limit` items
+        photo_params["limit"] = video_params["limit"] = limit
+        
+        # Fetch the first page of both edges concurrently
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            request = self.metrics.propagate(self._request)
+            photos_page = executor.submit(request, "GET", f"{PAGE_ID}/photos", dict(photo_params))
+            videos_page = executor.submit(request, "GET", f"{PAGE_ID}/videos", dict(video_params))
+            photos_first, videos_first = photos_page.result(), videos_page.result()
+        
+        photos = map(self._format_photo_as_story, self._iter_edge(f"{PAGE_ID}/photos", photo_params, photos_first, Photo))
+        videos = map(self._format_video_as_story, self._iter_edge(f"{PAGE_ID}/videos", video_params, videos_first, Video))
+        
+        # Most recent first; ISO-8601 timestamps from Graph sort lexicographically
+        merged = heapq.merge(photos, videos, key=lambda x: x.get("created_time") or "", reverse=True)
+        
+        all_media = list(islice(merged, limit))
+        
+        return {
+            "data": all_media,
+            "total_count": len(all_media),
+            "limit_applied": limit,
+            "source": "fallback_media_endpoint",
+            "message": "Retrieved recent media content (photos and videos) as story data"
+        }
+    
+    def _iter_edge(self, endpoint: str, params: dict[str, Any], first_page: dict[str, Any] = None,
+                   model: type[GraphObject] = None) -> Iterator[dict[str, Any]]:
+        """Lazily yield the items of a paginated edge, fetching pages on demand.
+        
+        Args:
+            endpoint: Graph edge to read (e.g. "{page_id}/photos")
+            params: Query parameters for every page request
+            first_page: Optional already-fetched first page
+            model: Decode each item into this model
+        
+        Yields:
+            dict: Each item of the edge, in the order returned by Graph
+        """
+        page = first_page if first_page is not None else self._request("GET", endpoint, dict(params))
+        while "error" not in page:
+            yield from (decode_page(page, model) if model is not None else page).get("data", [])
+            paging = page.get("paging", {})
+            after = paging.get("cursors", {}).get("after")
+            if not after or "next" not in paging:
+                return
+            page = self._request("GET", endpoint, {**params, "after": after})
+    
+    def _format_photo_as_story(self, photo: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "id": photo.get("id"),
+            "created_time": photo.get("created_time"),
+            "permalink_url": photo.get("permalink_url"),
+            "media_type": "photo",
+            "media_url": photo.get("source"),
+            "thumbnail_url": photo.get("images", [{}])[0].get("source") if photo.get("images") else None,
+            "caption": photo.get("name", "")
+        }
+    
+    def _format_video_as_story(self, video: dict[str, Any]) -> dict[str, Any]:
+        return {
+            "id": video.get("id"),
+            "created_time": video.get("created_time"),
+            "permalink_url": video.get("permalink_url"),
+            "media_type": "video",
+            "media_url": video.get("source"),
+            "thumbnail_url": video.get("picture"),
+            "caption": video.get("description", "")
+        }
+    
+    def get_my_last_post(self, profile: str = None, fields: str | list[str] = None) -> dict[str, Any]:
         """Get the most recent post from the page.
         
+        Args:
+            profile: Field profile to fetch ("id", "lean", "engagement", "full"). Defaults to "full"
+            fields: Explicit fields to fetch instead of a profile
+        
         Returns:
             dict: Response with the last post data and metadata
         """
         try:
-            # Get the most recent post with comprehensive fields
+            # Get the most recent post with only the projected fields, skipping
+            # fields Graph is known to reject for this page
+            fields = resolve_fields("post", profile, fields, default="full")
             params = {
-                "fields": "id,message,created_time,updated_time,permalink_url,full_picture,picture,type,status_type,story,description,caption,name,link,source,place,privacy,shares,likes.summary(true),comments.summary(true),reactions.summary(true)",
                 "limit": 1  # Only get the most recent post
             }
             
-            response = self._request("GET", f"{PAGE_ID}/posts", params)
+            response = self._get_with_fields(f"{PAGE_ID}/posts", fields, params, model=Post)
             
             if "error" in response:
                 return {
@@ -372,7 +1362,7 @@ class FacebookAPI:
                 }
             }
             
-            return {
+            result = {
                 "data": enhanced_post,
                 "found": True,
                 "message": "Successfully retrieved the most recent post",
@@ -389,6 +1379,20 @@ class FacebookAPI:
                 }
             }
             
+            # Only return what was asked for
+            requested = requested_base_fields(fields)
+            result["data"] = project(enhanced_post, fields, LAST_POST_SOURCES)
+            if not requested & {"created_time", "updated_time"}:
+                del result["post_age_info"]
+            if not requested & ENGAGEMENT_FIELDS:
+                del result["engagement_totals"]
+            
+            # Let the caller know which fields this page does not support
+            if response.get("skipped_fields"):
+                result["skipped_fields"] = response["skipped_fields"]
+            
+            return result
+            
         except Exception as e:
             return {
                 "error": f"Exception occurred while retrieving last post: {str(e)}",
@@ -406,8 +1410,11 @@ class FacebookAPI:
         Returns:
             dict: Response from Facebook Graph API with generated copyright text
         """
-        # Verify it's a video file
-        media_type = self._get_media_type(video_url)
+        # Verify it's a video file Facebook will take
+        types, rejected = self._preflight([video_url], "post", expected="video")
+        if rejected:
+            return rejected
+        media_type = types[video_url]
         
         if media_type != "video":
             return {
@@ -445,90 +1452,20 @@ class FacebookAPI:
         Returns:
             str: Generated viral copyright text for Facebook
         """
-        import random
-        import datetime
-        
-        # Dynamic elements for viral content
-        fire_emojis = ["🔥", "💥", "⚡", "🌟", "✨", "🚀", "💎", "🎯"]
-        engagement_calls = [
-            "¡COMPARTE si te gustó!",
-            "¡Dale LIKE y COMPARTE!",
-            "¡Si te encantó, COMPÁRTELO!",
-            "¡HAZLO VIRAL compartiendo!",
-            "¡Comparte con tus amigos!",
-            "¡No olvides dar LIKE!",
-            "¡Etiqueta a quien le gustaría esto!"
-        ]
-        
-        copyright_notices = [
-            "© Todos los derechos reservados. Este contenido es propiedad intelectual protegida.",
-            "© Creación original - Todos los derechos reservados",
-            "© Este contenido está protegido por derechos de autor",
-            "© Material original protegido por ley de derechos de autor",
-            "© Contenido exclusivo con derechos reservados"
-        ]
-        
-        restrictions = [
-            "🚫 PROHIBIDA su reproducción, distribución o uso sin autorización expresa.",
-            "❌ NO se permite copiar, descargar o redistribuir",
-            "🚫 Prohibida su descarga o reutilización sin permiso",
-            "❌ No autorizado para descarga o uso comercial",
-            "🚫 Prohibido el uso no autorizado de este material"
-        ]
-        
-        permissions = [
-            "✅ SÍ se permite compartir desde esta publicación",
-            "✅ Permitido compartir desde aquí únicamente",
-            "✅ Compartir desde esta publicación está permitido",
-            "✅ Solo se permite compartir desde el post original",
-            "✅ Autorizado compartir manteniendo la fuente"
-        ]
-        
-        hashtag_sets = [
-            "#ViralContent #Original #Copyright #Exclusive #Trending",
-            "#Viral #Original #Protected #ShareDontSteal #Exclusive",
-            "#ExclusiveContent #Copyright #ViralVideo #Original #Trending",
-            "#OriginalContent #Viral #Copyright #ShareTheJoy #Exclusive",
-            "#ContentCreator #Original #Viral #Protected #Trending",
-            "#ExclusivePost #Copyright #ViralContent #Original #MustShare"
-        ]
-        
-        # Generate current year for copyright
-        current_year = datetime.datetime.now().year
-        
-        # Select random elements
-        fire_emoji = random.choice(fire_emojis)
-        engagement_call = random.choice(engagement_calls)
-        copyright_notice = random.choice(copyright_notices)
-        restriction = random.choice(restrictions)
-        permission = random.choice(permissions)
-        hashtags = random.choice(hashtag_sets)
-        
-        # Create different viral templates
-        viral_templates = [
-            # Template 1: Classic viral format
-            f"{fire_emoji} {content_prompt.upper()} {fire_emoji}\n\n✨ CONTENIDO ORIGINAL EXCLUSIVO ✨\n\n{copyright_notice}\n\n{restriction}\n\n{permission}\n\n💯 {engagement_call} 👇\n\n{hashtags}",
-            
-            # Template 2: Professional with legal emphasis
-            f"🎬 {content_prompt} 🎬\n\n⚡ CONTENIDO VIRAL ORIGINAL ⚡\n\n🔒 Material protegido por derechos de autor {current_year}\n{copyright_notice}\n\n{restriction}\n{permission}\n\n🔥 {engagement_call} 🔥\n\n{hashtags}",
-            
-            # Template 3: Warning style with engagement
-            f"{fire_emoji} {content_prompt} {fire_emoji}\n\n🌟 CONTENIDO EXCLUSIVO Y ORIGINAL 🌟\n\n⚠️ AVISO LEGAL:\n{copyright_notice}\n{restriction}\n{permission}\n\n🔥 {engagement_call} 🔥\n👆 ¡Y no olvides seguirnos para más contenido!\n\n{hashtags}",
-            
-            # Template 4: Terms of use format
-            f"🚀 {content_prompt} 🚀\n\n✨ MATERIAL ORIGINAL PROTEGIDO ✨\n\n📝 TÉRMINOS DE USO:\n• {copyright_notice}\n• {restriction}\n• {permission}\n• 💬 Comentar y etiquetar amigos está permitido\n\n🔥 {engagement_call} 🔥\n\n{hashtags}",
-            
-            # Template 5: Creator focused
-            f"{fire_emoji} {content_prompt} {fire_emoji}\n\n👨‍💻 CREACIÓN ORIGINAL EXCLUSIVA 👩‍💻\n\n{copyright_notice}\n\n🛡️ PROTECCIÓN LEGAL:\n{restriction}\n{permission}\n\n💪 {engagement_call}\n🎯 ¡Síguenos para más contenido original!\n\n{hashtags}",
-            
-            # Template 6: Community engagement
-            f"💎 {content_prompt} 💎\n\n🌟 CONTENIDO PREMIUM ORIGINAL 🌟\n\n{copyright_notice}\n\n📋 REGLAS DE COMPARTIR:\n❌ No descargar o reutilizar\n✅ Compartir desde aquí\n💬 Comentar tu opinión\n🏷️ Etiquetar amigos\n\n🚀 {engagement_call}\n\n{hashtags}"
-        ]
-        
-        # Select a random template
-        selected_template = random.choice(viral_templates)
+        return self.captions.generate(content_prompt)
+    
+    def generate_captions(self, content_prompt: str, n: int, seed: int = None) -> list[str]:
+        """Generate `n` distinct viral copyright texts for the same content.
         
-        return selected_template
+        Args:
+            content_prompt: Description of the content
+            n: Number of variants wanted
+            seed: Optional seed for reproducible output
+            
+        Returns:
+            list[str]: Distinct captions (fewer than `n` only if no more variants exist)
+        """
+        return self.captions.generate_batch(content_prompt, n, seed)
     
     def create_page_media_post(self, page_id: str, media_urls: list[str], content_prompt: str, page_access_token: str = None) -> dict[str, Any]:
         """Create a media post on a specific Facebook page with auto-generated viral copyright text.
@@ -548,6 +1485,11 @@ class FacebookAPI:
                 "message": "At least one media URL is required"
             }
         
+        start = time.perf_counter()
+        types, rejected = self._preflight(media_urls, "post")
+        if rejected:
+            return rejected
+        
         # Use provided token or fall back to default
         if page_access_token:
             # Temporarily use the provided token for this request
@@ -566,7 +1508,7 @@ class FacebookAPI:
         unsupported = []
         
         for media_url in media_urls:
-            media_type = self._get_media_type(media_url)
+            media_type = types[media_url]
             if media_type == "image":
                 images.append(media_url)
             elif media_type == "video":
@@ -587,18 +1529,15 @@ class FacebookAPI:
             "errors": []
         }
         
+        uploads = self._prepare_uploads(images, results)
+        progress = Progress(len(images) + len(videos))
         try:
             # Post images
             if images:
                 try:
                     if len(images) == 1:
                         # Single image post
-                        params = {
-                            "url": images[0],
-                            "caption": viral_copyright_text,
-                            "published": True
-                        }
-                        response = self._request("POST", f"{page_id}/photos", params)
+                        response = self._post_photo(page_id, images[0], {"caption": viral_copyright_text, "published": True}, uploads)
                         if "error" not in response:
                             results["images_posted"] = 1
                             results["posts_created"].append({
@@ -606,22 +1545,19 @@ class FacebookAPI:
                                 "media_urls": images,
                                 "response": response
                             })
+                            progress.step(images[0], response, results["posts_created"][-1])
                         else:
                             results["errors"].append({
                                 "type": "image",
                                 "media_urls": images,
                                 "error": response
                             })
+                            progress.step(images[0], response, results["errors"][-1])
                     else:
                         # Multiple images - post individually with viral text
                         for i, image_url in enumerate(images):
                             caption = viral_copyright_text if i == 0 else f"Imagen {i+1} - {content_prompt}"
-                            params = {
-                                "url": image_url,
-                                "caption": caption,
-                                "published": True
-                            }
-                            response = self._request("POST", f"{page_id}/photos", params)
+                            response = self._post_photo(page_id, image_url, {"caption": caption, "published": True}, uploads)
                             if "error" not in response:
                                 results["images_posted"] += 1
                                 results["posts_created"].append({
@@ -629,12 +1565,14 @@ class FacebookAPI:
                                     "media_url": image_url,
                                     "response": response
                                 })
+                                progress.step(image_url, response, results["posts_created"][-1])
                             else:
                                 results["errors"].append({
                                     "type": "image",
                                     "media_url": image_url,
                                     "error": response
                                 })
+                                progress.step(image_url, response, results["errors"][-1])
                 except Exception as e:
                     results["errors"].append({
                         "type": "image_processing",
@@ -658,12 +1596,14 @@ class FacebookAPI:
                             "media_url": video_url,
                             "response": response
                         })
+                        progress.step(video_url, response, results["posts_created"][-1])
                     else:
                         results["errors"].append({
                             "type": "video",
                             "media_url": video_url,
                             "error": response
                         })
+                        progress.step(video_url, response, results["errors"][-1])
                 except Exception as e:
                     results["errors"].append({
                         "type": "video_processing",
@@ -686,6 +1626,7 @@ class FacebookAPI:
                 config.PAGE_ACCESS_TOKEN = original_token
         
         # Summary
+        results["publish_seconds"] = round(time.perf_counter() - start, 3)
         results["success"] = len(results["posts_created"]) > 0
         results["total_posts_created"] = len(results["posts_created"])
         
@@ -707,6 +1648,10 @@ class FacebookAPI:
                 "message": "At least one media URL is required"
             }
         
+        start = time.perf_counter()
+        types, rejected = self._preflight(media_urls, "post")
+        if rejected:
+            return rejected
         # Generate viral copyright text based on content prompt
         viral_copyright_text = self._generate_viral_copyright_text(content_prompt)
         
@@ -716,7 +1661,7 @@ class FacebookAPI:
         unsupported = []
         
         for media_url in media_urls:
-            media_type = self._get_media_type(media_url)
+            media_type = types[media_url]
             if media_type == "image":
                 images.append(media_url)
             elif media_type == "video":
@@ -736,18 +1681,15 @@ class FacebookAPI:
             "errors": []
         }
         
+        uploads = self._prepare_uploads(images, results)
+        progress = Progress(len(images) + len(videos))
         # Post images (Facebook allows multiple images in one post via album)
         if images:
             try:
                 # For multiple images, create an album post
                 if len(images) == 1:
                     # Single image post
-                    params = {
-                        "url": images[0],
-                        "caption": viral_copyright_text,
-                        "published": True
-                    }
-                    response = self._request("POST", f"{PAGE_ID}/photos", params)
+                    response = self._post_photo(PAGE_ID, images[0], {"caption": viral_copyright_text, "published": True}, uploads)
                     if "error" not in response:
                         results["images_posted"] = 1
                         results["posts_created"].append({
@@ -755,23 +1697,20 @@ class FacebookAPI:
                             "media_urls": images,
                             "response": response
                         })
+                        progress.step(images[0], response, results["posts_created"][-1])
                     else:
                         results["errors"].append({
                             "type": "image",
                             "media_urls": images,
                             "error": response
                         })
+                        progress.step(images[0], response, results["errors"][-1])
                 else:
                     # Multiple images - create album
                     # Note: Facebook Graph API album creation is complex, so we'll post images individually
                     for i, image_url in enumerate(images):
                         caption = viral_copyright_text if i == 0 else f"Imagen {i+1} - {content_prompt}"
-                        params = {
-                            "url": image_url,
-                            "caption": caption,
-                            "published": True
-                        }
-                        response = self._request("POST", f"{PAGE_ID}/photos", params)
+                        response = self._post_photo(PAGE_ID, image_url, {"caption": caption, "published": True}, uploads)
                         if "error" not in response:
                             results["images_posted"] += 1
                             results["posts_created"].append({
@@ -779,12 +1718,14 @@ class FacebookAPI:
                                 "media_url": image_url,
                                 "response": response
                             })
+                            progress.step(image_url, response, results["posts_created"][-1])
                         else:
                             results["errors"].append({
                                 "type": "image",
                                 "media_url": image_url,
                                 "error": response
                             })
+                            progress.step(image_url, response, results["errors"][-1])
             except Exception as e:
                 results["errors"].append({
                     "type": "image_processing",
@@ -808,12 +1749,14 @@ class FacebookAPI:
                         "media_url": video_url,
                         "response": response
                     })
+                    progress.step(video_url, response, results["posts_created"][-1])
                 else:
                     results["errors"].append({
                         "type": "video",
                         "media_url": video_url,
                         "error": response
                     })
+                    progress.step(video_url, response, results["errors"][-1])
             except Exception as e:
                 results["errors"].append({
                     "type": "video_processing",
@@ -830,7 +1773,35 @@ class FacebookAPI:
             })
         
         # Summary
+        results["publish_seconds"] = round(time.perf_counter() - start, 3)
         results["success"] = len(results["posts_created"]) > 0
         results["total_posts_created"] = len(results["posts_created"])
         
         return results
+
+
+def _timestamp(created_time: str | None) -> int | None:
+    """Unix time of a Graph created_time, None if missing or malformed."""
+    try:
+        return parse_publish_time(created_time) if created_time else None
+    except ValueError:
+        return None
+
+
+def _timeout(default: float = None) -> float | None:
+    """HTTP timeout: `default`, shortened to what is left of the current deadline."""
+    deadline = deadlines.current()
+    remaining = deadline.remaining() if deadline is not None else None
+    if remaining is None:
+        return default
+    return max(min(remaining, default) if default is not None else remaining, 0.001)
+
+
+def _summary_total(data: dict[str, Any], field: str) -> int:
+    return data.get(field, {}).get("summary", {}).get("total_count", 0)
+
+
+def _error_code(response: Any) -> str | None:
+    """Graph error code of a response, as a metrics label."""
+    error = response.get("error") if isinstance(response, dict) else None
+    return str(error.get("code", "unknown")) if isinstance(error, dict) else None
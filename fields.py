@@ -0,0 +1,73 @@
+from typing import Any
+
+from capabilities import field_base_name
+
+
+# Named field profiles per Graph object type. Edge summaries use limit(0)
+# so Graph returns only the counts, not the first page of likes/comments.
+PROFILES: dict[str, dict[str, list[str]]] = {
+    "post": {
+        "id": ["id"],
+        "lean": ["id", "message", "created_time"],
+        "engagement": [
+            "id", "created_time", "shares",
+            "likes.limit(0).summary(true)", "comments.limit(0).summary(true)", "reactions.limit(0).summary(true)",
+        ],
+        "full": [
+            "id", "message", "created_time", "updated_time", "permalink_url", "full_picture", "picture",
+            "type", "status_type", "story", "description", "caption", "name", "link", "source", "place",
+            "privacy", "shares",
+            "likes.limit(0).summary(true)", "comments.limit(0).summary(true)", "reactions.limit(0).summary(true)",
+        ],
+    },
+    "comment": {
+        "id": ["id"],
+        "lean": ["id", "message", "from", "created_time"],
+        "engagement": ["id", "created_time", "like_count", "comment_count"],
+        "full": ["id", "message", "from", "created_time", "like_count", "comment_count", "parent", "permalink_url"],
+    },
+}
+
+
+def resolve_fields(kind: str, profile: str = None, fields: str | list[str] = None, default: str = "full") -> list[str]:
+    """Return the Graph fields to request for an object type.
+
+    Args:
+        kind: Object type, a key of PROFILES ("post", "comment")
+        profile: Named profile ("id", "lean", "engagement", "full")
+        fields: Explicit fields, as a list or comma-separated string. Takes precedence over profile
+        default: Profile used when neither profile nor fields is given
+
+    Returns:
+        list[str]: Fields to request, always including "id"
+    """
+    if fields:
+        requested = [f.strip() for f in (fields.split(",") if isinstance(fields, str) else fields) if f.strip()]
+        return requested if "id" in requested else ["id"] + requested
+    profiles = PROFILES[kind]
+    name = profile or default
+    if name not in profiles:
+        raise ValueError(f"Unknown {kind} field profile '{name}'. Available: {', '.join(profiles)}")
+    return list(profiles[name])
+
+
+def requested_base_fields(fields: list[str]) -> set[str]:
+    """Top-level field names of a field list, e.g. {'likes'} for 'likes.limit(0).summary(true)'."""
+    return {field_base_name(f) for f in fields}
+
+
+def project(data: dict[str, Any], fields: list[str], sources: dict[str, set[str]] = None) -> dict[str, Any]:
+    """Keep only the keys of `data` backed by one of the requested fields.
+
+    Args:
+        data: Dict built from a Graph object
+        fields: Fields that were requested from Graph
+        sources: Output keys derived from differently named fields, mapped
+            to the field names that feed them. Other keys map to themselves.
+
+    Returns:
+        dict: The projected dict, in the original key order
+    """
+    requested = requested_base_fields(fields)
+    sources = sources or {}
+    return {k: v for k, v in data.items() if sources.get(k, {k}) & requested}
@@ -0,0 +1,62 @@
+import threading
+from collections import deque
+
+
+class HedgePolicy:
+    """When to send a backup copy of a slow GET, and how many backups are allowed.
+
+    The hedge delay for an endpoint is a percentile of its recent latencies,
+    so only the slow tail is duplicated. Every request earns `max_extra` of a
+    token and every hedge spends a whole one, which caps backups at roughly
+    that fraction of read traffic (with a small burst allowance).
+
+    Args:
+        percentile: Latency percentile (0-100) after which a backup is sent
+        max_extra: Maximum extra requests as a fraction of reads (e.g. 0.05)
+        min_delay: Never hedge before this many seconds
+        window: Recent latencies kept per endpoint
+        min_samples: Latencies needed before an endpoint is hedged
+        burst: Most hedges that can be saved up
+    """
+
+    def __init__(self, percentile: float = 95, max_extra: float = 0.05, min_delay: float = 0.05,
+                 window: int = 200, min_samples: int = 20, burst: float = 5):
+        self.percentile = percentile
+        self.max_extra = max_extra
+        self.min_delay = min_delay
+        self.window = window
+        self.min_samples = min_samples
+        self.burst = burst
+        self._latencies: dict[str, deque[float]] = {}
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, key: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._latencies.get(key)
+            if samples is None:
+                samples = self._latencies[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def delay(self, key: str) -> float | None:
+        """Seconds to wait before hedging a request to `key`, or None while there is too little history."""
+        with self._lock:
+            samples = self._latencies.get(key)
+            if samples is None or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return max(ordered[index], self.min_delay)
+
+    def earn(self) -> None:
+        """Credit the hedge budget for one request."""
+        with self._lock:
+            self._tokens = min(self._tokens + self.max_extra, self.burst)
+
+    def spend(self) -> bool:
+        """Take one hedge from the budget; False when it is exhausted."""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
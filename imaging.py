@@ -0,0 +1,144 @@
+import importlib.util
+import io
+import mimetypes
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+# Longest side Facebook displays photos at; larger uploads are downscaled by Facebook anyway
+MAX_DIMENSION = 2048
+
+# JPEG quality of re-encoded photos
+DEFAULT_QUALITY = 85
+
+CONTENT_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "GIF": "image/gif", "WEBP": "image/webp"}
+
+# Photo formats (as sniffed by preflight) that preprocessing can decode and shrink
+SHRINKABLE_FORMATS = {"jpeg", "png", "gif", "webp"}
+
+
+def local_path(url: str) -> str | None:
+    """The file path of `url` when it names an existing local file, else None."""
+    path = url[len("file://"):] if url.startswith("file://") else url
+    if "://" in path:
+        return None
+    path = os.path.expanduser(path)
+    return path if os.path.isfile(path) else None
+
+
+def read_file(path: str) -> dict[str, Any]:
+    """A local file as an upload, unchanged."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return {"path": path, "filename": os.path.basename(path), "data": data,
+            "content_type": mimetypes.guess_type(path)[0] or "application/octet-stream",
+            "original_bytes": len(data), "bytes": len(data), "processed": False}
+
+
+def preprocess_image(path: str, max_dimension: int = MAX_DIMENSION, quality: int = DEFAULT_QUALITY) -> dict[str, Any]:
+    """Shrink a local photo for upload: fit it in max_dimension, drop EXIF/XMP and re-encode.
+
+    The EXIF orientation is applied to the pixels before the metadata is
+    dropped. Photos with transparency stay PNG, the rest become JPEG at
+    `quality`. Animated images, and photos that would not get smaller and
+    carry no metadata, are uploaded unchanged. Runs in a worker process, so
+    it only takes and returns plain values.
+
+    Returns:
+        dict: "data" to upload with its "filename" and "content_type", plus
+        "original_bytes", "bytes", "original_size"/"size" (width, height) and
+        whether the photo was "processed"; a photo Pillow cannot read (e.g.
+        HEIC) is uploaded unchanged, with a "warning"
+    """
+    original = read_file(path)
+    try:
+        # Imported here: Pillow is optional (photos are then uploaded unchanged) and slow to import
+        from PIL import Image, ImageOps
+    except ImportError:
+        return original
+    try:
+        with Image.open(io.BytesIO(original["data"])) as image:
+            if getattr(image, "is_animated", False):
+                return original
+            original_size = image.size
+            had_metadata = bool(image.getexif()) or "xmp" in image.info or "XML:com.adobe.xmp" in image.info
+            icc_profile = image.info.get("icc_profile")
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            transparent = image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+            out = io.BytesIO()
+            if transparent:
+                image.save(out, "PNG", optimize=True, icc_profile=icc_profile)
+                image_format = "PNG"
+            else:
+                image.convert("RGB").save(out, "JPEG", quality=quality, optimize=True, progressive=True,
+                                          icc_profile=icc_profile)
+                image_format = "JPEG"
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        return {**original, "warning": f"Could not read image, uploaded unchanged: {e}"}
+
+    data = out.getvalue()
+    resized = image.size != original_size
+    if not resized and not had_metadata and len(data) >= original["bytes"]:
+        return original
+    stem = os.path.splitext(original["filename"])[0]
+    return {
+        "path": path,
+        "filename": f"{stem}.{'png' if image_format == 'PNG' else 'jpg'}",
+        "content_type": CONTENT_TYPES[image_format],
+        "data": data,
+        "original_bytes": original["bytes"],
+        "bytes": len(data),
+        "original_size": list(original_size),
+        "size": list(image.size),
+        "processed": True,
+    }
+
+
+class ImagePreprocessor:
+    """Prepares local photos for upload, in parallel across processes.
+
+    A single photo is handled in the calling thread; several go to a process
+    pool (started on first use and kept), so a multi-image post uses every
+    core. When preprocessing is off or Pillow is missing, files are read
+    unchanged.
+
+    Args:
+        enabled: Resize and re-encode photos; False only reads them
+        max_dimension: Longest side of a processed photo, in pixels
+        quality: JPEG quality of processed photos
+        workers: Worker processes (None = one per CPU)
+    """
+
+    def __init__(self, enabled: bool = True, max_dimension: int = MAX_DIMENSION, quality: int = DEFAULT_QUALITY,
+                 workers: int | None = None):
+        self.enabled = enabled and importlib.util.find_spec("PIL") is not None
+        self.max_dimension = max_dimension
+        self.quality = quality
+        self.workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def prepare(self, paths: list[str]) -> list[dict[str, Any]]:
+        """Uploads for local files, in the order given (see preprocess_image)."""
+        if not self.enabled:
+            return [read_file(path) for path in paths]
+        if len(paths) == 1:
+            return [preprocess_image(paths[0], self.max_dimension, self.quality)]
+        n = len(paths)
+        return list(self._executor().map(preprocess_image, paths, [self.max_dimension] * n, [self.quality] * n))
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that runs request threads is unsafe
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
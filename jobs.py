@@ -0,0 +1,335 @@
+import json
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+from journal import SECRET_KEYS
+from progress import reporting
+
+try:
+    import fcntl
+except ImportError:  # Windows: no lock between processes sharing a jobs file
+    fcntl = None
+
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+INTERRUPTED = "interrupted"
+
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+# A resubmitted identical job within this window returns the existing job
+# instead of publishing twice (clients retry calls that timed out)
+DEDUP_WINDOW = 600
+
+# Seconds between status checks while waiting for a job run by another process
+POLL_SECONDS = 0.2
+
+# Progress of a running job is written to disk at most this often (state changes always are)
+PROGRESS_SAVE_SECONDS = 1.0
+
+# Instance IDs of the queues open in this process
+_live_queues: set[str] = set()
+
+
+def _owner_alive(owner: dict[str, Any] | None) -> bool:
+    """Whether the queue that owns a job may still be running it."""
+    if not owner:
+        return False
+    if owner["pid"] == os.getpid():
+        return owner["instance"] in _live_queues
+    if os.name == "nt":
+        # No signal-0 probe on Windows: treat every other process as gone, as before owners existed
+        return False
+    try:
+        os.kill(owner["pid"], 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def has_pending_jobs(path: str) -> bool:
+    """Whether the jobs file holds queued or running jobs that no live server owns (a new queue takes them over)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            jobs = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return any(job["status"] in ACTIVE_STATES and not _owner_alive(job.get("owner")) for job in jobs.values())
+
+
+class JobQueue:
+    """Background jobs for long-running operations, persisted to a JSON file.
+
+    Jobs are run by a small worker pool through `runner(kind, args)`. Every
+    state change is written to disk, so after a restart queued jobs are
+    resumed. Jobs that were running are marked interrupted rather than run
+    again, because they may already have published part of their media;
+    the items they finished are kept as "partial_results" (see progress;
+    written at most every PROGRESS_SAVE_SECONDS, so the last second of
+    finished items may be missing from them after a crash).
+
+    Several server processes (e.g. one per stdio session) can share the
+    file. Each job records the process and queue that owns it, writes merge
+    the file's other jobs under an exclusive lock, and only jobs whose owner
+    has exited are resumed or interrupted. Jobs of other live processes are
+    visible (status, list, deduplication) but left to them.
+
+    Args:
+        runner: Executes one job and returns its result
+        path: JSON file holding the job states
+        workers: Number of jobs run at the same time
+        retention: Seconds finished jobs are kept
+    """
+
+    def __init__(self, runner: Callable[[str, dict[str, Any]], Any], path: str, workers: int = 2,
+                 retention: float = 7 * 86400):
+        self.runner = runner
+        self.path = path
+        self.retention = retention
+        self._jobs: dict[str, dict[str, Any]] = {}
+        # Secret arguments (tokens) are only kept in memory, never on disk
+        self._secrets: dict[str, dict[str, Any]] = {}
+        self._done: dict[str, threading.Event] = {}
+        # When the progress of each running job was last written
+        self._progress_saved: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.owner = {"pid": os.getpid(), "instance": secrets.token_hex(4)}
+        _live_queues.add(self.owner["instance"])
+        self._load()
+
+    def close(self) -> None:
+        """Stop taking jobs; queued jobs left here can be resumed by another queue."""
+        _live_queues.discard(self.owner["instance"])
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _mine(self, job: dict[str, Any]) -> bool:
+        return job.get("owner") == self.owner
+
+    def _load(self) -> None:
+        resume = []
+        with self._lock, self._file_lock():
+            self._merge()
+            for job in self._jobs.values():
+                if job["status"] not in ACTIVE_STATES or _owner_alive(job.get("owner")):
+                    continue
+                # Left behind by a server that exited: this queue takes it over
+                job["owner"] = self.owner
+                if job["status"] == RUNNING:
+                    self._finish(job, INTERRUPTED, error="Server stopped while the job was running; "
+                                 "check the page before submitting it again")
+                elif job.get("secret_args"):
+                    self._finish(job, INTERRUPTED, error="Server restarted and the job's access token is not persisted")
+                else:
+                    resume.append(job["id"])
+            self._write()
+        for job_id in resume:
+            self._executor.submit(self._run, job_id)
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Hold the lock shared by every process using this jobs file."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(f"{self.path}.lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _merge(self) -> None:
+        """Take the file's version of every job this queue does not own. Caller holds both locks."""
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+        else:
+            stored = {}
+        for job_id, job in stored.items():
+            current = self._jobs.get(job_id)
+            if current is not None and self._mine(current) and job.get("owner") in (None, self.owner):
+                continue
+            self._jobs[job_id] = job
+            done = self._done.setdefault(job_id, threading.Event())
+            if job["status"] not in ACTIVE_STATES:
+                done.set()
+        # Jobs of other queues that are gone from the file were dropped after their retention
+        for job_id in [j for j, job in self._jobs.items() if j not in stored and not self._mine(job)]:
+            del self._jobs[job_id]
+            self._done.pop(job_id, None)
+
+    def _write(self) -> None:
+        """Atomically rewrite the state file. Caller holds both locks, after `_merge`."""
+        now = time.time()
+        for job_id in [j["id"] for j in self._jobs.values()
+                       if j["status"] not in ACTIVE_STATES and now - j["finished_at"] > self.retention]:
+            del self._jobs[job_id]
+            self._done.pop(job_id, None)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._jobs, f, ensure_ascii=False, default=str)
+        os.replace(tmp, self.path)
+
+    def _save(self) -> None:
+        """Write this queue's jobs to the file, keeping other processes' jobs. Caller holds the lock."""
+        with self._file_lock():
+            self._merge()
+            self._write()
+
+    def _refresh(self) -> None:
+        """Pick up the changes other processes made to their jobs. Caller holds the lock."""
+        with self._file_lock():
+            self._merge()
+
+    def _finish(self, job: dict[str, Any], status: str, result: Any = None, error: str = None) -> None:
+        job.update(status=status, finished_at=time.time(), result=result, error=error)
+        if result is not None:
+            # The result holds every item; partial results only matter when it is missing
+            job.pop("partial_results", None)
+        self._secrets.pop(job["id"], None)
+        self._progress_saved.pop(job["id"], None)
+        self._done[job["id"]].set()
+
+    def submit(self, kind: str, args: dict[str, Any]) -> dict[str, Any]:
+        """Queue a job, or return the identical job submitted shortly before.
+
+        Returns:
+            dict: Job status; "deduplicated" is True when an existing job was returned
+        """
+        public_args = {k: v for k, v in args.items() if k not in SECRET_KEYS}
+        secret_args = {k: v for k, v in args.items() if k in SECRET_KEYS and v is not None}
+        fingerprint = json.dumps([kind, public_args], sort_keys=True, default=str)
+        now = time.time()
+        # The file stays locked from the duplicate check to the write, so two processes can't both queue it
+        with self._lock, self._file_lock():
+            self._merge()
+            for job in self._jobs.values():
+                if job["fingerprint"] == fingerprint and (
+                        job["status"] in ACTIVE_STATES
+                        or (job["status"] == SUCCEEDED and now - job["finished_at"] < DEDUP_WINDOW)):
+                    return {**self._status(job), "deduplicated": True}
+            job_id = secrets.token_hex(8)
+            job = self._jobs[job_id] = {
+                "id": job_id,
+                "kind": kind,
+                "args": public_args,
+                "secret_args": sorted(secret_args),
+                "fingerprint": fingerprint,
+                "status": QUEUED,
+                "created_at": now,
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+                "progress": None,
+                "partial_results": [],
+                "owner": self.owner,
+            }
+            self._secrets[job_id] = secret_args
+            self._done[job_id] = threading.Event()
+            self._write()
+            status = self._status(job)
+        self._executor.submit(self._run, job_id)
+        return {**status, "deduplicated": False}
+
+    def _run(self, job_id: str) -> None:
+        with self._lock, self._file_lock():
+            self._merge()
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != QUEUED or not self._mine(job):
+                return
+            job.update(status=RUNNING, started_at=time.time())
+            args = {**job["args"], **self._secrets.get(job_id, {})}
+            self._write()
+        try:
+            with reporting(lambda done, total, message, item: self._progress(job, done, total, message, item)):
+                result = self.runner(job["kind"], args)
+        except Exception as e:
+            with self._lock:
+                self._finish(job, FAILED, error=f"{type(e).__name__}: {e}")
+                self._save()
+            return
+        with self._lock:
+            failed = isinstance(result, dict) and "error" in result
+            self._finish(job, FAILED if failed else SUCCEEDED, result=result,
+                         error=str(result["error"]) if failed else None)
+            self._save()
+
+    def _progress(self, job: dict[str, Any], done: int, total: int, message: str, item: dict[str, Any]) -> None:
+        """Record a finished item of a running job, so a restart knows what was already published."""
+        with self._lock:
+            job["progress"] = {"done": done, "total": total, "message": message}
+            job.setdefault("partial_results", []).append(item)
+            now = time.monotonic()
+            if now - self._progress_saved.get(job["id"], 0.0) >= PROGRESS_SAVE_SECONDS:
+                self._progress_saved[job["id"]] = now
+                self._save()
+
+    def _status(self, job: dict[str, Any]) -> dict[str, Any]:
+        status = {k: job[k] for k in ("id", "kind", "status", "created_at", "started_at", "finished_at")}
+        if job.get("progress"):
+            status["progress"] = job["progress"]
+        if job.get("partial_results"):
+            status["partial_results"] = job["partial_results"]
+        if job["status"] in (SUCCEEDED, FAILED):
+            status["result"] = job["result"]
+        if job["error"]:
+            status["error"] = job["error"]
+        return status
+
+    def status(self, job_id: str) -> dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return {"error": f"Unknown job: {job_id}"}
+            return self._status(job)
+
+    def list_jobs(self, status: str = None) -> list[dict[str, Any]]:
+        """Jobs, newest first, without their results."""
+        with self._lock:
+            self._refresh()
+            jobs = sorted(self._jobs.values(), key=lambda j: j["created_at"], reverse=True)
+            return [{k: v for k, v in self._status(j).items() if k not in ("result", "partial_results")}
+                    for j in jobs if status is None or j["status"] == status]
+
+    def cancel(self, job_id: str) -> dict[str, Any]:
+        """Cancel a job that has not started yet."""
+        with self._lock, self._file_lock():
+            self._merge()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return {"error": f"Unknown job: {job_id}"}
+            if job["status"] != QUEUED:
+                return {**self._status(job), "error": f"Job is {job['status']} and can no longer be cancelled"}
+            if not self._mine(job):
+                return {**self._status(job), "error": f"Job is queued in another server process (pid {job['owner']['pid']})"}
+            self._finish(job, CANCELLED)
+            self._write()
+            return self._status(job)
+
+    def wait(self, job_id: str, timeout: float = None) -> dict[str, Any]:
+        """Block until a job finishes (or `timeout` passes) and return its status."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            done = self._done.get(job_id)
+            job = self._jobs.get(job_id)
+            if done is None or job is None or self._mine(job):
+                if done is not None:
+                    done.wait(None if deadline is None else max(deadline - time.monotonic(), 0))
+                return self.status(job_id)
+            # Run by another process: its progress only shows up in the file
+            status = self.status(job_id)
+            if status.get("status") not in ACTIVE_STATES or (deadline is not None and time.monotonic() >= deadline):
+                return status
+            time.sleep(POLL_SECONDS if deadline is None else min(POLL_SECONDS, max(deadline - time.monotonic(), 0)))
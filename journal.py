@@ -0,0 +1,121 @@
+import copy
+import gzip
+import json
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, IO
+
+
+REDACTED = "REDACTED"
+
+# Parameter and response keys whose values are secrets
+SECRET_KEYS = {"access_token", "appsecret_proof", "client_secret", "page_access_token"}
+_SECRET_IN_URL = re.compile(r"((?:%s)=)[^&#\s]+" % "|".join(sorted(SECRET_KEYS)))
+
+
+def redact(value: Any) -> Any:
+    """Copy of `value` with tokens removed from secret keys and from URLs."""
+    if isinstance(value, dict):
+        return {k: REDACTED if k in SECRET_KEYS else redact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact(v) for v in value]
+    if isinstance(value, str):
+        return _SECRET_IN_URL.sub(rf"\1{REDACTED}", value)
+    return value
+
+
+def request_key(method: str, endpoint: str, params: dict[str, Any], json_body: dict[str, Any] = None) -> str:
+    """Canonical identity of a Graph request, ignoring tokens."""
+    params = {k: v for k, v in redact(params or {}).items() if k not in SECRET_KEYS}
+    return json.dumps([method.upper(), endpoint, params, redact(json_body)],
+                      sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _open(path: str, mode: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class GraphRecorder:
+    """Appends every Graph request and response to a JSON-lines journal.
+
+    Tokens are redacted before anything is written. Paths ending in ".gz"
+    are gzip-compressed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = _open(path, "a")
+        self._lock = threading.Lock()
+        self._seq = 0
+
+    def record(self, method: str, endpoint: str, params: dict[str, Any], json_body: dict[str, Any],
+               status: int, elapsed: float, response: Any) -> None:
+        entry = {
+            "method": method.upper(),
+            "endpoint": endpoint,
+            "params": redact(params),
+            "json": redact(json_body),
+            "status": status,
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "response": redact(response),
+        }
+        with self._lock:
+            entry = {"seq": self._seq, **entry}
+            self._seq += 1
+            self._file.write(json.dumps(entry, separators=(",", ":"), ensure_ascii=False, default=str) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class GraphReplayer:
+    """Serves responses from a recorded journal instead of calling Graph.
+
+    Identical requests get their recorded responses back in recording order;
+    once those run out the last one keeps being returned. Requests that were
+    never recorded get a Graph-style error.
+
+    Args:
+        path: Journal written by GraphRecorder
+        latency: Sleep for the recorded response time, to replay realistic timing
+    """
+
+    def __init__(self, path: str, latency: bool = False):
+        self.path = path
+        self.latency = latency
+        self._responses: dict[str, deque[dict[str, Any]]] = defaultdict(deque)
+        self._last: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.misses = 0
+        with _open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    key = request_key(entry["method"], entry["endpoint"], entry["params"], entry["json"])
+                    self._responses[key].append(entry)
+
+    def respond(self, method: str, endpoint: str, params: dict[str, Any], json_body: dict[str, Any] = None) -> Any:
+        key = request_key(method, endpoint, params, json_body)
+        with self._lock:
+            queue = self._responses.get(key)
+            if queue:
+                entry = self._last[key] = queue.popleft()
+            else:
+                entry = self._last.get(key)
+            if entry is None:
+                self.misses += 1
+        if entry is None:
+            return {"error": {
+                "message": f"No recorded response for {method.upper()} {endpoint}",
+                "type": "ReplayMiss",
+                "code": 1,
+            }}
+        if self.latency:
+            time.sleep(entry["elapsed_ms"] / 1000)
+        return copy.deepcopy(entry["response"])
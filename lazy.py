@@ -0,0 +1,64 @@
+import threading
+from typing import Any, Callable, Sequence
+from mcp.server.fastmcp import FastMCP
+
+
+class Deferred:
+    """Stand-in that builds the real object on first attribute access.
+
+    Keeps expensive construction (API clients, caption data) out of server
+    startup; the first tool call pays for it instead.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def _get(self) -> Any:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+    def resolve(self) -> Any:
+        """Build the object now (e.g. from a startup thread) rather than on first use."""
+        return self._get()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get(), name)
+
+
+class DeferredToolsFastMCP(FastMCP):
+    """FastMCP that builds tool schemas when a client first asks for tools.
+
+    Registering a tool generates pydantic models and JSON schemas for its
+    arguments and result, which is most of the server's own import time.
+    Tools added with `defer_tool` are registered on the first tools/list or
+    tools/call instead, so `initialize` is answered without that work.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._deferred_tools: list[Callable[..., Any]] = []
+        self._deferred_lock = threading.Lock()
+
+    def defer_tool(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        with self._deferred_lock:
+            self._deferred_tools.append(fn)
+        return fn
+
+    def register_deferred_tools(self) -> None:
+        with self._deferred_lock:
+            for fn in self._deferred_tools:
+                self.add_tool(fn)
+            self._deferred_tools.clear()
+
+    async def list_tools(self) -> list[Any]:
+        self.register_deferred_tools()
+        return await super().list_tools()
+
+    async def call_tool(self, name: str, arguments: dict[str, Any]) -> Sequence[Any] | dict[str, Any]:
+        self.register_deferred_tools()
+        return await super().call_tool(name, arguments)
@@ -1,10 +1,38 @@
 from typing import Any
+from config import JOBS_FILE, JOB_WORKERS, PLAN_WORKERS, TRENDS_INTERVAL, TRENDS_MAX_AGE_HOURS
+from duplicates import DEFAULT_THRESHOLD
 from facebook_api import FacebookAPI
+from jobs import JobQueue
+from metrics import MetricsRegistry
+from models import to_plain
+from plans import PlanExecutor
+from priorities import BULK, prioritized
+from progress import Progress
+from trends import EngagementHistory, Snapshotter, parse_window
+
+# Manager methods that can run as background jobs
+JOB_KINDS = ("post_media_to_facebook", "create_page_media_post", "create_storie_list_media")
 
 
 class Manager:
-    def __init__(self):
-        self.api = FacebookAPI()
+    def __init__(self, metrics: MetricsRegistry = None):
+        self.api = FacebookAPI(metrics)
+        self.jobs = JobQueue(self._run_job, JOBS_FILE, JOB_WORKERS)
+        self.plans = PlanExecutor(self, self.api._batch, self.api.page_id, PLAN_WORKERS, self.api.metrics.propagate,
+                                  self.api._unindex)
+        # Sampling is started by the server at startup (see server._start_background_work)
+        self.trends = Snapshotter(self._sample_engagement, EngagementHistory(), TRENDS_INTERVAL)
+
+    def _sample_engagement(self) -> dict[str, Any]:
+        with self.api.metrics.tool_call("trends:sample"), prioritized(BULK, "trends"):
+            return self.api.sample_engagement(TRENDS_MAX_AGE_HOURS * 3600)
+
+    def _run_job(self, kind: str, args: dict[str, Any]) -> Any:
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        # Background work: its requests yield to the tool calls of connected sessions
+        with self.api.metrics.tool_call(f"job:{kind}"), prioritized(BULK, "jobs"):
+            return to_plain(getattr(self, kind)(**args))
 
     def post_to_facebook(self, message: str) -> dict[str, Any]:
         return self.api.post_message(message)
@@ -12,11 +40,11 @@ class Manager:
     def reply_to_comment(self, post_id: str, comment_id: str, message: str) -> dict[str, Any]:
         return self.api.reply_to_comment(comment_id, message)
 
-    def get_page_posts(self) -> dict[str, Any]:
-        return self.api.get_posts()
+    def get_page_posts(self, profile: str = None, fields: str = None) -> dict[str, Any]:
+        return self.api.get_posts(profile, fields)
 
-    def get_post_comments(self, post_id: str) -> dict[str, Any]:
-        return self.api.get_comments(post_id)
+    def get_post_comments(self, post_id: str, profile: str = None, fields: str = None) -> dict[str, Any]:
+        return self.api.get_comments(post_id, profile, fields)
 
     def delete_post(self, post_id: str) -> dict[str, Any]:
         return self.api.delete_post(post_id)
@@ -38,7 +66,7 @@ class Manager:
         return [c for c in comments.get("data", []) if any(k in c.get("message", "").lower() for k in keywords)]
 
     def get_number_of_comments(self, post_id: str) -> int:
-        return len(self.api.get_comments(post_id).get("data", []))
+        return len(self.api.get_comments(post_id, "id").get("data", []))
 
     def get_number_of_likes(self, post_id: str) -> int:
         return self.api._request("GET", post_id, {"fields": "likes.summary(true)"}).get("likes", {}).get("summary", {}).get("total_count", 0)
@@ -88,11 +116,13 @@ class Manager:
     def get_post_reactions_anger_total(self, post_id: str) -> dict[str, Any]:
         return self.api.get_insights(post_id, "post_reactions_anger_total")
 
-    def get_post_top_commenters(self, post_id: str) -> list[dict[str, Any]]:
-        comments = self.get_post_comments(post_id).get("data", [])
+    def get_post_top_commenters(self, post_id: str, include_replies: bool = False) -> list[dict[str, Any]]:
+        if include_replies:
+            user_ids = [c["author_id"] for c in self.get_comment_tree(post_id).get("comments", [])]
+        else:
+            user_ids = [c.get("from", {}).get("id") for c in self.get_post_comments(post_id).get("data", [])]
         counter = {}
-        for comment in comments:
-            user_id = comment.get("from", {}).get("id")
+        for user_id in user_ids:
             if user_id:
                 counter[user_id] = counter.get(user_id, 0) + 1
         return sorted([{"user_id": k, "count": v} for k, v in counter.items()], key=lambda x: x["count"], reverse=True)
@@ -122,12 +152,39 @@ class Manager:
     def schedule_post(self, message: str, publish_time: int) -> dict[str, Any]:
         return self.api.schedule_post(message, publish_time)
 
+    def schedule_posts_bulk(self, entries: list[dict[str, Any]], min_gap_minutes: int = 30, dry_run: bool = False) -> dict[str, Any]:
+        """Schedule many posts at once, checked against the calendar of scheduled posts.
+        
+        Args:
+            entries: Dicts with "message" and "publish_time" (unix timestamp or ISO 8601)
+            min_gap_minutes: Minimum spacing from other scheduled posts
+            dry_run: Only validate the entries
+        
+        Returns:
+            dict: Per-entry status ("ok", "scheduled", "rejected" or "failed") and totals
+        """
+        return self.api.schedule_posts_bulk(entries, min_gap_minutes, dry_run)
+
+    def list_scheduled_posts(self, start: int | str = None, end: int | str = None, refresh: bool = False) -> dict[str, Any]:
+        """List scheduled posts publishing between `start` and `end`, in time order."""
+        return self.api.list_scheduled_posts(start, end, refresh)
+
     def get_page_fan_count(self) -> int:
         return self.api.get_page_fan_count()
 
     def get_post_share_count(self, post_id: str) -> int:
         return self.api.get_post_share_count(post_id)
 
+    def get_comment_tree(self, post_id: str, max_depth: int = 3) -> dict[str, Any]:
+        return self.api.get_comment_tree(post_id, max_depth)
+
+    def find_duplicate_comments(self, post_ids: list[str] = None, since: str = None,
+                                threshold: float = DEFAULT_THRESHOLD, min_cluster_size: int = 3) -> dict[str, Any]:
+        return self.api.find_duplicate_comments(post_ids, since, threshold, min_cluster_size)
+
+    def get_page_engagement_report(self, since: int | str = None, until: int | str = None) -> dict[str, Any]:
+        return self.api.get_page_engagement_report(since, until)
+
     def get_post_reactions_breakdown(self, post_id: str) -> dict[str, Any]:
         """Return counts for all reaction types on a post."""
         metrics = [
@@ -146,20 +203,51 @@ class Manager:
             results[name] = value
         return results
 
+    def search_comments(self, query: str, post_id: str = None, author_id: str = None, since: str = None,
+                        until: str = None, kind: str = "comment", limit: int = 20, refresh: bool = False) -> dict[str, Any]:
+        """Full-text search over comments and posts from the local index (see FacebookAPI.search_comments)."""
+        return self.api.search_comments(query, post_id, author_id, since, until, kind, limit, refresh)
+
+    def get_trending_posts(self, window: str = "1h", limit: int = 10, sort: str = "velocity") -> dict[str, Any]:
+        """Rank recent posts by engagement velocity from the sampled history, without Graph calls.
+        
+        Args:
+            window: How far back to measure, e.g. "30m", "2h" or "1d"
+            limit: Posts returned
+            sort: "velocity" (engagement per hour) or "acceleration" (change in that rate)
+        
+        Returns:
+            dict: Ranked posts with velocity and acceleration, and the sampling status
+        """
+        if not self.trends.running and not self.trends.history.samples:
+            return {"error": "Engagement sampling is off: set FACEBOOK_MCP_TRENDS_INTERVAL (seconds between samples)"}
+        try:
+            report = self.trends.history.trending(parse_window(window), limit, sort)
+        except ValueError as e:
+            return {"error": str(e)}
+        report["sampling_interval"] = self.trends.interval
+        if self.trends.last_error:
+            report["last_sample_error"] = self.trends.last_error
+        return report
+
     def bulk_delete_comments(self, comment_ids: list[str]) -> list[dict[str, Any]]:
         """Delete multiple comments and return their results."""
         results = []
+        progress = Progress(len(comment_ids))
         for cid in comment_ids:
             res = self.api.delete_comment(cid)
             results.append({"comment_id": cid, "result": res})
+            progress.step(f"Comment {cid}", res, results[-1])
         return results
 
     def bulk_hide_comments(self, comment_ids: list[str]) -> list[dict[str, Any]]:
         """Hide multiple comments and return their results."""
         results = []
+        progress = Progress(len(comment_ids))
         for cid in comment_ids:
             res = self.api.hide_comment(cid)
             results.append({"comment_id": cid, "result": res})
+            progress.step(f"Comment {cid}", res, results[-1])
         return results
     
     def create_storie_list_media(self, media_urls: list[str]) -> dict[str, Any]:
@@ -185,6 +273,26 @@ class Manager:
         """
         return self.api.post_video_to_facebook(video_url, content_prompt)
     
+    def generate_captions(self, content_prompt: str, n: int, seed: int = None) -> dict[str, Any]:
+        """Generate several distinct viral copyright texts for the same content.
+        
+        Args:
+            content_prompt: Description of the media content
+            n: Number of variants wanted
+            seed: Optional seed for reproducible output
+        
+        Returns:
+            dict: The generated captions and how many were produced
+        """
+        if n < 1:
+            return {"error": f"n must be at least 1, got {n}"}
+        captions = self.api.generate_captions(content_prompt, n, seed)
+        return {
+            "original_prompt": content_prompt,
+            "captions": captions,
+            "count": len(captions)
+        }
+    
     def create_page_media_post(self, page_id: str, media_urls: list[str], content_prompt: str, page_access_token: str = None) -> dict[str, Any]:
         """Create a media post on a specific Facebook page with auto-generated viral copyright text.
         
@@ -197,7 +305,9 @@ class Manager:
         Returns:
             dict: Response with results from all media posts and generated copyright text
         """
-        return self.api.create_page_media_post(page_id, media_urls, content_prompt, page_access_token)
+        # Another page's uploads are a separate flow, so they take turns with this page's requests
+        with prioritized(page=page_id):
+            return self.api.create_page_media_post(page_id, media_urls, content_prompt, page_access_token)
 
     def post_media_to_facebook(self, media_urls: list[str], content_prompt: str) -> dict[str, Any]:
         """Post multiple media files (images/videos) with auto-generated viral copyright text.
@@ -210,22 +320,70 @@ class Manager:
             dict: Response with results from all media posts and generated copyright text
         """
         return self.api.post_media_to_facebook(media_urls, content_prompt)
+
+    def submit_post_media_to_facebook(self, media_urls: list[str], content_prompt: str) -> dict[str, Any]:
+        """Run post_media_to_facebook as a background job.
+        
+        Returns:
+            dict: Job ID and status; poll with get_job_status
+        """
+        return self.jobs.submit("post_media_to_facebook", {"media_urls": media_urls, "content_prompt": content_prompt})
+
+    def submit_create_page_media_post(self, page_id: str, media_urls: list[str], content_prompt: str, page_access_token: str = None) -> dict[str, Any]:
+        """Run create_page_media_post as a background job.
+        
+        Returns:
+            dict: Job ID and status; poll with get_job_status
+        """
+        return self.jobs.submit("create_page_media_post", {
+            "page_id": page_id,
+            "media_urls": media_urls,
+            "content_prompt": content_prompt,
+            "page_access_token": page_access_token,
+        })
+
+    def submit_create_storie_list_media(self, media_urls: list[str]) -> dict[str, Any]:
+        """Run create_storie_list_media as a background job.
+        
+        Returns:
+            dict: Job ID and status; poll with get_job_status
+        """
+        return self.jobs.submit("create_storie_list_media", {"media_urls": media_urls})
+
+    def get_job_status(self, job_id: str) -> dict[str, Any]:
+        """Status of a background job, with its result once it has finished."""
+        return self.jobs.status(job_id)
+
+    def list_jobs(self, status: str = None) -> list[dict[str, Any]]:
+        """Background jobs, newest first, optionally only those with `status`."""
+        return self.jobs.list_jobs(status)
+
+    def cancel_job(self, job_id: str) -> dict[str, Any]:
+        """Cancel a background job that has not started yet."""
+        return self.jobs.cancel(job_id)
     
     def get_my_stories(self, limit: int = None) -> dict[str, Any]:
         """Get the list of recent stories from the page.
         
         Args:
-            limit: Optional number of stories to retrieve. If None, gets all available stories.
+            limit: Optional number of stories to retrieve. If None, one page of the most recent ones.
         
         Returns:
             dict: Response with list of stories and metadata
         """
         return self.api.get_my_stories(limit)
     
-    def get_my_last_post(self) -> dict[str, Any]:
+    def get_my_last_post(self, profile: str = None, fields: str = None) -> dict[str, Any]:
         """Get the most recent post from the page.
         
+        Args:
+            profile: Field profile to fetch ("id", "lean", "engagement", "full"). Defaults to "full"
+            fields: Comma-separated fields to fetch instead of a profile
+        
         Returns:
             dict: Response with the last post data and comprehensive metadata
         """
-        return self.api.get_my_last_post()
+        return self.api.get_my_last_post(profile, fields)
+
+    def execute_plan(self, steps: list[dict[str, Any]]) -> dict[str, Any]:
+        return self.plans.execute(steps)
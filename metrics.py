@@ -0,0 +1,303 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterator
+
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_ID_SEGMENT = re.compile(r"(?<![^/])\d+(?:_\d+)?(?![^/])")
+
+
+def endpoint_template(endpoint: str) -> str:
+    """Collapse object IDs so metrics are grouped per endpoint, e.g. '{id}/comments'."""
+    return _ID_SEGMENT.sub("{id}", endpoint)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus style)."""
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self) -> list[int]:
+        running, result = 0, []
+        for count in self.counts:
+            running += count
+            result.append(running)
+        return result
+
+    def quantile(self, q: float) -> float | None:
+        """Bucket upper bound under which a fraction `q` of observations fall."""
+        if not self.count:
+            return None
+        target = q * self.count
+        for bound, cumulative in zip(LATENCY_BUCKETS, self.cumulative()):
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+
+class _Series:
+    """Counters and latency histogram for one tool or one Graph endpoint."""
+
+    __slots__ = ("latency", "calls", "errors", "bytes_sent", "bytes_received", "graph_calls", "graph_seconds")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.calls = 0
+        self.errors: dict[str, int] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.graph_calls = 0        # tools only: Graph requests made by the tool
+        self.graph_seconds = 0.0    # tools only: time spent waiting on Graph
+
+    def snapshot(self) -> dict[str, Any]:
+        latency = self.latency
+        return {
+            "calls": self.calls,
+            "errors": dict(self.errors),
+            "avg_ms": round(latency.total / latency.count * 1000, 2) if latency.count else None,
+            "p50_ms_le": _ms(latency.quantile(0.5)),
+            "p99_ms_le": _ms(latency.quantile(0.99)),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+        }
+
+
+class _Queue:
+    """Waits of the Graph requests of one priority class for a free slot."""
+
+    __slots__ = ("latency", "queued")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.queued = 0     # requests that found no free slot
+
+
+class _ToolCall:
+    """Graph traffic attributed to the tool call currently running."""
+
+    __slots__ = ("graph_calls", "graph_seconds")
+
+    def __init__(self):
+        self.graph_calls = 0
+        self.graph_seconds = 0.0
+
+
+_current_tool_call: ContextVar[_ToolCall | None] = ContextVar("current_tool_call", default=None)
+
+
+class MetricsRegistry:
+    """Per-tool and per-Graph-endpoint metrics.
+
+    Graph requests are attributed to the tool call running in the same
+    context (use `propagate` for work handed to other threads), which gives
+    the fan-out of every tool and the split between network and local time.
+    """
+
+    def __init__(self):
+        self._tools: dict[str, _Series] = {}
+        self._endpoints: dict[tuple[str, str], _Series] = {}
+        self._hits: dict[str, int] = {}
+        self._events: dict[str, int] = {}
+        # Time Graph requests waited for a free slot, per priority class
+        self._queues: dict[str, _Queue] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    @contextmanager
+    def tool_call(self, tool: str) -> Iterator[None]:
+        """Time a tool call and collect the Graph requests it makes."""
+        call = _ToolCall()
+        token = _current_tool_call.set(call)
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_tool_call.reset(token)
+            with self._lock:
+                series = self._tools.setdefault(tool, _Series())
+                series.calls += 1
+                series.latency.observe(elapsed)
+                series.graph_calls += call.graph_calls
+                series.graph_seconds += call.graph_seconds
+                if error:
+                    series.errors[error] = series.errors.get(error, 0) + 1
+
+    def record_tool_result(self, tool: str, result: Any, result_bytes: int) -> None:
+        """Count error results and response size of a finished tool call."""
+        with self._lock:
+            series = self._tools.setdefault(tool, _Series())
+            series.bytes_sent += result_bytes
+            if isinstance(result, dict) and "error" in result:
+                series.errors["error_result"] = series.errors.get("error_result", 0) + 1
+
+    def record_graph_call(self, method: str, endpoint: str, seconds: float, error: str | None,
+                          bytes_sent: int, bytes_received: int) -> None:
+        call = _current_tool_call.get()
+        with self._lock:
+            series = self._endpoints.setdefault((method, endpoint_template(endpoint)), _Series())
+            series.calls += 1
+            series.latency.observe(seconds)
+            series.bytes_sent += bytes_sent
+            series.bytes_received += bytes_received
+            if error is not None:
+                series.errors[error] = series.errors.get(error, 0) + 1
+            if call is not None:
+                call.graph_calls += 1
+                call.graph_seconds += seconds
+
+    def record_queue_wait(self, priority: str, seconds: float, queued: bool) -> None:
+        """Record how long a Graph request of a priority class waited to be sent."""
+        with self._lock:
+            queue = self._queues.setdefault(priority, _Queue())
+            queue.latency.observe(seconds)
+            queue.queued += queued
+
+    def hit(self, name: str, count: int = 1) -> None:
+        """Count a cache or coalescing hit (a Graph request that was avoided)."""
+        with self._lock:
+            self._hits[name] = self._hits.get(name, 0) + count
+
+    def event(self, name: str, count: int = 1) -> None:
+        """Count a notable client-side event (e.g. a hedged request)."""
+        with self._lock:
+            self._events[name] = self._events.get(name, 0) + count
+
+    def propagate(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Bind `fn` to the current tool call (and its deadline), for running it in another thread."""
+        context = copy_context()
+
+        def run(*args, **kwargs):
+            # A context can only be entered by one thread at a time, so each run gets its own copy
+            return context.copy().run(fn, *args, **kwargs)
+        return run
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            tools = {}
+            for name, series in sorted(self._tools.items()):
+                tools[name] = {
+                    **series.snapshot(),
+                    "graph_calls_per_call": round(series.graph_calls / series.calls, 2) if series.calls else 0,
+                    "network_ms_total": round(series.graph_seconds * 1000, 1),
+                    "local_ms_total": round(max(series.latency.total - series.graph_seconds, 0) * 1000, 1),
+                }
+            endpoints = {f"{method} {endpoint}": series.snapshot() for (method, endpoint), series in sorted(self._endpoints.items())}
+            queues = {
+                priority: {
+                    "requests": queue.latency.count,
+                    "queued": queue.queued,
+                    "avg_wait_ms": round(queue.latency.total / queue.latency.count * 1000, 2),
+                    "p50_wait_ms_le": _ms(queue.latency.quantile(0.5)),
+                    "p99_wait_ms_le": _ms(queue.latency.quantile(0.99)),
+                }
+                for priority, queue in sorted(self._queues.items())
+            }
+            return {
+                "uptime_seconds": round(time.time() - self.started_at),
+                "tools": tools,
+                "graph_endpoints": endpoints,
+                "graph_queue": queues,
+                "hits": dict(self._hits),
+                "events": dict(self._events),
+            }
+
+    def prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def histogram(metric: str, help_text: str, series_by_labels: dict[str, _Series | _Queue]) -> None:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for labels, series in series_by_labels.items():
+                for bound, cumulative in zip(LATENCY_BUCKETS, series.latency.cumulative()):
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {series.latency.count}')
+                lines.append(f"{metric}_sum{{{labels}}} {series.latency.total:.6f}")
+                lines.append(f"{metric}_count{{{labels}}} {series.latency.count}")
+
+        def counter(metric: str, help_text: str, values: dict[str, float]) -> None:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for labels, value in values.items():
+                lines.append(f"{metric}{{{labels}}} {value}")
+
+        with self._lock:
+            tools = {f'tool="{name}"': s for name, s in sorted(self._tools.items())}
+            endpoints = {f'method="{m}",endpoint="{e}"': s for (m, e), s in sorted(self._endpoints.items())}
+
+            histogram("facebook_mcp_tool_duration_seconds", "MCP tool call latency.", tools)
+            counter("facebook_mcp_tool_errors_total", "MCP tool calls that failed or returned an error.",
+                    {f'{labels},error="{err}"': n for labels, s in tools.items() for err, n in s.errors.items()})
+            counter("facebook_mcp_tool_graph_requests_total", "Graph requests made by MCP tool calls.",
+                    {labels: s.graph_calls for labels, s in tools.items()})
+            counter("facebook_mcp_tool_graph_seconds_total", "Time MCP tool calls spent waiting on Graph.",
+                    {labels: round(s.graph_seconds, 6) for labels, s in tools.items()})
+            counter("facebook_mcp_tool_response_bytes_total", "Serialized bytes returned by MCP tools.",
+                    {labels: s.bytes_sent for labels, s in tools.items()})
+
+            histogram("facebook_mcp_graph_request_duration_seconds", "Graph API request latency.", endpoints)
+            counter("facebook_mcp_graph_errors_total", "Graph API errors by error code.",
+                    {f'{labels},code="{err}"': n for labels, s in endpoints.items() for err, n in s.errors.items()})
+            counter("facebook_mcp_graph_bytes_sent_total", "Bytes sent to the Graph API.",
+                    {labels: s.bytes_sent for labels, s in endpoints.items()})
+            counter("facebook_mcp_graph_bytes_received_total", "Bytes received from the Graph API.",
+                    {labels: s.bytes_received for labels, s in endpoints.items()})
+            histogram("facebook_mcp_graph_queue_seconds", "Time Graph requests waited for a free slot, by priority class.",
+                      {f'priority="{name}"': queue for name, queue in sorted(self._queues.items())})
+            counter("facebook_mcp_hits_total", "Graph requests avoided by caches and request coalescing.",
+                    {f'kind="{name}"': n for name, n in sorted(self._hits.items())})
+            counter("facebook_mcp_events_total", "Client-side events such as hedged requests.",
+                    {f'kind="{name}"': n for name, n in sorted(self._events.items())})
+        return "\n".join(lines) + "\n"
+
+
+def serve_prometheus(registry: MetricsRegistry, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve GET /metrics in a background thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+def _ms(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 1)
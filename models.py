@@ -0,0 +1,135 @@
+import json
+import keyword
+from collections.abc import Mapping
+from typing import Any, Iterator
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library parser is used instead
+    orjson = None
+
+
+def loads(data: bytes | str) -> Any:
+    """Decode a Graph response body, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Distinct key sets remembered per model (Graph responses use only a handful)
+MAX_SHAPES = 256
+
+
+def _attribute(field: str) -> str:
+    # Graph fields that are Python keywords ("from") get a trailing underscore
+    return f"{field}_" if keyword.iskeyword(field) else field
+
+
+class GraphObject(Mapping):
+    """A Graph node stored as a compact struct: a tuple of values plus a shared layout.
+
+    Objects decoded with the same set of fields (usually a whole page) share
+    one key -> position index, so each object only holds two slots and a
+    tuple instead of a dict. Objects are read-only mappings, so code written
+    against the decoded JSON (`obj.get("message")`, `obj["id"]`) works
+    unchanged, and the model's FIELDS are also attributes (`comment.message`,
+    None when Graph did not return it). `to_dict()` gives back the JSON
+    object; tool results are converted with `to_plain` before leaving the
+    server.
+    """
+
+    __slots__ = ("_shape", "_values")
+    FIELDS: tuple[str, ...] = ()
+    _shapes: dict[tuple[str, ...], dict[str, int]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._shapes = {}
+        for field in cls.FIELDS:
+            setattr(cls, _attribute(field), property(lambda self, field=field: self.get(field)))
+
+    @classmethod
+    def from_graph(cls, data: dict[str, Any]) -> "GraphObject":
+        keys = tuple(data)
+        shape = cls._shapes.get(keys)
+        if shape is None:
+            shape = {key: i for i, key in enumerate(keys)}
+            if len(cls._shapes) < MAX_SHAPES:
+                cls._shapes[keys] = shape
+        obj = object.__new__(cls)
+        obj._shape = shape
+        obj._values = tuple(data.values())
+        return obj
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[self._shape[key]]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        i = self._shape.get(key)
+        return default if i is None else self._values[i]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._shape
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._shape)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def to_dict(self) -> dict[str, Any]:
+        return dict(zip(self._shape, self._values))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return type(self).from_graph, (self.to_dict(),)
+
+
+class Post(GraphObject):
+    FIELDS = ("id", "message", "created_time", "updated_time", "permalink_url", "full_picture", "picture",
+              "status_type", "story", "privacy", "place", "shares", "likes", "comments", "reactions",
+              "attachments", "is_published", "scheduled_publish_time")
+    __slots__ = ()
+
+
+class Comment(GraphObject):
+    FIELDS = ("id", "message", "created_time", "from", "like_count", "comment_count", "is_hidden",
+              "permalink_url", "parent", "attachment", "message_tags")
+    __slots__ = ()
+
+
+class Photo(GraphObject):
+    FIELDS = ("id", "created_time", "permalink_url", "source", "images", "name", "link")
+    __slots__ = ()
+
+
+class Video(GraphObject):
+    FIELDS = ("id", "created_time", "permalink_url", "source", "picture", "description", "title", "length")
+    __slots__ = ()
+
+
+class InsightValue(GraphObject):
+    FIELDS = ("id", "name", "period", "values", "title", "description")
+    __slots__ = ()
+
+
+def decode_page(page: dict[str, Any], model: type[GraphObject]) -> dict[str, Any]:
+    """Turn the items of a Graph list response into `model` objects, in place."""
+    data = page.get("data")
+    if isinstance(data, list) and "error" not in page:
+        from_graph = model.from_graph
+        page["data"] = [from_graph(item) if isinstance(item, dict) else item for item in data]
+    return page
+
+
+def to_plain(value: Any) -> Any:
+    """Convert models inside a result back to JSON types (the MCP boundary)."""
+    if isinstance(value, GraphObject):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {k: to_plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_plain(v) for v in value]
+    return value
@@ -0,0 +1,395 @@
+import inspect
+import re
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable
+from urllib.parse import quote
+from scheduling import MAX_BATCH_SIZE
+
+
+MAX_PLAN_STEPS = 50
+
+# Manager methods a plan step cannot call
+EXCLUDED_OPS = {"execute_plan"}
+
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+_STEP_ID = re.compile(r"[A-Za-z_][\w-]*")
+# "$step", "$step.data[0].id", "$step.data[*].id"
+_REFERENCE = re.compile(r"\$([A-Za-z_][\w-]*)((?:\.[^.\[\]]+|\[(?:-?\d+|\*)\])*)")
+_PATH_PART = re.compile(r"\.([^.\[\]]+)|\[(-?\d+|\*)\]")
+
+
+class PlanError(ValueError):
+    pass
+
+
+def parse_reference(value: Any, step_ids: set[str]) -> tuple[str, list[str | int]] | None:
+    """(step id, path) if `value` is a reference to one of `step_ids`, else None.
+
+    Strings that merely start with "$" (prices, unknown names) are left as literals.
+    """
+    if not isinstance(value, str):
+        return None
+    match = _REFERENCE.fullmatch(value)
+    if match is None or match.group(1) not in step_ids:
+        return None
+    path = []
+    for key, index in _PATH_PART.findall(match.group(2)):
+        path.append(key if key else ("*" if index == "*" else int(index)))
+    return match.group(1), path
+
+
+def resolve_path(value: Any, path: list[str | int]) -> Any:
+    """Follow a reference path into a step result; "*" maps the rest of the path over a list."""
+    for i, part in enumerate(path):
+        if part == "*":
+            if not isinstance(value, list):
+                raise LookupError(f"[*] applied to {type(value).__name__}, not a list")
+            return [resolve_path(item, path[i + 1:]) for item in value]
+        if isinstance(part, int):
+            if not isinstance(value, list) or not -len(value) <= part < len(value):
+                raise LookupError(f"index [{part}] out of range")
+        elif not isinstance(value, Mapping) or part not in value:
+            raise LookupError(f"no key {part!r}")
+        value = value[part]
+    return value
+
+
+def _references(value: Any, step_ids: set[str]) -> list[tuple[str, list[str | int]]]:
+    ref = parse_reference(value, step_ids)
+    if ref is not None:
+        return [ref]
+    if isinstance(value, dict):
+        return [r for v in value.values() for r in _references(v, step_ids)]
+    if isinstance(value, list):
+        return [r for v in value for r in _references(v, step_ids)]
+    return []
+
+
+def _substitute(value: Any, step_ids: set[str], lookup: Callable[[str, list[str | int]], Any]) -> Any:
+    ref = parse_reference(value, step_ids)
+    if ref is not None:
+        return lookup(*ref)
+    if isinstance(value, dict):
+        return {k: _substitute(v, step_ids, lookup) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_substitute(v, step_ids, lookup) for v in value]
+    return value
+
+
+class _BatchReference(str):
+    """A {result=<name>:$.<path>} reference to an operation of the same batch,
+    as opposed to user text that happens to look like one."""
+    __slots__ = ()
+
+
+def _form(body: dict[str, Any]) -> str:
+    """URL-encode a batch operation body, leaving {result=...} references readable to Graph."""
+    parts = []
+    for key, value in body.items():
+        text = "true" if value is True else "false" if value is False else str(value)
+        encoded = text if isinstance(value, _BatchReference) else quote(text, safe="")
+        parts.append(f"{quote(key, safe='')}={encoded}")
+    return "&".join(parts)
+
+
+def _op(method: str, relative_url: str, body: dict[str, Any] = None) -> dict[str, Any]:
+    op = {"method": method, "relative_url": relative_url}
+    if body:
+        op["body"] = _form(body)
+    return op
+
+
+class _Foldable:
+    """How a Manager operation is expressed as Graph batch operations.
+
+    `build(args, page_id)` returns the operations and `combine(args, responses)`
+    turns their responses into what the Manager method would have returned.
+    Operations whose single response is returned as is can be referenced by
+    later operations in the same batch.
+    """
+
+    __slots__ = ("build", "combine")
+
+    def __init__(self, build: Callable[[dict[str, Any], str], list[dict[str, Any]]],
+                 combine: Callable[[dict[str, Any], list[Any]], Any] = None):
+        self.build = build
+        self.combine = combine
+
+    @property
+    def raw(self) -> bool:
+        return self.combine is None
+
+
+def _bulk(method: str, body: dict[str, Any] = None) -> _Foldable:
+    return _Foldable(lambda a, page: [_op(method, cid, body) for cid in a["comment_ids"]],
+                     lambda a, responses: [{"comment_id": cid, "result": r} for cid, r in zip(a["comment_ids"], responses)])
+
+
+# Manager operations that are a single Graph call (or one per item) and can be
+# folded into batch requests. Everything else runs as a normal Manager call.
+FOLDABLE: dict[str, _Foldable] = {
+    "post_to_facebook": _Foldable(lambda a, page: [_op("POST", f"{page}/feed", {"message": a["message"]})]),
+    "reply_to_comment": _Foldable(lambda a, page: [_op("POST", f"{a['comment_id']}/comments", {"message": a["message"]})]),
+    "update_post": _Foldable(lambda a, page: [_op("POST", f"{a['post_id']}", {"message": a["new_message"]})]),
+    "delete_post": _Foldable(lambda a, page: [_op("DELETE", f"{a['post_id']}")]),
+    "delete_comment": _Foldable(lambda a, page: [_op("DELETE", f"{a['comment_id']}")]),
+    "delete_comment_from_post": _Foldable(lambda a, page: [_op("DELETE", f"{a['comment_id']}")]),
+    "hide_comment": _Foldable(lambda a, page: [_op("POST", f"{a['comment_id']}", {"is_hidden": True})]),
+    "unhide_comment": _Foldable(lambda a, page: [_op("POST", f"{a['comment_id']}", {"is_hidden": False})]),
+    "get_page_fan_count": _Foldable(lambda a, page: [_op("GET", f"{page}?fields=fan_count")],
+                                    lambda a, r: r[0].get("fan_count", 0)),
+    "get_post_share_count": _Foldable(lambda a, page: [_op("GET", f"{a['post_id']}?fields=shares")],
+                                      lambda a, r: r[0].get("shares", {}).get("count", 0)),
+    "get_number_of_likes": _Foldable(lambda a, page: [_op("GET", f"{a['post_id']}?fields=likes.summary(true)")],
+                                     lambda a, r: r[0].get("likes", {}).get("summary", {}).get("total_count", 0)),
+    "bulk_hide_comments": _bulk("POST", {"is_hidden": True}),
+    "bulk_delete_comments": _bulk("DELETE"),
+}
+
+
+class _Step:
+    __slots__ = ("id", "op", "args", "deps", "refs")
+
+    def __init__(self, step_id: str, op: str, args: dict[str, Any], deps: set[str], refs: list[tuple[str, list]]):
+        self.id = step_id
+        self.op = op
+        self.args = args
+        self.deps = deps
+        self.refs = refs
+
+
+def _graph_path(path: list[str | int]) -> str | None:
+    """Graph's JSONPath for a reference path, or None if Graph cannot express it."""
+    if not path or any(p == "*" or (isinstance(p, int) and p < 0) for p in path):
+        return None
+    return "$." + ".".join(str(p) for p in path)
+
+
+def _outcome(result: Any, batched: bool) -> dict[str, Any]:
+    failed = isinstance(result, dict) and "error" in result
+    outcome = {"status": FAILED if failed else SUCCEEDED, "batched": batched}
+    if failed:
+        outcome["error"] = result["error"]
+    else:
+        outcome["result"] = result
+    return outcome
+
+
+class PlanExecutor:
+    """Runs a DAG of Manager operations submitted as one request.
+
+    A step is {"id", "op", "args", "depends_on"}: `op` names a Manager method
+    and any string argument of the form "$<step id>.<path>" (e.g.
+    "$last.data.id", "$comments.data[0].id", "$negative[*].id") is replaced by
+    that part of an earlier step's result. Steps start as soon as the steps
+    they reference (or list in depends_on) have succeeded, so independent
+    branches run in parallel; dependents of a failed step are skipped.
+
+    Ready steps that are single Graph calls (see FOLDABLE) are folded into
+    one batch request. A step referencing another step of the same batch is
+    sent in that batch too, with Graph's {result=<name>:$.<path>} reference,
+    so a chain such as "post, then comment on it" costs one round trip.
+
+    Args:
+        manager: Object whose public methods are the plan operations
+        batch: Runs Graph batch operations (FacebookAPI._batch)
+        page_id: Page the page-level operations address
+        workers: Steps run at the same time
+        propagate: Wraps functions run on worker threads (metrics context)
+        on_deleted: Called with the ID of every object a batched operation deleted,
+            for the bookkeeping the Manager method would have done (search index)
+    """
+
+    def __init__(self, manager: Any, batch: Callable[[list[dict[str, Any]]], list[Any]], page_id: str,
+                 workers: int = 4, propagate: Callable[[Callable], Callable] = None,
+                 on_deleted: Callable[[str], None] = None):
+        self.manager = manager
+        self.batch = batch
+        self.page_id = page_id
+        self.workers = workers
+        self.propagate = propagate or (lambda fn: fn)
+        self.on_deleted = on_deleted
+
+    def operations(self) -> list[str]:
+        """Names of the Manager methods a plan can call."""
+        return sorted(name for name, member in inspect.getmembers(type(self.manager), inspect.isfunction)
+                      if not name.startswith("_") and name not in EXCLUDED_OPS)
+
+    def compile(self, steps: list[dict[str, Any]]) -> list[_Step]:
+        """Validate a plan and return its steps in dependency order."""
+        if not isinstance(steps, list) or not steps:
+            raise PlanError("steps must be a non-empty list")
+        if len(steps) > MAX_PLAN_STEPS:
+            raise PlanError(f"A plan can have at most {MAX_PLAN_STEPS} steps")
+        step_ids = set()
+        for i, step in enumerate(steps):
+            step_id = step.get("id") if isinstance(step, dict) else None
+            if not isinstance(step_id, str) or not _STEP_ID.fullmatch(step_id):
+                raise PlanError(f"Step {i}: id must be a name made of letters, digits, '_' or '-'")
+            if step_id in step_ids:
+                raise PlanError(f"Duplicate step id: {step_id}")
+            step_ids.add(step_id)
+
+        allowed = set(self.operations())
+        compiled = {}
+        for step in steps:
+            step_id, op, args = step["id"], step.get("op"), step.get("args") or {}
+            if op not in allowed:
+                raise PlanError(f"Step {step_id}: unknown operation {op!r}")
+            if not isinstance(args, dict):
+                raise PlanError(f"Step {step_id}: args must be an object")
+            try:
+                bound = inspect.signature(getattr(self.manager, op)).bind(**args)
+            except TypeError as e:
+                raise PlanError(f"Step {step_id}: {e}") from None
+            bound.apply_defaults()
+            refs = _references(args, step_ids)
+            depends_on = step.get("depends_on") or []
+            unknown = [d for d in depends_on if d not in step_ids]
+            if unknown:
+                raise PlanError(f"Step {step_id}: depends_on names unknown step {unknown[0]!r}")
+            deps = set(depends_on) | {ref[0] for ref in refs}
+            if step_id in deps:
+                raise PlanError(f"Step {step_id} depends on itself")
+            compiled[step_id] = _Step(step_id, op, dict(bound.arguments), deps, refs)
+
+        # Kahn's algorithm, keeping the submitted order among independent steps
+        ordered, done = [], set()
+        remaining = [compiled[s["id"]] for s in steps]
+        while remaining:
+            ready = [s for s in remaining if s.deps <= done]
+            if not ready:
+                raise PlanError(f"Steps form a cycle: {', '.join(s.id for s in remaining)}")
+            ordered.extend(ready)
+            done.update(s.id for s in ready)
+            remaining = [s for s in remaining if s.id not in done]
+        return ordered
+
+    def execute(self, steps: list[dict[str, Any]]) -> dict[str, Any]:
+        """Run a plan.
+
+        Returns:
+            dict: "steps" maps each step id to its "status" (succeeded, failed or
+            skipped) and its "result" or "error"; plus counts per status and the
+            number of Graph batch requests sent
+        """
+        try:
+            order = self.compile(steps)
+        except PlanError as e:
+            return {"error": str(e)}
+        step_ids = {s.id for s in order}
+        outcomes: dict[str, dict[str, Any]] = {}
+        pending = list(order)
+        running = {}
+        batches = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="plan") as pool:
+            while pending or running:
+                for step in list(pending):
+                    failed = [d for d in step.deps if d in outcomes and outcomes[d]["status"] != SUCCEEDED]
+                    if failed:
+                        outcomes[step.id] = {"status": SKIPPED, "error": f"Step {failed[0]} did not succeed"}
+                        pending.remove(step)
+
+                folded = self._fold(pending, outcomes, step_ids)
+                if len(folded) > 1 or (folded and len(folded[0][1]) > 1):
+                    for step, _, _ in folded:
+                        pending.remove(step)
+                    running[pool.submit(self.propagate(self._run_batch), folded)] = [s.id for s, _, _ in folded]
+                    batches += 1
+                for step in [s for s in pending if s.deps <= outcomes.keys()]:
+                    pending.remove(step)
+                    try:
+                        args = _substitute(step.args, step_ids, lambda ref, path: resolve_path(outcomes[ref]["result"], path))
+                    except LookupError as e:
+                        outcomes[step.id] = {"status": FAILED, "error": f"Cannot resolve an argument: {e}"}
+                        continue
+                    running[pool.submit(self.propagate(self._run_step), step, args)] = [step.id]
+
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    ids = running.pop(future)
+                    try:
+                        outcomes.update(future.result())
+                    except Exception as e:
+                        for step_id in ids:
+                            outcomes[step_id] = {"status": FAILED, "error": f"{type(e).__name__}: {e}"}
+
+        statuses = [outcomes[s.id]["status"] for s in order]
+        return {
+            "steps": {s["id"]: outcomes[s["id"]] for s in steps},
+            "succeeded": statuses.count(SUCCEEDED),
+            "failed": statuses.count(FAILED),
+            "skipped": statuses.count(SKIPPED),
+            "graph_batches": batches,
+        }
+
+    def _fold(self, pending: list[_Step], outcomes: dict[str, dict[str, Any]],
+              step_ids: set[str]) -> list[tuple[_Step, dict[str, Any], list[dict[str, Any]]]]:
+        """Pending foldable steps that can go into one batch request now, with their args and operations."""
+        folded, in_batch, size = [], {}, 0
+        for step in pending:
+            spec = FOLDABLE.get(step.op)
+            if spec is None:
+                continue
+            inner = step.deps - outcomes.keys()
+            if not inner <= in_batch.keys():
+                continue
+            explicit = sorted(d for d in inner if all(ref != d for ref, _ in step.refs))
+            if inner and (
+                    # Graph resolves references to named single-response operations,
+                    # and an operation can name one other in depends_on
+                    not spec.raw or len(explicit) > 1
+                    or any(not FOLDABLE[in_batch[d].op].raw for d in inner)
+                    or any(_graph_path(path) is None for ref, path in step.refs if ref in inner)):
+                continue
+
+            def lookup(ref, path):
+                if ref in inner:
+                    return _BatchReference(f"{{result={ref}:{_graph_path(path)}}}")
+                return resolve_path(outcomes[ref]["result"], path)
+
+            try:
+                args = _substitute(step.args, step_ids, lookup)
+                ops = spec.build(args, self.page_id)
+            except (LookupError, TypeError, AttributeError):
+                continue  # run on its own, where the error is reported
+            if folded and size + len(ops) > MAX_BATCH_SIZE:
+                continue
+            if spec.raw:
+                ops = [{**ops[0], "name": step.id, "omit_response_on_success": False}]
+            if explicit:
+                ops = [{**ops[0], "depends_on": explicit[0]}]
+            folded.append((step, args, ops))
+            in_batch[step.id] = step
+            size += len(ops)
+        return folded
+
+    def _run_batch(self, folded: list[tuple[_Step, dict[str, Any], list[dict[str, Any]]]]) -> dict[str, dict[str, Any]]:
+        responses = self.batch([op for _, _, ops in folded for op in ops])
+        outcomes, start = {}, 0
+        for step, args, ops in folded:
+            chunk = responses[start:start + len(ops)]
+            start += len(ops)
+            failed = [d for d in step.deps if d in outcomes and outcomes[d]["status"] != SUCCEEDED]
+            if failed:
+                # Graph did not run it either
+                outcomes[step.id] = {"status": SKIPPED, "error": f"Step {failed[0]} did not succeed"}
+                continue
+            spec = FOLDABLE[step.op]
+            outcomes[step.id] = _outcome(chunk[0] if spec.raw else spec.combine(args, chunk), batched=True)
+            if self.on_deleted is not None:
+                for op, response in zip(ops, chunk):
+                    # A reference to an object created in this batch: never indexed
+                    if op["method"] == "DELETE" and "error" not in response and not op["relative_url"].startswith("{"):
+                        self.on_deleted(op["relative_url"])
+        return outcomes
+
+    def _run_step(self, step: _Step, args: dict[str, Any]) -> dict[str, dict[str, Any]]:
+        return {step.id: _outcome(getattr(self.manager, step.op)(**args), batched=False)}
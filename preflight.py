@@ -0,0 +1,229 @@
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+from urllib.parse import urlsplit
+
+from imaging import SHRINKABLE_FORMATS, local_path
+
+MB = 1024 * 1024
+
+# What Facebook accepts per destination: media types, largest photo / video /
+# file in bytes, longest video in seconds (None = not limited here). Post
+# videos are non-resumable uploads (1 GB, 20 minutes); stories take videos up
+# to 60 seconds; Messenger attachments are capped at 25 MB
+LIMITS = {
+    "post": {"types": {"image", "video"}, "image": 10 * MB, "video": 1024 * MB, "video_seconds": 20 * 60},
+    "story": {"types": {"image", "video"}, "image": 10 * MB, "video": 1024 * MB, "video_seconds": 60},
+    "message": {"types": {"image", "video", "file"}, "image": 25 * MB, "video": 25 * MB, "file": 25 * MB,
+                "video_seconds": None},
+}
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".avi", ".mkv", ".webm"}
+
+# HEAD checks of remote media in flight at once
+HEAD_CONCURRENCY = 8
+
+
+def type_from_extension(url: str) -> str:
+    """"image", "video" or "file" from the extension of a URL or path."""
+    extension = os.path.splitext(urlsplit(url).path)[1].lower()
+    if extension in IMAGE_EXTENSIONS:
+        return "image"
+    if extension in VIDEO_EXTENSIONS:
+        return "video"
+    return "file"
+
+
+def sniff(head: bytes) -> tuple[str, str] | None:
+    """Media type and format from the first bytes of a file, or None if unknown."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image", "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image", "png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image", "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image", "webp"
+    if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+        return "video", "avi"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in (b"heic", b"heix", b"mif1", b"msf1"):
+            return "image", "heic"
+        return "video", "mov" if brand == b"qt  " else "mp4"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "video", "webm" if b"webm" in head[:64] else "mkv"
+    return None
+
+
+def _boxes(f, end: int):
+    """(type, payload start, box end) of the ISO-BMFF boxes between the current offset and `end`."""
+    while f.tell() + 8 <= end:
+        start = f.tell()
+        size, kind = struct.unpack(">I4s", f.read(8))
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+        elif size == 0:
+            size = end - start
+        if size < 8:
+            return
+        yield kind, f.tell(), start + size
+        f.seek(start + size)
+
+
+def mp4_duration(path: str) -> float | None:
+    """Duration in seconds of an MP4/MOV file from its movie header, without reading the media."""
+    with open(path, "rb") as f:
+        end = os.fstat(f.fileno()).st_size
+        for kind, start, box_end in _boxes(f, end):
+            if kind != b"moov":
+                continue
+            for child, child_start, _ in _boxes(f, box_end):
+                if child != b"mvhd":
+                    continue
+                version = f.read(4)[0]
+                if version == 1:
+                    f.seek(16, os.SEEK_CUR)
+                    timescale, duration = struct.unpack(">IQ", f.read(12))
+                else:
+                    f.seek(8, os.SEEK_CUR)
+                    timescale, duration = struct.unpack(">II", f.read(8))
+                return duration / timescale if timescale else None
+    return None
+
+
+def inspect_file(path: str) -> dict[str, Any]:
+    """Type (from magic bytes), size and, for MP4/MOV, duration of a local file."""
+    with open(path, "rb") as f:
+        head = f.read(64)
+    found = sniff(head)
+    info = {"type": found[0] if found else "file", "format": found[1] if found else None,
+            "bytes": os.path.getsize(path), "checked": "magic"}
+    if found in (("video", "mp4"), ("video", "mov")):
+        try:
+            info["seconds"] = mp4_duration(path)
+        except (OSError, struct.error, IndexError):
+            info["seconds"] = None
+    return info
+
+
+def check(info: dict[str, Any], destination: str, shrink_photos: bool = False) -> str | None:
+    """Why a media item cannot go to `destination` ("post", "story", "message"), or None if it can."""
+    if "error" in info:
+        return info["error"]
+    limits = LIMITS[destination]
+    kind = info["type"]
+    if info.get("unknown"):
+        # Neither the URL nor its host told us what it is: Graph fetches it and decides
+        return None
+    if kind not in limits["types"]:
+        detail = f" ({info['content_type']})" if info.get("content_type") else ""
+        return f"Unsupported media type{detail}: images and videos only"
+    size = info.get("bytes")
+    # Local photos that preprocessing can shrink are checked after they shrink
+    shrinks = kind == "image" and shrink_photos and info.get("format") in SHRINKABLE_FORMATS
+    if size is not None and size > limits[kind] and not shrinks:
+        return f"{kind.capitalize()} is {size / MB:.1f} MB; the limit is {limits[kind] // MB} MB"
+    seconds, longest = info.get("seconds"), limits["video_seconds"]
+    if kind == "video" and seconds is not None and longest is not None and seconds > longest:
+        return f"Video is {seconds:.0f} s long; the limit is {longest} s"
+    return None
+
+
+def _mark_unknown(info: dict[str, Any]) -> dict[str, Any]:
+    """Flag a URL whose type neither its extension nor its HEAD answer told (see check)."""
+    if info["type"] == "file" and info["checked"] == "extension" and "error" not in info:
+        info["unknown"] = True
+        info["warning"] = f"{info.get('warning', 'No usable content-type')}; media type unknown, left to Graph"
+    return info
+
+
+class MediaInspector:
+    """Type, size and duration of media before anything is uploaded.
+
+    Local files are identified by their magic bytes (and MP4/MOV duration by
+    the movie header). Remote URLs get a HEAD request (content-type and
+    content-length), several at a time, and the answers are cached. When a
+    HEAD request fails, is not allowed or says nothing useful, the type falls
+    back to the URL's extension and the item is marked unchecked rather than
+    rejected: Graph still has the final say. That includes URLs without an
+    extension (e.g. https://cdn.example.com/render?id=123), whose type stays
+    unknown and which pass with a warning.
+
+    Args:
+        head: Function sending a HEAD request for a URL; returns (status, headers)
+        ttl: Seconds a HEAD answer is reused
+        max_entries: HEAD answers kept
+        propagate: Wraps work run on the HEAD threads (e.g. metrics context)
+    """
+
+    def __init__(self, head: Callable[[str], tuple[int, dict[str, str]]], ttl: float = 600,
+                 max_entries: int = 1024, propagate: Callable[[Callable], Callable] = None):
+        self._head = head
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._propagate = propagate or (lambda fn: fn)
+        self._cache: dict[str, tuple[float, dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def inspect(self, urls: list[str]) -> dict[str, dict[str, Any]]:
+        """Info per URL: "type" ("image", "video", "file"), "bytes", "seconds" when known,
+        "checked" ("magic", "head" or "extension"), "unknown" when the type could not be told,
+        or "error" for media that cannot be used."""
+        results, remote = {}, []
+        for url in dict.fromkeys(urls):
+            path = local_path(url)
+            if path is not None:
+                results[url] = inspect_file(path)
+            elif urlsplit(url).scheme in ("http", "https"):
+                cached = self._cached(url)
+                if cached is None:
+                    remote.append(url)
+                else:
+                    results[url] = cached
+            else:
+                results[url] = {"type": type_from_extension(url), "error": "Not a URL or an existing local file"}
+        if len(remote) == 1:
+            results[remote[0]] = self._check_url(remote[0])
+        elif remote:
+            with ThreadPoolExecutor(max_workers=min(HEAD_CONCURRENCY, len(remote))) as executor:
+                results.update(zip(remote, executor.map(self._propagate(self._check_url), remote)))
+        return results
+
+    def _cached(self, url: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry = self._cache.get(url)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            return entry[1]
+
+    def _check_url(self, url: str) -> dict[str, Any]:
+        info = {"type": type_from_extension(url), "bytes": None, "checked": "extension"}
+        try:
+            status, headers = self._head(url)
+        except Exception as e:  # network trouble must not block publishing; Graph fetches the URL itself
+            return _mark_unknown({**info, "warning": f"HEAD request failed: {type(e).__name__}"})
+        if status in (404, 410):
+            info["error"] = f"URL returned HTTP {status}"
+        elif status >= 400:
+            info["warning"] = f"HEAD request returned HTTP {status}"
+        else:
+            content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+            major = content_type.split("/")[0]
+            if major in ("image", "video"):
+                info.update(type=major, checked="head")
+            elif content_type and content_type not in ("application/octet-stream", "binary/octet-stream"):
+                info.update(type="file", checked="head")
+            info["content_type"] = content_type or None
+            length = headers.get("content-length")
+            info["bytes"] = int(length) if length and length.isdigit() else None
+        _mark_unknown(info)
+        with self._lock:
+            if len(self._cache) >= self.max_entries:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[url] = (time.monotonic() + self.ttl, info)
+        return info
@@ -0,0 +1,151 @@
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator
+
+import deadlines
+
+# Priority classes of Graph requests, from the tool call or job that makes them
+INTERACTIVE = "interactive"
+NORMAL = "normal"
+BULK = "bulk"
+
+# Share of Graph capacity each class gets while requests are queued
+WEIGHTS = {INTERACTIVE: 16, NORMAL: 4, BULK: 1}
+
+# How often a queued request looks at its deadline (client cancellations arrive asynchronously)
+POLL_SECONDS = 0.05
+
+# (priority class, session, page) of the work running in this context
+_current_flow: ContextVar[tuple[str, str | None, str | None]] = ContextVar(
+    "current_request_flow", default=(NORMAL, None, None))
+
+
+@contextmanager
+def prioritized(priority: str = None, session: str = None, page: str = None) -> Iterator[None]:
+    """Send the Graph requests made in this context with this priority class,
+    on behalf of this session and page. Arguments left out keep their current value.
+    """
+    current = _current_flow.get()
+    if priority is not None and priority not in WEIGHTS:
+        raise ValueError(f"Unknown priority class: {priority!r} (use one of {', '.join(WEIGHTS)})")
+    token = _current_flow.set((priority or current[0], session or current[1], page or current[2]))
+    try:
+        yield
+    finally:
+        _current_flow.reset(token)
+
+
+def current() -> tuple[str, str | None, str | None]:
+    return _current_flow.get()
+
+
+class _Waiter:
+    __slots__ = ("start", "event", "granted", "abandoned")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.event = threading.Event()
+        self.granted = False
+        self.abandoned = False
+
+
+class RequestScheduler:
+    """Admits Graph requests, at most `concurrency` at a time, in weighted fair order.
+
+    Every (priority class, session, page) is a flow. While requests are
+    queued, each flow gets a share of the free slots proportional to its
+    class weight (start-time fair queuing): a quick interactive read is
+    sent ahead of the backlog of a bulk operation, several bulk operations
+    take turns, and bulk work still advances while interactive calls keep
+    coming. A request that finds a free slot and nobody queued is sent at
+    once.
+
+    Args:
+        concurrency: Graph requests in flight at most
+        weights: Weight of each priority class
+        on_wait: Called for every request with its priority class, the seconds it
+            waited and whether it had to queue
+    """
+
+    def __init__(self, concurrency: int, weights: dict[str, float] = None,
+                 on_wait: Callable[[str, float, bool], None] = None):
+        self.concurrency = max(1, concurrency)
+        self.weights = weights or WEIGHTS
+        self._on_wait = on_wait
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._queue: list[tuple[float, int, _Waiter]] = []
+        self._queued = 0
+        self._order = itertools.count()
+        # Virtual time: start tag of the request admitted last
+        self._virtual_time = 0.0
+        # Finish tag of the last request of each flow
+        self._finish: dict[tuple[str, str | None, str | None], float] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold one of the request slots for the duration of the block."""
+        flow = _current_flow.get()
+        start = time.perf_counter()
+        queued = self._acquire(flow)
+        if self._on_wait is not None:
+            self._on_wait(flow[0], time.perf_counter() - start, queued)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _acquire(self, flow: tuple[str, str | None, str | None]) -> bool:
+        """Wait for a slot; returns whether the request had to queue."""
+        with self._lock:
+            start = max(self._virtual_time, self._finish.get(flow, 0.0))
+            self._finish[flow] = start + 1 / self.weights.get(flow[0], 1)
+            if self._in_flight < self.concurrency and not self._queued:
+                self._in_flight += 1
+                self._virtual_time = start
+                return False
+            waiter = _Waiter(start)
+            heapq.heappush(self._queue, (self._finish[flow], next(self._order), waiter))
+            self._queued += 1
+        deadline = deadlines.current()
+        try:
+            while not waiter.event.wait(POLL_SECONDS if deadline is not None else None):
+                deadline.check()
+        except deadlines.Cancelled:
+            with self._lock:
+                if not waiter.granted:
+                    waiter.abandoned = True
+                    self._queued -= 1
+                    raise
+            # Admitted while being stopped: hand the slot on
+            self._release()
+            raise
+        return True
+
+    def _release(self) -> None:
+        with self._lock:
+            while self._queue:
+                _, _, waiter = heapq.heappop(self._queue)
+                if waiter.abandoned:
+                    continue
+                self._queued -= 1
+                self._virtual_time = waiter.start
+                waiter.granted = True
+                waiter.event.set()
+                return
+            self._in_flight -= 1
+            if not self._in_flight:
+                # Idle: flows that are not ahead of virtual time carry no state
+                self._finish = {flow: tag for flow, tag in self._finish.items() if tag > self._virtual_time}
@@ -0,0 +1,69 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+import deadlines
+
+# Receives (done, total, message, item) for every finished item of a bulk operation
+Reporter = Callable[[int, int, str, dict[str, Any]], None]
+
+_current_reporter: ContextVar[Reporter | None] = ContextVar("current_progress_reporter", default=None)
+
+
+@contextmanager
+def reporting(reporter: Reporter | None) -> Iterator[None]:
+    """Send the progress of bulk operations run in this context to `reporter`."""
+    token = _current_reporter.set(reporter)
+    try:
+        yield
+    finally:
+        _current_reporter.reset(token)
+
+
+def outcome(response: Any) -> str:
+    """One-line summary of a Graph response: its ID, "ok" or the error message."""
+    if isinstance(response, dict) and "error" in response:
+        error = response["error"]
+        return f"failed: {error.get('message', error) if isinstance(error, dict) else error}"
+    if isinstance(response, dict):
+        created = response.get("post_id") or response.get("id") or response.get("message_id")
+        if created:
+            return f"ok ({created})"
+    return "ok"
+
+
+class Progress:
+    """Counts the finished items of a bulk operation and reports each one.
+
+    Reports go to the reporter of the running tool call or job (see
+    `reporting`): MCP progress notifications, or a job's partial results.
+    Finished items are also recorded on the call's deadline, which reports
+    them if the call is stopped. Outside such a context counting is all that
+    happens.
+
+    Args:
+        total: Number of items the operation will go through
+    """
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self._reporter = _current_reporter.get()
+        self._deadline = deadlines.current()
+        if self._deadline is not None:
+            self._deadline.total += total
+
+    def step(self, label: str, response: Any, item: dict[str, Any] = None) -> None:
+        """Mark one item finished.
+
+        Args:
+            label: What the item is (e.g. "Comment 123" or a media URL)
+            response: Its Graph response, summarized in the report message
+            item: Its entry in the final result, kept as a partial result
+        """
+        self.done += 1
+        item = item or {"response": response}
+        if self._deadline is not None:
+            self._deadline.completed.append(item)
+        if self._reporter is not None:
+            self._reporter(self.done, self.total, f"{label}: {outcome(response)}", item)
@@ -0,0 +1,125 @@
+import bisect
+import datetime
+import threading
+import time
+from typing import Any
+
+
+# Graph accepts scheduled_publish_time between 10 minutes and 75 days ahead
+MIN_LEAD_TIME = 10 * 60
+MAX_LEAD_TIME = 75 * 86400
+
+# Graph batch requests carry at most 50 operations
+MAX_BATCH_SIZE = 50
+
+
+def parse_publish_time(value: Any) -> int:
+    """Unix timestamp from an int/float, a numeric string or an ISO 8601 string (UTC if no offset)."""
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid publish time: {value!r}")
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        text = value.strip()
+        if text.lstrip("-").isdigit():
+            return int(text)
+        try:
+            parsed = datetime.datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError(f"Invalid publish time: {value!r}") from None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+        return int(parsed.timestamp())
+    raise ValueError(f"Invalid publish time: {value!r}")
+
+
+def iso_time(timestamp: int) -> str:
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+0000")
+
+
+class ScheduleCalendar:
+    """The page's scheduled posts, indexed by publish time.
+
+    Loaded from Graph's scheduled_posts edge and kept current as posts are
+    scheduled through this server; reloaded once older than `ttl` seconds.
+    Range and collision queries are binary searches over the sorted times.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._times: list[int] = []
+        self._posts: list[dict[str, Any]] = []
+        self._loaded_at: float | None = None
+        self._lock = threading.Lock()
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def load(self, posts: list[dict[str, Any]]) -> None:
+        """Replace the index with the scheduled posts read from Graph."""
+        entries = sorted(
+            ({"id": p["id"], "message": p.get("message", ""), "publish_time": int(p["scheduled_publish_time"])}
+             for p in posts if p.get("scheduled_publish_time")),
+            key=lambda p: p["publish_time"],
+        )
+        with self._lock:
+            self._times = [p["publish_time"] for p in entries]
+            self._posts = entries
+            self._loaded_at = time.monotonic()
+
+    def add(self, post_id: str, message: str, publish_time: int) -> None:
+        with self._lock:
+            i = bisect.bisect_right(self._times, publish_time)
+            self._times.insert(i, publish_time)
+            self._posts.insert(i, {"id": post_id, "message": message, "publish_time": publish_time})
+
+    def between(self, start: int = None, end: int = None) -> list[dict[str, Any]]:
+        """Scheduled posts with start <= publish_time <= end, in time order."""
+        with self._lock:
+            lo = 0 if start is None else bisect.bisect_left(self._times, start)
+            hi = len(self._times) if end is None else bisect.bisect_right(self._times, end)
+            return [dict(p) for p in self._posts[lo:hi]]
+
+    def validate(self, entries: list[dict[str, Any]], min_gap: int, now: float = None) -> list[dict[str, Any]]:
+        """Check entries for a bulk schedule.
+
+        An entry is rejected if it has no message, its time is invalid or outside
+        Graph's scheduling window, or it falls within `min_gap` seconds of an
+        already scheduled post or of an earlier accepted entry.
+
+        Returns:
+            list: One dict per entry with "index", "publish_time", "status"
+            ("ok" or "rejected") and "errors"
+        """
+        now = time.time() if now is None else now
+        gap = max(min_gap, 1)  # same-second posts always collide
+        accepted: list[int] = []
+        results = []
+        for index, entry in enumerate(entries):
+            errors = []
+            message = entry.get("message") if isinstance(entry, dict) else None
+            if not isinstance(message, str) or not message.strip():
+                errors.append("message is required")
+            try:
+                publish_time = parse_publish_time(entry.get("publish_time") if isinstance(entry, dict) else None)
+            except ValueError as e:
+                publish_time = None
+                errors.append(str(e))
+            if publish_time is not None:
+                if publish_time < now + MIN_LEAD_TIME:
+                    errors.append("publish_time must be at least 10 minutes in the future")
+                elif publish_time > now + MAX_LEAD_TIME:
+                    errors.append("publish_time must be within 75 days")
+                clashes = self.between(publish_time - gap + 1, publish_time + gap - 1)
+                if clashes:
+                    errors.append(f"collides with scheduled post {clashes[0]['id']} at {iso_time(clashes[0]['publish_time'])}")
+                i = bisect.bisect_left(accepted, publish_time)
+                neighbours = accepted[max(i - 1, 0):i + 1]
+                if any(abs(t - publish_time) < gap for t in neighbours):
+                    errors.append("collides with another entry in this request")
+            result = {"index": index, "publish_time": publish_time, "status": "rejected" if errors else "ok", "errors": errors}
+            if not errors:
+                bisect.insort(accepted, publish_time)
+                result["message"] = message
+            results.append(result)
+        return results
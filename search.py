@@ -0,0 +1,207 @@
+import bisect
+import math
+import threading
+from array import array
+from typing import Any
+
+from duplicates import normalize
+from scheduling import iso_time
+
+# BM25 term-frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+
+# Dictionary terms a prefix query ("pizz*") expands to at most
+MAX_PREFIX_TERMS = 64
+
+# Share of deleted documents that triggers a rebuild of the postings
+COMPACT_RATIO = 0.5
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase, accent-folded words and numbers of `text` ("Pedido #A-1234" -> pedido, a, 1234)."""
+    return normalize(text).split() if text else []
+
+
+class SearchIndex:
+    """Inverted index over post and comment text, ranked with BM25.
+
+    Each term maps to two parallel arrays: the numbers of the documents it
+    appears in (ascending) and how often. A sorted list of all terms serves
+    prefix queries. Documents can be added, replaced or removed one at a
+    time; removed ones are skipped at query time and the postings are
+    rebuilt once they make up half of the index.
+
+    Queries match documents containing every query term. A term ending in
+    "*", or one that is not in the index at all, matches every term it is a
+    prefix of ("margari" finds "margarita").
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._docs: list[dict[str, Any] | None] = []
+        self._numbers: dict[str, int] = {}
+        self._postings: dict[str, array] = {}
+        self._freqs: dict[str, array] = {}
+        self._lengths = array("H")
+        self._terms: list[str] = []
+        self._total_length = 0
+        self._deleted = 0
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._numbers
+
+    @property
+    def term_count(self) -> int:
+        return len(self._terms)
+
+    def add(self, doc_id: str, kind: str, text: str, post_id: str = None, author_id: str = None,
+            author_name: str = None, created_time: int = None) -> bool:
+        """Index a document, replacing the one with the same ID if its text changed.
+
+        Returns:
+            bool: True if the index changed
+        """
+        text = text or ""
+        with self._lock:
+            number = self._numbers.get(doc_id)
+            if number is not None:
+                if self._docs[number]["text"] == text:
+                    return False
+                self._drop(number)
+            number = len(self._docs)
+            tokens = tokenize(text)
+            self._docs.append({"id": doc_id, "kind": kind, "text": text, "post_id": post_id, "author_id": author_id,
+                               "author_name": author_name, "created_time": created_time, "length": len(tokens)})
+            self._numbers[doc_id] = number
+            counts: dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = array("I")
+                    self._freqs[token] = array("H")
+                    bisect.insort(self._terms, token)
+                postings.append(number)
+                self._freqs[token].append(min(count, 0xFFFF))
+            self._lengths.append(min(len(tokens), 0xFFFF))
+            self._total_length += len(tokens)
+            return True
+
+    def remove(self, doc_id: str) -> bool:
+        """Forget a document (e.g. a deleted comment). Returns True if it was indexed."""
+        with self._lock:
+            number = self._numbers.get(doc_id)
+            if number is None:
+                return False
+            self._drop(number)
+            if self._deleted > COMPACT_RATIO * len(self._docs):
+                self._compact()
+            return True
+
+    def ids(self, kind: str = None, post_id: str = None, before: int = None) -> set[str]:
+        """IDs of the indexed documents, optionally of one kind and post, or created before a unix time."""
+        with self._lock:
+            return {doc["id"] for doc in self._docs if doc is not None
+                    and (kind is None or doc["kind"] == kind) and (post_id is None or doc["post_id"] == post_id)
+                    and (before is None or (doc["created_time"] is not None and doc["created_time"] < before))}
+
+    def _drop(self, number: int) -> None:
+        doc = self._docs[number]
+        self._docs[number] = None
+        del self._numbers[doc["id"]]
+        self._total_length -= doc["length"]
+        self._deleted += 1
+
+    def _compact(self) -> None:
+        docs = [doc for doc in self._docs if doc is not None]
+        self._reset()
+        for doc in docs:
+            self.add(doc["id"], doc["kind"], doc["text"], doc["post_id"], doc["author_id"], doc["author_name"],
+                     doc["created_time"])
+
+    def _expand(self, token: str) -> list[str]:
+        """Dictionary terms a query term stands for."""
+        prefix = token.endswith("*")
+        token = token.rstrip("*")
+        if not token:
+            return []
+        if not prefix and token in self._postings:
+            return [token]
+        start = bisect.bisect_left(self._terms, token)
+        terms = []
+        for term in self._terms[start:start + MAX_PREFIX_TERMS]:
+            if not term.startswith(token):
+                break
+            terms.append(term)
+        return terms
+
+    def search(self, query: str, kind: str = None, post_id: str = None, author_id: str = None,
+               since: int = None, until: int = None, limit: int = 20) -> dict[str, Any]:
+        """Documents matching every term of `query`, best first.
+
+        Args:
+            query: Words to find; "word*" matches words starting with "word"
+            kind: Only "comment" or "post" documents
+            post_id: Only this post and its comments
+            author_id: Only documents by this user
+            since: Only documents created at or after this unix time
+            until: Only documents created before this unix time
+            limit: Results returned
+
+        Returns:
+            dict: "results" (id, kind, post_id, author, created_time, message,
+            score), the "total" number of matches and the "terms" searched
+        """
+        # Trailing "*" is kept through normalization by splitting it off first
+        words = [(w.endswith("*"), tokenize(w)) for w in query.split()]
+        query_terms = [t + "*" if prefix and i == len(tokens) - 1 else t
+                       for prefix, tokens in words for i, t in enumerate(tokens)]
+        with self._lock:
+            live = len(self._numbers)
+            if not query_terms or not live:
+                return {"results": [], "total": 0, "terms": {}}
+            average_length = self._total_length / live
+            expanded = {query_term: self._expand(query_term) for query_term in query_terms}
+            scores: dict[int, float] | None = None
+            # Rarest term first: later terms only score documents that are still candidates
+            for terms in sorted(expanded.values(), key=lambda terms: sum(len(self._postings[t]) for t in terms)):
+                term_scores: dict[int, float] = {}
+                for term in terms:
+                    postings, freqs = self._postings[term], self._freqs[term]
+                    idf = math.log(1 + (live - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for number, tf in zip(postings, freqs):
+                        if self._docs[number] is None or (scores is not None and number not in scores):
+                            continue
+                        norm = K1 * (1 - B + B * self._lengths[number] / average_length)
+                        term_scores[number] = term_scores.get(number, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+                scores = term_scores if scores is None else {n: scores[n] + s for n, s in term_scores.items()}
+                if not scores:
+                    break
+            matches = []
+            for number, score in scores.items():
+                doc = self._docs[number]
+                if ((kind is None or doc["kind"] == kind)
+                        and (post_id is None or doc["post_id"] == post_id or doc["id"] == post_id)
+                        and (author_id is None or doc["author_id"] == author_id)
+                        and (since is None or (doc["created_time"] or 0) >= since)
+                        and (until is None or (doc["created_time"] or 0) < until)):
+                    matches.append((score, number))
+            matches.sort(key=lambda m: (-m[0], m[1]))
+            results = []
+            for score, number in matches[:limit]:
+                doc = self._docs[number]
+                results.append({
+                    "id": doc["id"], "kind": doc["kind"], "post_id": doc["post_id"],
+                    "author": {"id": doc["author_id"], "name": doc["author_name"]} if doc["author_id"] else None,
+                    "created_time": iso_time(doc["created_time"]) if doc["created_time"] is not None else None,
+                    "message": doc["text"], "score": round(score, 3),
+                })
+        return {"results": results, "total": len(matches), "terms": expanded}
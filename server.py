@@ -1,11 +1,181 @@
-from mcp.server.fastmcp import FastMCP
-from manager import Manager
+import argparse
+import functools
+import inspect
+import logging
+import math
+import threading
+import typing
+from contextlib import asynccontextmanager
+import anyio.from_thread
+import anyio.lowlevel
+import anyio.to_thread
+from mcp.server.fastmcp import Context
+from lazy import Deferred, DeferredToolsFastMCP
+from compact import OutputShaper
+from config import (COMPACT_OUTPUT, OUTPUT_BUDGET, MAX_TEXT_LENGTH, METRICS_PORT, MCP_TRANSPORT, MCP_HOST, MCP_PORT,
+                    TOOL_TIMEOUT, TOOL_TIMEOUTS, TOOL_PRIORITIES, JOBS_FILE, TRENDS_INTERVAL)
+from deadlines import Cancelled, Deadline, enforcing
+from jobs import has_pending_jobs
+from metrics import MetricsRegistry, serve_prometheus
+from models import to_plain
+from priorities import BULK, INTERACTIVE, NORMAL, WEIGHTS, prioritized
+from progress import reporting
 from typing import Any
 
-mcp = FastMCP("FacebookMCP")
-manager = Manager()
 
-@mcp.tool()
+_background_started = False
+
+logger = logging.getLogger(__name__)
+
+
+def _serve_metrics() -> None:
+    """Start the Prometheus endpoint on METRICS_PORT. A port already taken (say, by the
+    exporter of another stdio server launched with the same environment) is logged, not fatal.
+    """
+    try:
+        serve_prometheus(metrics, METRICS_PORT)
+    except OSError as e:
+        logger.warning("Prometheus metrics not served on port %s: %s", METRICS_PORT, e)
+
+
+def _start_background_work() -> None:
+    """Build the manager at startup when it has work of its own: jobs left queued by a previous
+    run, or engagement sampling (which needs history before get_trending_posts is first called).
+    """
+    if TRENDS_INTERVAL > 0:
+        manager.trends.start()
+    elif has_pending_jobs(JOBS_FILE):
+        manager.resolve()
+
+
+@asynccontextmanager
+async def _lifespan(server):
+    # Entered once per session on some transports; the background work is started once per process,
+    # in a thread so `initialize` is not held up
+    global _background_started
+    if not _background_started:
+        _background_started = True
+        if METRICS_PORT:
+            _serve_metrics()
+        threading.Thread(target=_start_background_work, name="startup", daemon=True).start()
+    yield {}
+
+
+# Tool schemas and the Graph client are built on first use, so a freshly
+# launched stdio server answers `initialize` as early as possible
+mcp = DeferredToolsFastMCP("FacebookMCP", host=MCP_HOST, port=MCP_PORT, lifespan=_lifespan)
+metrics = MetricsRegistry()
+
+
+def _create_manager():
+    from manager import Manager
+    return Manager(metrics)
+
+
+manager = Deferred(_create_manager)
+output = OutputShaper(COMPACT_OUTPUT, OUTPUT_BUDGET, MAX_TEXT_LENGTH, metrics)
+
+
+def tool(priority: str = INTERACTIVE):
+    """Register an MCP tool whose result goes through the compact output stage.
+
+    Every call is timed and its Graph traffic recorded in `metrics`. Tools
+    run in worker threads so concurrent sessions don't block each other.
+    Tools returning a dict or list also get an optional `budget` argument:
+    the maximum response size in bytes for that call (passed on to tools that
+    declare `budget` themselves). When the client asks
+    for progress, bulk operations send a notification per finished item.
+
+    A call stops sending Graph requests once its time budget (TOOL_TIMEOUT,
+    TOOL_TIMEOUTS) runs out or the client cancels it, and returns the items
+    it finished (see deadlines.Deadline.report).
+
+    Its Graph requests are sent with the tool's priority class (overridable
+    with TOOL_PRIORITIES) on behalf of the calling session: when Graph
+    capacity runs short, interactive calls go ahead of bulk work, and
+    sessions share what is left fairly (see priorities.RequestScheduler).
+
+    Args:
+        priority: "interactive" for quick calls, "normal" for multi-request
+            reads, "bulk" for operations that go through many items
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        tool_priority = TOOL_PRIORITIES.get(fn.__name__, priority)
+        if tool_priority not in WEIGHTS:
+            raise ValueError(f"Unknown priority class for {fn.__name__}: {tool_priority!r}")
+        takes_budget = "budget" in signature.parameters
+
+        def call(args, kwargs, budget, reporter, deadline, session):
+            if takes_budget:
+                kwargs = {**kwargs, "budget": budget}
+            with (metrics.tool_call(fn.__name__), reporting(reporter), enforcing(deadline),
+                  prioritized(tool_priority, session)):
+                try:
+                    result = fn(*args, **kwargs)
+                except Cancelled:
+                    metrics.event("tool_calls_stopped")
+                    result = deadline.report()
+                # Graph models become plain JSON types only here, at the MCP boundary
+                return output.shape(fn.__name__, to_plain(result), budget)
+
+        async def run(args, kwargs, budget, reporter, deadline, session):
+            try:
+                # The thread is not waited for on cancellation: it stops at its next Graph request
+                return await anyio.to_thread.run_sync(call, args, kwargs, budget, reporter, deadline, session,
+                                                      abandon_on_cancel=True)
+            except anyio.get_cancelled_exc_class():
+                deadline.cancel()
+                raise
+
+        @functools.wraps(fn)
+        async def wrapper(*args, budget: int = None, ctx: Context = None, **kwargs):
+            deadline = Deadline(TOOL_TIMEOUTS.get(fn.__name__, TOOL_TIMEOUT))
+            meta = ctx.request_context.meta if ctx is not None else None
+            # Requests of one client connection share a fair-queuing flow
+            session = f"session-{id(ctx.session)}" if ctx is not None else None
+            if meta is None or meta.progressToken is None:
+                return await run(args, kwargs, budget, None, deadline, session)
+            return await _with_progress(ctx, lambda reporter: run(args, kwargs, budget, reporter, deadline, session))
+
+        parameters = [*signature.parameters.values()]
+        annotations = {**fn.__annotations__, "ctx": Context}
+        if typing.get_origin(signature.return_annotation) in (dict, list) and not takes_budget:
+            parameters.append(inspect.Parameter("budget", inspect.Parameter.KEYWORD_ONLY, default=None, annotation=int | None))
+            annotations["budget"] = int | None
+        # FastMCP fills `ctx` itself and keeps it out of the tool's schema
+        parameters.append(inspect.Parameter("ctx", inspect.Parameter.KEYWORD_ONLY, default=None, annotation=Context))
+        wrapper.__signature__ = signature.replace(parameters=parameters)
+        wrapper.__annotations__ = annotations
+        return mcp.defer_tool(wrapper)
+    return decorator
+
+
+async def _with_progress(ctx: Context, run):
+    """Run `run(reporter)` while forwarding its reports to the client as progress notifications.
+
+    Reports may come from any thread; they are queued and sent in order by
+    one task, so a slow client never stalls the work itself.
+    """
+    send, receive = anyio.create_memory_object_stream(math.inf)
+    token = anyio.lowlevel.current_token()
+
+    def reporter(done, total, message, item):
+        anyio.from_thread.run_sync(send.send_nowait, (done, total, message), token=token)
+
+    async def forward():
+        async with receive:
+            async for done, total, message in receive:
+                await ctx.report_progress(done, total, message)
+
+    async with anyio.create_task_group() as tasks:
+        tasks.start_soon(forward)
+        try:
+            return await run(reporter)
+        finally:
+            send.close()
+
+@tool()
 def post_to_facebook(message: str) -> dict[str, Any]:
     """Create a new Facebook Page post with a text message.
     Input: message (str)
@@ -13,7 +183,7 @@ def post_to_facebook(message: str) -> dict[str, Any]:
     """
     return manager.post_to_facebook(message)
 
-@mcp.tool()
+@tool()
 def reply_to_comment(post_id: str, comment_id: str, message: str) -> dict[str, Any]:
     """Reply to a specific comment on a Facebook post.
     Input: post_id (str), comment_id (str), message (str)
@@ -21,23 +191,26 @@ def reply_to_comment(post_id: str, comment_id: str, message: str) -> dict[str, A
     """
     return manager.reply_to_comment(post_id, comment_id, message)
 
-@mcp.tool()
-def get_page_posts() -> dict[str, Any]:
+@tool()
+def get_page_posts(profile: str = None, fields: str = None) -> dict[str, Any]:
     """Fetch the most recent posts on the Page.
-    Input: None
+    Input: profile (str, optional) - "id", "lean" (default), "engagement" or "full"
+           fields (str, optional) - comma-separated Graph fields, overrides profile
     Output: dict with list of post objects and metadata
     """
-    return manager.get_page_posts()
+    return manager.get_page_posts(profile, fields)
 
-@mcp.tool()
-def get_post_comments(post_id: str) -> dict[str, Any]:
+@tool()
+def get_post_comments(post_id: str, profile: str = None, fields: str = None) -> dict[str, Any]:
     """Retrieve all comments for a given post.
     Input: post_id (str)
+           profile (str, optional) - "id", "lean" (default), "engagement" or "full"
+           fields (str, optional) - comma-separated Graph fields, overrides profile
     Output: dict with comment objects
     """
-    return manager.get_post_comments(post_id)
+    return manager.get_post_comments(post_id, profile, fields)
 
-@mcp.tool()
+@tool()
 def delete_post(post_id: str) -> dict[str, Any]:
     """Delete a specific post from the Facebook Page.
     Input: post_id (str)
@@ -45,7 +218,7 @@ def delete_post(post_id: str) -> dict[str, Any]:
     """
     return manager.delete_post(post_id)
 
-@mcp.tool()
+@tool()
 def delete_comment(comment_id: str) -> dict[str, Any]:
     """Delete a specific comment from the Page.
     Input: comment_id (str)
@@ -54,18 +227,18 @@ def delete_comment(comment_id: str) -> dict[str, Any]:
     return manager.delete_comment(comment_id)
 
 
-@mcp.tool()
+@tool()
 def hide_comment(comment_id: str) -> dict[str, Any]:
     """Hide a comment from public view."""
     return manager.hide_comment(comment_id)
 
 
-@mcp.tool()
+@tool()
 def unhide_comment(comment_id: str) -> dict[str, Any]:
     """Unhide a previously hidden comment."""
     return manager.unhide_comment(comment_id)
 
-@mcp.tool()
+@tool()
 def delete_comment_from_post(post_id: str, comment_id: str) -> dict[str, Any]:
     """Alias to delete a comment on a post.
     Input: post_id (str), comment_id (str)
@@ -73,7 +246,7 @@ def delete_comment_from_post(post_id: str, comment_id: str) -> dict[str, Any]:
     """
     return manager.delete_comment_from_post(post_id, comment_id)
 
-@mcp.tool()
+@tool()
 def filter_negative_comments(comments: dict[str, Any]) -> list[dict[str, Any]]:
     """Filter comments for basic negative sentiment.
     Input: comments (dict)
@@ -81,7 +254,7 @@ def filter_negative_comments(comments: dict[str, Any]) -> list[dict[str, Any]]:
     """
     return manager.filter_negative_comments(comments)
 
-@mcp.tool()
+@tool()
 def get_number_of_comments(post_id: str) -> int:
     """Count the number of comments on a given post.
     Input: post_id (str)
@@ -89,7 +262,7 @@ def get_number_of_comments(post_id: str) -> int:
     """
     return manager.get_number_of_comments(post_id)
 
-@mcp.tool()
+@tool()
 def get_number_of_likes(post_id: str) -> int:
     """Return the number of likes on a post.
     Input: post_id (str)
@@ -97,7 +270,7 @@ def get_number_of_likes(post_id: str) -> int:
     """
     return manager.get_number_of_likes(post_id)
 
-@mcp.tool()
+@tool()
 def get_post_insights(post_id: str) -> dict[str, Any]:
     """Fetch all insights metrics (impressions, reactions, clicks, etc).
     Input: post_id (str)
@@ -105,7 +278,7 @@ def get_post_insights(post_id: str) -> dict[str, Any]:
     """
     return manager.get_post_insights(post_id)
 
-@mcp.tool()
+@tool()
 def get_post_impressions(post_id: str) -> dict[str, Any]:
     """Fetch total impressions of a post.
     Input: post_id (str)
@@ -113,7 +286,7 @@ def get_post_impressions(post_id: str) -> dict[str, Any]:
     """
     return manager.get_post_impressions(post_id)
 
-@mcp.tool()
+@tool()
 def get_post_impressions_unique(post_id: str) -> dict[str, Any]:
     """Fetch unique impressions of a post.
     Input: post_id (str)
@@ -121,7 +294,7 @@ def get_post_impressions_unique(post_id: str) -> dict[str, Any]:
     """
     return manager.get_post_impressions_unique(post_id)
 
-@mcp.tool()
+@tool()
 def get_post_impressions_paid(post_id: str) -> dict[str, Any]:
     """Fetch paid impressions of a post.
     Input: post_id (str)
@@ -129,7 +302,7 @@ def get_post_impressions_paid(post_id: str) -> dict[str, Any]:
     """
     return manager.get_post_impressions_paid(post_id)
 
-@mcp.tool()
+@tool()
 def get_post_impressions_organic(post_id: str) -> dict[str, Any]:
     """Fetch organic impressions of a post.
     Input: post_id (str)
@@ -137,7 +310,7 @@ def get_post_impressions_organic(post_id: str) -> dict[str, Any]:
     """
     return manager.get_post_impressions_organic(post_id)
 
-@mcp.tool()
+@tool()
 def get_post_engaged_users(post_id: str) -> dict[str, Any]:
     """Fetch number of engaged users.
     Input: post_id (str)
@@ -145,7 +318,7 @@ def get_post_engaged_users(post_id: str) -> dict[str, Any]:
     """
     return manager.get_post_engaged_users(post_id)
 
-@mcp.tool()
+@tool()
 def get_post_clicks(post_id: str) -> dict[str, Any]:
     """Fetch number of post clicks.
     Input: post_id (str)
@@ -153,7 +326,7 @@ def get_post_clicks(post_id: str) -> dict[str, Any]:
     """
     return manager.get_post_clicks(post_id)
 
-@mcp.tool()
+@tool()
 def get_post_reactions_like_total(post_id: str) -> dict[str, Any]:
     """Fetch number of 'Like' reactions.
     Input: post_id (str)
@@ -161,7 +334,7 @@ def get_post_reactions_like_total(post_id: str) -> dict[str, Any]:
     """
     return manager.get_post_reactions_like_total(post_id)
 
-@mcp.tool()
+@tool()
 def get_post_reactions_love_total(post_id: str) -> dict[str, Any]:
     """Fetch number of 'Love' reactions.
     Input: post_id (str)
@@ -169,7 +342,7 @@ def get_post_reactions_love_total(post_id: str) -> dict[str, Any]:
     """
     return manager.get_post_reactions_love_total(post_id)
 
-@mcp.tool()
+@tool()
 def get_post_reactions_wow_total(post_id: str) -> dict[str, Any]:
     """Fetch number of 'Wow' reactions.
     Input: post_id (str)
@@ -177,7 +350,7 @@ def get_post_reactions_wow_total(post_id: str) -> dict[str, Any]:
     """
     return manager.get_post_reactions_wow_total(post_id)
 
-@mcp.tool()
+@tool()
 def get_post_reactions_haha_total(post_id: str) -> dict[str, Any]:
     """Fetch number of 'Haha' reactions.
     Input: post_id (str)
@@ -185,7 +358,7 @@ def get_post_reactions_haha_total(post_id: str) -> dict[str, Any]:
     """
     return manager.get_post_reactions_haha_total(post_id)
 
-@mcp.tool()
+@tool()
 def get_post_reactions_sorry_total(post_id: str) -> dict[str, Any]:
     """Fetch number of 'Sorry' reactions.
     Input: post_id (str)
@@ -193,7 +366,7 @@ def get_post_reactions_sorry_total(post_id: str) -> dict[str, Any]:
     """
     return manager.get_post_reactions_sorry_total(post_id)
 
-@mcp.tool()
+@tool()
 def get_post_reactions_anger_total(post_id: str) -> dict[str, Any]:
     """Fetch number of 'Anger' reactions.
     Input: post_id (str)
@@ -201,15 +374,16 @@ def get_post_reactions_anger_total(post_id: str) -> dict[str, Any]:
     """
     return manager.get_post_reactions_anger_total(post_id)
 
-@mcp.tool()
-def get_post_top_commenters(post_id: str) -> list[dict[str, Any]]:
+@tool(NORMAL)
+def get_post_top_commenters(post_id: str, include_replies: bool = False) -> list[dict[str, Any]]:
     """Get the top commenters on a post.
     Input: post_id (str)
+           include_replies (bool, optional) - also count replies in comment threads
     Output: list of user IDs with comment counts
     """
-    return manager.get_post_top_commenters(post_id)
+    return manager.get_post_top_commenters(post_id, include_replies)
 
-@mcp.tool()
+@tool()
 def post_image_to_facebook(image_url: str, caption: str) -> dict[str, Any]:
     """Post an image with a caption to the Facebook page.
     Input: image_url (str), caption (str)
@@ -217,7 +391,7 @@ def post_image_to_facebook(image_url: str, caption: str) -> dict[str, Any]:
     """
     return manager.post_image_to_facebook(image_url, caption)
 
-@mcp.tool()
+@tool()
 def send_dm_to_user(user_id: str, message: str) -> dict[str, Any]:
     """Send a direct message to a user.
     Input: user_id (str), message (str)
@@ -225,7 +399,7 @@ def send_dm_to_user(user_id: str, message: str) -> dict[str, Any]:
     """
     return manager.send_dm_to_user(user_id, message)
 
-@mcp.tool()
+@tool(BULK)
 def send_dm_media_to_user(user_id: str, message: str, media_urls: list[str]) -> dict[str, Any]:
     """Send a direct message with media attachments (images/videos) to a user.
     Input: user_id (str), message (str), media_urls (list[str])
@@ -238,14 +412,14 @@ def send_dm_media_to_user(user_id: str, message: str, media_urls: list[str]) ->
     """
     return manager.send_dm_media_to_user(user_id, message, media_urls)
 
-@mcp.tool()
+@tool()
 def update_post(post_id: str, new_message: str) -> dict[str, Any]:
     """Updates an existing post's message.
     Input: post_id (str), new_message (str)
     Output: dict of update result
     """
     return manager.update_post(post_id, new_message)
-@mcp.tool()
+@tool()
 def schedule_post(message: str, publish_time: int) -> dict[str, Any]:
     """Schedule a new post for future publishing.
     Input: message (str), publish_time (Unix timestamp)
@@ -253,7 +427,30 @@ def schedule_post(message: str, publish_time: int) -> dict[str, Any]:
     """
     return manager.schedule_post(message, publish_time)
 
-@mcp.tool()
+@tool(BULK)
+def schedule_posts_bulk(entries: list[dict[str, Any]], min_gap_minutes: int = 30, dry_run: bool = False) -> dict[str, Any]:
+    """Schedule many posts in one call.
+    Input: entries (list of {"message": str, "publish_time": unix timestamp or ISO 8601 string}),
+           min_gap_minutes (int, default 30) - minimum spacing between scheduled posts,
+           dry_run (bool) - only validate
+    Output: dict with "scheduled", "rejected" and "failed" counts and a result per entry
+    
+    Entries are checked against the page's already scheduled posts and each other:
+    times must be 10 minutes to 75 days ahead and at least min_gap_minutes apart.
+    Valid entries are submitted together using Graph batch requests.
+    """
+    return manager.schedule_posts_bulk(entries, min_gap_minutes, dry_run)
+
+@tool()
+def list_scheduled_posts(start: str = None, end: str = None, refresh: bool = False) -> dict[str, Any]:
+    """List the page's scheduled posts in a time range, in publish order.
+    Input: start, end (str, optional) - unix timestamp or ISO 8601; open-ended when omitted
+           refresh (bool) - reload the calendar from Facebook first
+    Output: dict with "data" (id, message, publish_time, scheduled_time) and "count"
+    """
+    return manager.list_scheduled_posts(start, end, refresh)
+
+@tool()
 def get_page_fan_count() -> int:
     """Get the Page's total fan/like count.
     Input: None
@@ -261,7 +458,7 @@ def get_page_fan_count() -> int:
     """
     return manager.get_page_fan_count()
 
-@mcp.tool()
+@tool()
 def get_post_share_count(post_id: str) -> int:
     """Get the number of shares for a post.
     Input: post_id (str)
@@ -270,24 +467,97 @@ def get_post_share_count(post_id: str) -> int:
     return manager.get_post_share_count(post_id)
 
 
-@mcp.tool()
+@tool(NORMAL)
+def get_comment_tree(post_id: str, max_depth: int = 3) -> dict[str, Any]:
+    """Get a post's comments together with their reply threads.
+    Input: post_id (str)
+           max_depth (int, optional) - levels to read, 1 = top-level comments only (default 3)
+    Output: dict with "comments" as a flat list; each comment has "parent_id" (null for
+            top-level comments), "depth", "author_id", "message", "created_time" and "reply_count".
+            "authors" maps author IDs to names; "truncated" is true when deeper replies were left out
+
+    Replies of up to 50 comments are read per request, so a whole thread costs one request
+    per level rather than one per comment.
+    """
+    return manager.get_comment_tree(post_id, max_depth)
+
+@tool(NORMAL)
+def find_duplicate_comments(post_ids: list[str] = None, since: str = None, threshold: float = 0.6,
+                            min_cluster_size: int = 3) -> dict[str, Any]:
+    """Find near-duplicate comments, such as a spam message copied with small edits across posts.
+    Input: post_ids (list[str], optional) - posts to scan; defaults to the page's posts since `since`
+           since (str, optional) - unix timestamp or ISO 8601; defaults to 7 days ago
+           threshold (float, optional) - similarity 0-1 above which comments are duplicates (default 0.6)
+           min_cluster_size (int, optional) - smallest group reported (default 3)
+    Output: dict with "clusters" (largest first: sample "message", "comment_ids", "post_ids",
+            "author_count", "min_similarity") and "comment_ids" of all clusters, ready for
+            bulk_hide_comments
+
+    Differences in case, accents, punctuation, emoji and a few characters are ignored. Very short
+    comments ("gracias!") are not considered.
+    """
+    return manager.find_duplicate_comments(post_ids, since, threshold, min_cluster_size)
+
+@tool(NORMAL)
+def get_page_engagement_report(since: str = None, until: str = None) -> dict[str, Any]:
+    """Rank the Page's posts in a date range by engagement.
+    Input: since, until (str, optional) - unix timestamp or ISO 8601; defaults to the last 7 days
+    Output: dict with "posts" ranked by engagement (reactions + comments + shares), each with its
+            reaction mix (like, love, wow, haha, sorry, angry), page "totals" and the "top" post per metric
+
+    One call replaces get_page_posts plus a reactions breakdown per post: engagement for up to
+    50 posts is read in each request.
+    """
+    return manager.get_page_engagement_report(since, until)
+
+@tool(NORMAL)
+def search_comments(query: str, post_id: str = None, author_id: str = None, since: str = None, until: str = None,
+                    kind: str = "comment", limit: int = 20, refresh: bool = False) -> dict[str, Any]:
+    """Find comments (or posts) mentioning words, product names or order numbers, best matches first.
+    Input: query (str) - words to find; accents and case are ignored, "word*" matches by prefix
+           post_id, author_id (str, optional) - only this post's comments / this user's comments
+           since, until (str, optional) - unix timestamp or ISO 8601 creation time range
+           kind (str, optional) - "comment" (default), "post" or "all"
+           limit (int, optional) - results returned (default 20)
+           refresh (bool, optional) - re-read every post's comments first (e.g. after edits)
+    Output: dict with ranked "results" (id, kind, post_id, author, created_time, message, score) and the "total" matches
+
+    Searches a local index of the last 30 days of posts and comments, synced when older than 5 minutes
+    (only posts whose comment count changed are re-read). Use instead of reading every post's comments.
+    """
+    return manager.search_comments(query, post_id, author_id, since, until, kind, limit, refresh)
+
+@tool()
+def get_trending_posts(window: str = "1h", limit: int = 10, sort: str = "velocity") -> dict[str, Any]:
+    """Find the posts whose engagement is growing fastest right now, e.g. to pick one to boost.
+    Input: window (str, optional) - how far back to measure: "30m", "2h", "1d" (default "1h")
+           limit (int, optional) - posts returned (default 10)
+           sort (str, optional) - "velocity" (engagement gained per hour, default) or "acceleration"
+    Output: dict with ranked "posts", each with its current reactions/comments/shares, "velocity"
+            (total and per metric), "acceleration" (per hour) and the seconds of history measured
+
+    Reads the history kept by the background sampler (FACEBOOK_MCP_TRENDS_INTERVAL): no Graph calls.
+    """
+    return manager.get_trending_posts(window, limit, sort)
+
+@tool()
 def get_post_reactions_breakdown(post_id: str) -> dict[str, Any]:
     """Get counts for all reaction types on a post."""
     return manager.get_post_reactions_breakdown(post_id)
 
 
-@mcp.tool()
+@tool(BULK)
 def bulk_delete_comments(comment_ids: list[str]) -> list[dict[str, Any]]:
     """Delete multiple comments by ID."""
     return manager.bulk_delete_comments(comment_ids)
 
 
-@mcp.tool()
+@tool(BULK)
 def bulk_hide_comments(comment_ids: list[str]) -> list[dict[str, Any]]:
     """Hide multiple comments by ID."""
     return manager.bulk_hide_comments(comment_ids)
 
-@mcp.tool()
+@tool(BULK)
 def create_storie_list_media(media_urls: list[str]) -> dict[str, Any]:
     """Create and publish Facebook Stories from a list of media URLs.
     Input: media_urls (list[str])
@@ -301,7 +571,7 @@ def create_storie_list_media(media_urls: list[str]) -> dict[str, Any]:
     """
     return manager.create_storie_list_media(media_urls)
 
-@mcp.tool()
+@tool(NORMAL)
 def post_video_to_facebook(video_url: str, content_prompt: str) -> dict[str, Any]:
     """Post a video with viral copyright text generated from a content description.
     Input: video_url (str), content_prompt (str)
@@ -320,7 +590,18 @@ def post_video_to_facebook(video_url: str, content_prompt: str) -> dict[str, Any
     """
     return manager.post_video_to_facebook(video_url, content_prompt)
 
-@mcp.tool()
+@tool()
+def generate_captions(content_prompt: str, n: int = 5, seed: int = None) -> dict[str, Any]:
+    """Generate several distinct viral copyright texts for the same content, without posting.
+    Input: content_prompt (str), n (int, default 5) - number of variants, seed (int, optional) - for reproducible output
+    Output: dict with the list of captions and their count
+    
+    No caption is repeated within a batch. Use it to pick a caption before calling
+    post_video_to_facebook, post_media_to_facebook or create_page_media_post.
+    """
+    return manager.generate_captions(content_prompt, n, seed)
+
+@tool(BULK)
 def create_page_media_post(page_id: str, media_urls: list[str], content_prompt: str, page_access_token: str = None) -> dict[str, Any]:
     """Create a media post on a specific Facebook page with auto-generated viral copyright text.
     Input: page_id (str), media_urls (list[str]), content_prompt (str), page_access_token (str, optional)
@@ -362,7 +643,7 @@ def create_page_media_post(page_id: str, media_urls: list[str], content_prompt:
     """
     return manager.create_page_media_post(page_id, media_urls, content_prompt, page_access_token)
 
-@mcp.tool()
+@tool(BULK)
 def post_media_to_facebook(media_urls: list[str], content_prompt: str) -> dict[str, Any]:
     """Post multiple media files (images/videos) with auto-generated viral copyright text.
     Input: media_urls (list[str]), content_prompt (str)
@@ -388,17 +669,70 @@ def post_media_to_facebook(media_urls: list[str], content_prompt: str) -> dict[s
     """
     return manager.post_media_to_facebook(media_urls, content_prompt)
 
-@mcp.tool()
+@tool()
+def submit_post_media_to_facebook(media_urls: list[str], content_prompt: str) -> dict[str, Any]:
+    """Start post_media_to_facebook as a background job and return at once.
+    Input: media_urls (list[str]), content_prompt (str)
+    Output: dict with job "id" and "status"; poll it with get_job_status
+    
+    Use this for large media drops that would otherwise time out. Submitting the
+    same media and prompt again while the job is pending (or shortly after it
+    succeeded) returns the existing job instead of posting twice.
+    """
+    return manager.submit_post_media_to_facebook(media_urls, content_prompt)
+
+@tool()
+def submit_create_page_media_post(page_id: str, media_urls: list[str], content_prompt: str, page_access_token: str = None) -> dict[str, Any]:
+    """Start create_page_media_post as a background job and return at once.
+    Input: page_id (str), media_urls (list[str]), content_prompt (str), page_access_token (str, optional)
+    Output: dict with job "id" and "status"; poll it with get_job_status
+    """
+    return manager.submit_create_page_media_post(page_id, media_urls, content_prompt, page_access_token)
+
+@tool()
+def submit_create_storie_list_media(media_urls: list[str]) -> dict[str, Any]:
+    """Start create_storie_list_media as a background job and return at once.
+    Input: media_urls (list[str])
+    Output: dict with job "id" and "status"; poll it with get_job_status
+    """
+    return manager.submit_create_storie_list_media(media_urls)
+
+@tool()
+def get_job_status(job_id: str) -> dict[str, Any]:
+    """Get the status of a background job.
+    Input: job_id (str)
+    Output: dict with status ("queued", "running", "succeeded", "failed", "cancelled" or
+            "interrupted"), timestamps, and the job's result once it has finished
+    """
+    return manager.get_job_status(job_id)
+
+@tool()
+def list_jobs(status: str = None) -> list[dict[str, Any]]:
+    """List background jobs, newest first.
+    Input: status (str, optional) - only jobs in this status
+    Output: list of job statuses (without results)
+    """
+    return manager.list_jobs(status)
+
+@tool()
+def cancel_job(job_id: str) -> dict[str, Any]:
+    """Cancel a background job that has not started running yet.
+    Input: job_id (str)
+    Output: dict with the job status, or an error if it already started
+    """
+    return manager.cancel_job(job_id)
+
+@tool()
 def get_my_stories(limit: str = None) -> dict[str, Any]:
     """Get the list of recent stories from your Facebook page.
-    Input: limit (str, optional) - Number of stories to retrieve. If not provided or empty, gets all available stories.
+    Input: limit (str, optional) - Number of stories to retrieve. If not provided or empty, gets the 25 most recent.
     Output: dict with list of story objects, total count, and metadata
     
     This tool retrieves your recent Facebook stories/media content. You can specify how many stories
     you want to see by providing a number in the limit parameter.
     
     Examples:
-    - get_my_stories() - Gets all available stories
+    - get_my_stories() - Gets the 25 most recent stories
     - get_my_stories("5") - Gets the 5 most recent stories  
     - get_my_stories("10") - Gets the 10 most recent stories
     
@@ -416,15 +750,16 @@ def get_my_stories(limit: str = None) -> dict[str, Any]:
             if parsed_limit <= 0:
                 parsed_limit = None
         except ValueError:
-            # If limit is not a valid number, ignore it and get all stories
+            # If limit is not a valid number, ignore it and use the default
             parsed_limit = None
     
     return manager.get_my_stories(parsed_limit)
 
-@mcp.tool()
-def get_my_last_post() -> dict[str, Any]:
+@tool()
+def get_my_last_post(profile: str = None, fields: str = None) -> dict[str, Any]:
     """Get your most recent Facebook post with comprehensive details and engagement metrics.
-    Input: None
+    Input: profile (str, optional) - "id", "lean", "engagement" or "full" (default)
+           fields (str, optional) - comma-separated Graph fields, overrides profile
     Output: dict with complete post data, engagement metrics, and metadata
     
     This tool retrieves your most recent Facebook post with detailed information including:
@@ -438,8 +773,13 @@ def get_my_last_post() -> dict[str, Any]:
     The response provides both individual engagement counts and total engagement summary
     for easy analysis of your latest post's performance.
     
+    Only the fields of the chosen profile are fetched from Facebook, so ask for
+    less when you need less.
+    
     Example usage:
     - get_my_last_post() - Gets your most recent post with all details
+    - get_my_last_post("id") - Gets only the ID of your most recent post
+    - get_my_last_post("engagement") - Gets only the engagement counts
     
     Perfect for:
     - Checking your latest post performance
@@ -447,5 +787,66 @@ def get_my_last_post() -> dict[str, Any]:
     - Monitoring recent engagement
     - Analyzing post content and metadata
     """
-    return manager.get_my_last_post()
+    return manager.get_my_last_post(profile, fields)
+
+@tool(NORMAL)
+def execute_plan(steps: list[dict[str, Any]]) -> dict[str, Any]:
+    """Run several operations in one call, passing results from one step to the next.
+    Input: steps (list of {"id": str, "op": tool name, "args": dict, "depends_on": list of ids (optional)})
+    Output: dict with "steps" (status and result or error per step id) and succeeded/failed/skipped counts
+
+    Any string argument "$<id>.<path>" is replaced by part of an earlier step's result,
+    e.g. "$last.data.id", "$comments.data[0].id", "$negative[*].id" (a list of every item's id).
+    Independent steps run in parallel; steps after a failed step are skipped.
+    Simple operations (post, reply, hide, delete, counts, bulk hide/delete) are sent
+    together as Facebook batch requests.
+
+    Example: moderate the last post in one call:
+    [{"id": "last", "op": "get_my_last_post", "args": {"profile": "id"}},
+     {"id": "comments", "op": "get_post_comments", "args": {"post_id": "$last.data.id"}},
+     {"id": "negative", "op": "filter_negative_comments", "args": {"comments": "$comments"}},
+     {"id": "hide", "op": "bulk_hide_comments", "args": {"comment_ids": "$negative[*].id"}}]
+    """
+    return manager.execute_plan(steps)
+
+@tool()
+def get_more_results(handle: str, budget: int = None) -> dict[str, Any]:
+    """Fetch the items left out of a compacted tool result.
+    Input: handle (str) - from the result's "pagination" section, budget (int, optional) - max response bytes
+    Output: dict with the next items in "data", and a new "pagination" section if more remain
+    """
+    return output.more(handle, budget)
+
+@tool()
+def get_output_size_stats() -> dict[str, Any]:
+    """Serialized response size per tool, before and after compaction.
+    Input: None
+    Output: dict keyed by tool name with calls, raw/sent bytes totals and averages
+    """
+    return output.stats.snapshot()
+
+@mcp.resource("metrics://facebook-mcp", mime_type="application/json")
+def server_metrics() -> dict[str, Any]:
+    """Per-tool and per-Graph-endpoint latency, call counts, errors, bytes and cache hits."""
+    return metrics.snapshot()
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def prometheus_metrics(request):
+    """Prometheus text endpoint on the HTTP transports."""
+    from starlette.responses import PlainTextResponse
+    return PlainTextResponse(metrics.prometheus(), media_type="text/plain; version=0.0.4")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Facebook MCP server")
+    parser.add_argument("--transport", choices=["stdio", "sse", "streamable-http"], default=MCP_TRANSPORT)
+    parser.add_argument("--host", default=MCP_HOST)
+    parser.add_argument("--port", type=int, default=MCP_PORT)
+    args = parser.parse_args()
+    mcp.settings.host = args.host
+    mcp.settings.port = args.port
+    mcp.run(args.transport)
+
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Smoke test of the benchmark suite against the fake Graph API
+"""
+
+import inspect
+import json
+import subprocess
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from manager import Manager
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_benchmark_suite_covers_every_manager_method(tmp_path):
+    """Every public Manager method runs once against the fake Graph server"""
+    output = tmp_path / "bench.json"
+    env = {k: v for k, v in os.environ.items() if not k.startswith("FACEBOOK_")}
+    subprocess.run(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "run_benchmarks.py"),
+         "--iterations", "2", "--latency-ms", "0", "--jitter-ms", "0", "--json", str(output)],
+        check=True, cwd=ROOT, env=env, capture_output=True,
+    )
+    results = json.loads(output.read_text())
+
+    public_methods = {name for name, _ in inspect.getmembers(Manager, inspect.isfunction) if not name.startswith("_")}
+    assert set(results) == public_methods
+    for name, result in results.items():
+        assert result["p50_ms"] <= result["p99_ms"], name
+
+
+def test_startup_benchmark_reaches_first_tool_result():
+    """The stdio server answers initialize and a first tool call"""
+    env = {k: v for k, v in os.environ.items() if not k.startswith("FACEBOOK_")}
+    completed = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "bench_startup.py"), "--runs", "1",
+         "--initialize-target-ms", "60000", "--first-result-target-ms", "60000"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    assert completed.returncode == 0, completed.stderr
+    assert "time-to-first-tool-result" in completed.stdout
+
+
+def test_model_benchmark_reports_every_variant():
+    """The model benchmark decodes the fixture pages with every variant"""
+    completed = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "bench_models.py"), "--comments", "300", "--posts", "30", "--runs", "1"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    assert completed.returncode == 0, completed.stderr
+    assert "models" in completed.stdout and "dicts (json)" in completed.stdout
+
+
+def test_duplicate_benchmark_finds_the_spam_waves():
+    """The duplicate benchmark clusters the planted spam waves"""
+    completed = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "bench_duplicates.py"), "--sizes", "2000", "--waves", "5"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.splitlines()[1].split()[4] == "5"
+
+
+def test_image_benchmark_reports_bytes_saved():
+    """The image benchmark publishes the photos as they are and preprocessed"""
+    pytest.importorskip("PIL")
+    completed = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "bench_images.py"), "--photos", "2", "--width", "1600",
+         "--height", "1200", "--upload-mbps", "1000", "--workers", "1"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    assert completed.returncode == 0, completed.stderr
+    assert "original" in completed.stdout and "preprocess, 1 process" in completed.stdout
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test de la caché de capacidades: métricas, campos y endpoints que Graph rechaza no se vuelven a pedir
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import facebook_api
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+from capabilities import CapabilityCache, is_capability_error
+
+METRICS = [
+    "post_impressions", "post_impressions_unique", "post_impressions_paid", "post_impressions_organic",
+    "post_engaged_users", "post_clicks", "post_reactions_like_total", "post_reactions_love_total",
+]
+
+
+def _insights_calls(server):
+    return sum(n for endpoint, n in server.reset_stats().endpoints.items() if endpoint.endswith("/insights"))
+
+
+def test_cache_entries_expire_and_are_kept_per_scope():
+    """Una entrada caduca tras el TTL y solo vale para su página y token; los errores transitorios no se guardan"""
+    cache = CapabilityCache(ttl=0.05)
+    error = {"code": 100, "message": "(#100) The value must be a valid insights metric"}
+    cache.mark_unsupported("page:token-a", "metric", "post_engaged_users", error)
+    assert cache.get("page:token-a", "metric", "post_engaged_users") == error
+    assert not cache.is_unsupported("page:token-b", "metric", "post_engaged_users")
+    assert cache.partition("page:token-a", "metric", ["post_clicks", "post_engaged_users", "post_impressions"]) == (
+        ["post_clicks", "post_impressions"], ["post_engaged_users"])
+    time.sleep(0.06)
+    assert not cache.is_unsupported("page:token-a", "metric", "post_engaged_users") and cache.snapshot() == []
+
+    assert is_capability_error(error) and is_capability_error({"code": 200})
+    # Límite de llamadas y objeto inexistente: no dicen nada de la capacidad
+    assert not is_capability_error({"code": 4}) and not is_capability_error({"code": 100, "error_subcode": 33})
+
+
+def test_a_rejected_metric_is_found_once_and_then_skipped(monkeypatch):
+    """La métrica inválida se aísla partiendo la lista; después no se vuelve a pedir con esa página y token"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        api = facebook_api.FacebookAPI()
+        post_id = server.data.edges[(PAGE_ID, "posts")][0]
+        expected = sorted(m for m in METRICS if m != "post_engaged_users")
+
+        server.reset_stats()
+        first = api.get_bulk_insights(post_id, METRICS)
+        # 8 métricas, una mala: 1 + 2 + 2 + 2 peticiones hasta aislarla
+        assert _insights_calls(server) == 7
+        assert sorted(item["name"] for item in first["data"]) == expected
+        assert first["skipped_metrics"] == ["post_engaged_users"]
+
+        second = api.get_bulk_insights(post_id, METRICS)
+        assert _insights_calls(server) == 1
+        assert sorted(item["name"] for item in second["data"]) == expected
+        assert second["skipped_metrics"] == ["post_engaged_users"]
+        assert api.metrics.snapshot()["hits"]["capability_cache"] == 1
+
+        # Solo la métrica rechazada: se responde con el error guardado, sin llamar a Graph
+        only = api.get_insights(post_id, "post_engaged_users")
+        assert "valid insights metric" in only["error"]["message"] and _insights_calls(server) == 0
+
+        # Otro token es otro ámbito: se vuelve a comprobar
+        monkeypatch.setattr(facebook_api, "PAGE_ACCESS_TOKEN", "otro-token")
+        assert api.get_bulk_insights(post_id, METRICS)["skipped_metrics"] == ["post_engaged_users"]
+        assert _insights_calls(server) == 7
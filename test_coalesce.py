@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Test de la fusión de peticiones idénticas concurrentes
+"""
+
+import sys
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from coalesce import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_request():
+    """Varias sesiones pidiendo lo mismo a la vez generan una sola llamada"""
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {"data": [{"id": "1_1"}]}
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(flight.do, "GET 1/posts", fetch) for _ in range(5)]
+        time.sleep(0.1)
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    # Cada llamante recibe su propia copia
+    results[0][0]["data"].clear()
+    assert all(r["data"] == [{"id": "1_1"}] for r, _ in results[1:])
+
+    # Una vez terminada, la siguiente llamada vuelve a consultar
+    flight.do("GET 1/posts", fetch)
+    assert len(calls) == 2
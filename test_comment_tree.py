@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Test de la lectura de hilos de comentarios por niveles con peticiones multi-ID
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import facebook_api
+import manager as manager_module
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+
+
+def test_comment_tree_reads_one_request_per_level(monkeypatch, tmp_path):
+    """El árbol completo cuesta una petición por nivel y cada respuesta apunta a su padre"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        monkeypatch.setattr(manager_module, "JOBS_FILE", str(tmp_path / "jobs.json"))
+        manager = manager_module.Manager()
+        api = manager.api
+        post_id = server.data.edges[(PAGE_ID, "posts")][0]
+
+        server.reset_stats()
+        tree = api.get_comment_tree(post_id, max_depth=3)
+        assert server.reset_stats().calls <= 3
+
+        comments = tree["comments"]
+        by_id = {c["id"]: c for c in comments}
+        assert len(by_id) == tree["count"] == len(comments)
+        top_level = server.data.edges[(post_id, "comments")]
+        assert [c["id"] for c in comments[:len(top_level)]] == top_level
+        for comment in comments:
+            if comment["parent_id"] is None:
+                assert comment["depth"] == 1
+            else:
+                assert by_id[comment["parent_id"]]["depth"] == comment["depth"] - 1
+            assert comment["reply_count"] == len(server.data.edges.get((comment["id"], "comments"), []))
+            assert comment["author_id"] in tree["authors"]
+        # Recorrido en anchura: los niveles aparecen en orden
+        assert [c["depth"] for c in comments] == sorted(c["depth"] for c in comments)
+
+        shallow = api.get_comment_tree(post_id, max_depth=1)
+        assert shallow["count"] == len(top_level) and shallow["truncated"]
+
+        # Los autores de las respuestas cuentan en los principales comentaristas
+        with_replies = manager.get_post_top_commenters(post_id, include_replies=True)
+        assert sum(c["count"] for c in with_replies) == len(comments)
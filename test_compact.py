@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Test de la salida compacta: recorte por presupuesto, continuación con get_more_results y textos largos
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from compact import MIN_TEXT_LENGTH, OutputShaper, PageStore, fit_to_budget, prune, serialized_size
+
+
+def _posts(n, text="x" * 100):
+    return [{"id": str(i), "message": text} for i in range(n)]
+
+
+def test_prune_drops_empty_redundant_and_paging_urls_and_truncates_text():
+    """Fuera vacíos, claves repetidas y URLs de paginación; el texto largo se corta indicando cuánto falta"""
+    result = prune({
+        "data": [{"id": "1", "message": "a" * 600, "story": "", "tags": []}],
+        "engagement_summary": {"likes": 3},
+        "paging": {"cursors": {"after": "abc"}, "next": "https://graph.facebook.com/...&access_token=SECRETO"},
+    }, max_text=500)
+    assert result == {
+        "data": [{"id": "1", "message": "a" * 500 + "… (+100 chars)"}],
+        "paging": {"cursors": {"after": "abc"}},
+    }
+
+
+def test_budget_cuts_the_largest_list_and_the_rest_is_paged():
+    """Se recorta la lista más grande; el resto se pide por partes con su handle hasta agotarlo"""
+    store = PageStore()
+    result = {"page": {"id": "p", "name": "Recetas"}, "tags": ["a", "b"], "data": _posts(40)}
+    fitted = fit_to_budget(result, 1500, store, 500)
+    assert serialized_size(fitted) <= 1500 and fitted["tags"] == ["a", "b"] and fitted["page"]["name"] == "Recetas"
+    (more,) = fitted["pagination"]["more"]
+    assert more["field"] == "data" and len(fitted["data"]) + more["remaining"] == 40
+
+    shaper = OutputShaper(False, 1500, 500)
+    shaper.pages = store
+    ids, handle = [p["id"] for p in fitted["data"]], more["handle"]
+    while handle:
+        page = shaper.more(handle, 1500)
+        assert serialized_size(page) <= 1500
+        ids += [p["id"] for p in page["data"]]
+        handle = page["pagination"]["more"][0]["handle"] if "pagination" in page else None
+    assert ids == [str(i) for i in range(40)]
+    # Un handle ya usado no vuelve a servir
+    assert "error" in shaper.more(more["handle"])
+
+
+def test_handles_expire_and_old_ones_are_evicted():
+    """Los handles caducan tras el TTL y, por encima del máximo, se descartan los más antiguos"""
+    store = PageStore(max_entries=2, ttl=0.05)
+    first, second, third = store.put([1]), store.put([2]), store.put([3])
+    assert store.pop(first) is None and store.pop(second) == [2]
+    time.sleep(0.06)
+    assert store.pop(third) is None
+
+
+def test_text_is_shortened_further_only_when_cutting_lists_is_not_enough():
+    """Un único texto enorme no se puede partir: se acorta hasta caber, sin bajar del mínimo"""
+    shaper = OutputShaper(True, 8000, 500)
+    single = shaper.shape("get_my_last_post", {"data": {"id": "1", "message": "y" * 5000}})
+    assert single["data"]["message"].startswith("y" * 500 + "…")
+    tight = shaper.shape("get_my_last_post", {"data": {"id": "1", "message": "y" * 5000}}, budget=200)
+    assert serialized_size(tight) <= 200 and len(tight["data"]["message"]) >= MIN_TEXT_LENGTH
+    # Sin modo compacto ni presupuesto el resultado llega intacto, pero su tamaño se registra
+    plain = OutputShaper(False, 8000, 500)
+    assert plain.shape("get_page_posts", {"data": _posts(3, "z" * 900)})["data"][0]["message"] == "z" * 900
+    assert plain.stats.snapshot()["get_page_posts"]["calls"] == 1
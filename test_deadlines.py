@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test de los plazos por herramienta y la cancelación cooperativa de llamadas en curso
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import anyio
+import pytest
+from mcp.shared.exceptions import McpError
+from mcp.shared.memory import create_connected_server_and_client_session
+from mcp.types import CancelledNotification, CancelledNotificationParams, ClientNotification
+
+import facebook_api
+import manager as manager_module
+import server as server_module
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+from deadlines import Cancelled, Deadline, enforcing
+
+
+@pytest.fixture
+def graph(monkeypatch, tmp_path):
+    with FakeGraphServer(FakeGraphConfig(latency_ms=40, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        monkeypatch.setattr(manager_module, "JOBS_FILE", str(tmp_path / "jobs.json"))
+        monkeypatch.setattr(server_module, "manager", manager_module.Manager())
+        yield server
+
+
+def _calls(server, method):
+    return sum(n for endpoint, n in server.reset_stats().endpoints.items() if endpoint.startswith(method))
+
+
+def _comment_ids(server, n):
+    ids = []
+    for post_id in server.data.edges[(PAGE_ID, "posts")]:
+        ids += server.data.edges[(post_id, "comments")]
+    return ids[:n]
+
+
+def test_time_budget_stops_bulk_tool_and_reports_finished_items(graph, monkeypatch):
+    """Al agotarse el plazo no se envían más peticiones y el resultado dice qué se borró"""
+    monkeypatch.setattr(server_module, "TOOL_TIMEOUTS", {"bulk_delete_comments": 0.3})
+    comment_ids = _comment_ids(graph, 20)
+    graph.reset_stats()
+
+    result = anyio.run(lambda: server_module.bulk_delete_comments(comment_ids=comment_ids))
+    deleted = _calls(graph, "DELETE")
+
+    assert result["stopped"] and "Time budget of 0.3 s exceeded" in result["error"]
+    assert 0 < result["completed_count"] == deleted < 20
+    assert [item["comment_id"] for item in result["completed"]] == comment_ids[:deleted]
+    assert result["not_started_count"] == 20 - deleted
+    assert all(comment_ids[i] not in graph.data.objects for i in range(deleted))
+    assert all(cid in graph.data.objects for cid in comment_ids[deleted:])
+
+
+def test_deadline_cuts_short_a_slow_read(monkeypatch):
+    """Una lectura en curso no espera más allá del plazo: se corta y la llamada se detiene"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=2000, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        api = facebook_api.FacebookAPI()
+        start = time.perf_counter()
+        with enforcing(Deadline(0.2)), pytest.raises(Cancelled):
+            api.get_posts()
+        assert time.perf_counter() - start < 1
+
+
+def test_client_cancellation_stops_further_graph_calls(graph):
+    """Si el cliente cancela, la herramienta deja de llamar a Graph tras el elemento en curso"""
+    comment_ids = _comment_ids(graph, 30)
+    graph.reset_stats()
+
+    async def main():
+        async with create_connected_server_and_client_session(server_module.mcp) as session:
+            cancelled = anyio.Event()
+
+            async def on_progress(done, total, message):
+                if done == 2 and not cancelled.is_set():
+                    cancelled.set()
+                    # Request 0 is initialize; the tool call is request 1
+                    await session.send_notification(ClientNotification(CancelledNotification(
+                        params=CancelledNotificationParams(requestId=1, reason="el agente se rindió"))))
+
+            with pytest.raises(McpError):
+                await session.call_tool("bulk_hide_comments", {"comment_ids": comment_ids},
+                                        progress_callback=on_progress)
+
+    anyio.run(main)
+    time.sleep(0.3)
+    hidden = _calls(graph, "POST")
+    assert 2 <= hidden <= 4
+    assert graph.reset_stats().calls == 0
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Test de la detección de comentarios casi duplicados (MinHash/LSH)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import facebook_api
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+from duplicates import DuplicateIndex
+
+
+def test_index_groups_edited_copies_and_ignores_short_texts():
+    """Copias con pequeños cambios se agrupan; textos cortos o distintos no"""
+    index = DuplicateIndex()
+    spam = [
+        "Gana 500€ al día desde casa sin experiencia, escríbeme por WhatsApp",
+        "GANA 500€ al dia desde casa sin experiencia, escribeme por WhatsApp 🔥🔥",
+        "Gana 500€ al día desde csa sin experiencia!! escríbeme por whatsapp",
+    ]
+    positions = [index.add(text) for text in spam]
+    assert index.add("Gracias!") is None and index.add("gracias!!") is None
+    other = index.add("La receta de la pizza casera quedó buenísima, mañana la repito")
+    assert index.clusters() == [positions]
+    assert index.similarity(positions[0], positions[1]) > 0.6 > index.similarity(positions[0], other)
+
+
+def test_find_duplicate_comments_returns_the_spam_waves(monkeypatch):
+    """Las oleadas de spam repartidas entre publicaciones salen como grupos en 3 peticiones"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        api = facebook_api.FacebookAPI()
+
+        server.reset_stats()
+        result = api.find_duplicate_comments(since="2024-12-01T00:00:00Z")
+        # 1 listado de publicaciones + 2 peticiones multi-ID de comentarios
+        assert server.reset_stats().calls == 3
+        assert result["posts_scanned"] == 60
+
+        waves = sorted((set(w) for w in server.data.spam_waves), key=len, reverse=True)
+        assert [set(c["comment_ids"]) for c in result["clusters"]] == waves
+        assert sorted(result["comment_ids"]) == sorted(cid for wave in waves for cid in wave)
+        largest = result["clusters"][0]
+        assert largest["size"] == len(largest["comment_ids"]) and len(largest["post_ids"]) > 1
+
+        # Solo las publicaciones indicadas
+        wave = server.data.spam_waves[0]
+        posts = sorted({f"{PAGE_ID}_{cid.split('_')[0]}" for cid in wave})
+        subset = api.find_duplicate_comments(posts)
+        assert subset["posts_scanned"] == len(posts)
+        assert set(subset["clusters"][0]["comment_ids"]) == set(wave) and subset["clusters"][0]["post_ids"] == posts
+        assert "error" in api.find_duplicate_comments(threshold=0)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Test del informe de interacción de la página en un rango de fechas
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import facebook_api
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+
+
+def test_report_ranks_window_with_multi_id_requests(monkeypatch):
+    """56 publicaciones de una semana cuestan 1 listado + 2 peticiones multi-ID"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        api = facebook_api.FacebookAPI()
+
+        server.reset_stats()
+        report = api.get_page_engagement_report("2025-01-01T00:00:00Z", "2025-01-08T00:00:00Z")
+        assert server.reset_stats().calls == 3
+
+        posts = report["posts"]
+        assert report["post_count"] == len(posts) == 56
+        assert all("2025-01-01T00:00:00+0000" <= p["created_time"] <= "2025-01-08T00:00:00+0000" for p in posts)
+        assert [p["engagement"] for p in posts] == sorted((p["engagement"] for p in posts), reverse=True)
+        assert [p["rank"] for p in posts] == list(range(1, 57))
+
+        best = posts[0]
+        post = server.data.objects[best["id"]]
+        assert best["reactions"] == post["reactions"] and best["shares"] == post["shares"]["count"]
+        assert sum(best["reaction_mix"].values()) <= best["reactions"]
+        assert report["top"]["engagement"] == {"id": best["id"], "value": best["engagement"]}
+        assert report["totals"]["shares"] == sum(p["shares"] for p in posts)
+
+        assert "error" in api.get_page_engagement_report("2025-01-08", "2025-01-01")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test de los perfiles de campos (id, lean, engagement, full), del parámetro fields y de la proyección de resultados
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import facebook_api
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+from fields import PROFILES, project, requested_base_fields, resolve_fields
+
+
+def test_profiles_and_explicit_fields():
+    """Cada perfil da su lista de campos; fields manda sobre el perfil y siempre incluye el id"""
+    assert resolve_fields("post", "id") == ["id"]
+    assert resolve_fields("comment", "lean") == ["id", "message", "from", "created_time"]
+    assert resolve_fields("post") == PROFILES["post"]["full"]
+    assert resolve_fields("post", default="lean") == ["id", "message", "created_time"]
+    # La lista devuelta es una copia: modificarla no cambia el perfil
+    resolve_fields("post", "id").append("message")
+    assert PROFILES["post"]["id"] == ["id"]
+
+    assert resolve_fields("post", "full", fields="message, shares") == ["id", "message", "shares"]
+    assert resolve_fields("comment", fields=["id", "like_count", " "]) == ["id", "like_count"]
+    with pytest.raises(ValueError, match="Unknown post field profile 'minimal'. Available: id, lean, engagement, full"):
+        resolve_fields("post", "minimal")
+
+
+def test_projection_keeps_only_requested_fields():
+    """Solo quedan las claves de los campos pedidos, también las que salen de un campo con otro nombre"""
+    fields = ["id", "likes.limit(0).summary(true)", "message"]
+    assert requested_base_fields(fields) == {"id", "likes", "message"}
+    data = {"id": "1", "message": "hola", "likes_count": 3, "shares_count": 1, "created_time": "ayer"}
+    sources = {"likes_count": {"likes"}, "shares_count": {"shares"}}
+    assert project(data, fields, sources) == {"id": "1", "message": "hola", "likes_count": 3}
+    assert list(project(data, ["message", "id"])) == ["id", "message"]
+
+
+def test_fields_graph_rejects_are_dropped_and_remembered(monkeypatch):
+    """El perfil full pide campos de adjuntos retirados: se quitan, se avisa y la siguiente lectura ya no los pide"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        api = facebook_api.FacebookAPI()
+        deprecated = ["description", "caption", "name", "link", "source", "type"]
+
+        server.reset_stats()
+        first = api.get_posts("full")
+        assert "error" not in first and server.reset_stats().calls == 2
+        assert sorted(first["skipped_fields"]) == sorted(deprecated)
+
+        second = api.get_posts("full")
+        assert server.reset_stats().calls == 1 and sorted(second["skipped_fields"]) == sorted(deprecated)
+        assert api.metrics.snapshot()["hits"]["capability_cache"] == len(deprecated)
+
+        # Con un perfil que no los pide no hay nada que avisar
+        lean = api.get_posts("lean")
+        assert "skipped_fields" not in lean and server.reset_stats().calls == 1
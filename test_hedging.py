@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test de las lecturas con cobertura (hedging) contra la cola de latencia
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import facebook_api
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+from hedging import HedgePolicy
+from priorities import RequestScheduler
+
+
+def test_hedge_delay_follows_recent_latencies_and_budget_is_capped():
+    """El retardo sigue el percentil de latencias recientes y el presupuesto limita las copias"""
+    policy = HedgePolicy(percentile=90, max_extra=0.1, min_delay=0.01, min_samples=10, burst=2)
+    assert policy.delay("{id}/comments") is None
+    for i in range(100):
+        policy.observe("{id}/comments", 0.1 if i % 10 else 2.0)
+    # 10% de respuestas lentas: el percentil 90 está justo en la cola
+    assert policy.delay("{id}/comments") == 2.0
+    policy.percentile = 50
+    assert policy.delay("{id}/comments") == 0.1
+
+    for _ in range(100):
+        policy.earn()
+    # 100 lecturas × 0.1 = 10 fichas, pero el máximo acumulable es 2
+    assert [policy.spend() for _ in range(3)] == [True, True, False]
+
+
+def test_hedged_reads_cut_the_slow_tail(monkeypatch):
+    """Con hedging, una respuesta lenta del servidor no bloquea la lectura"""
+    config = FakeGraphConfig(latency_ms=5, jitter_ms=0, seed=7)
+    with FakeGraphServer(config) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        api = facebook_api.FacebookAPI()
+        api.hedging = HedgePolicy(percentile=80, max_extra=0.5, min_delay=0.02, min_samples=10)
+
+        # Calentamiento: latencias normales para el percentil
+        for _ in range(20):
+            api.get_page_fan_count()
+        # Ahora el 15% de las respuestas tarda 1,5 s
+        config.slow_rate, config.slow_ms = 0.15, 1500
+        latencies = []
+        for _ in range(40):
+            start = time.perf_counter()
+            assert api.get_page_fan_count() == 15234
+            latencies.append(time.perf_counter() - start)
+
+        events = api.metrics.snapshot()["events"]
+        assert 0 < events.get("hedged_requests", 0) <= 0.5 * 60
+        assert events.get("hedges_won", 0) > 0
+        # Solo si la copia también es lenta se espera la respuesta lenta
+        assert sum(latency > 1.0 for latency in latencies) <= 2
+
+
+def test_time_queued_for_a_slot_is_not_hedged_nor_measured(monkeypatch):
+    """Una lectura que espera turno en el planificador no manda copia ni cuenta esa espera como latencia"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=5, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        api = facebook_api.FacebookAPI()
+        api.scheduler = RequestScheduler(1)
+        api.hedging = HedgePolicy(percentile=80, max_extra=1, min_delay=0.02, min_samples=10)
+        for _ in range(20):
+            api.get_page_fan_count()
+
+        blocker = api.scheduler.slot()
+        blocker.__enter__()
+        threading.Timer(0.3, blocker.__exit__, (None, None, None)).start()
+        start = time.perf_counter()
+        assert api.get_page_fan_count() == 15234
+        assert time.perf_counter() - start >= 0.3
+
+        assert "hedged_requests" not in api.metrics.snapshot()["events"]
+        assert api.hedging.delay("{id}") < 0.1
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test del preprocesado de fotos locales antes de subirlas
+"""
+
+import sys
+import os
+import io
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import facebook_api
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+from imaging import ImagePreprocessor, local_path, preprocess_image
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _phone_photo(path, size=(3000, 2000)):
+    """Foto grande con EXIF (orientación girada y GPS), como las de un móvil"""
+    image = Image.effect_noise(size, 40).convert("RGB")
+    exif = Image.Exif()
+    exif[0x0112] = 6  # girada 90º
+    exif[0x8825] = {1: "N", 2: (40.0, 25.0, 0.0)}
+    image.save(path, "JPEG", quality=95, exif=exif)
+    return path
+
+
+def _not_an_image(tmp_path):
+    path = tmp_path / "notes.jpg"
+    path.write_text("no soy una imagen")
+    return str(path)
+
+
+def test_preprocess_resizes_rotates_and_strips_metadata(tmp_path):
+    """La foto cabe en 2048 px, queda girada según el EXIF y sin metadatos"""
+    path = _phone_photo(str(tmp_path / "IMG_0001.jpeg"), (4000, 3000))
+    upload = preprocess_image(path, 2048, 85)
+
+    assert upload["processed"] and upload["content_type"] == "image/jpeg"
+    assert upload["original_size"] == [4000, 3000] and upload["size"] == [1536, 2048]
+    assert upload["bytes"] < upload["original_bytes"] == os.path.getsize(path)
+    with Image.open(io.BytesIO(upload["data"])) as image:
+        assert image.size == (1536, 2048) and not image.getexif()
+
+    # Una foto pequeña sin metadatos se sube tal cual
+    small = str(tmp_path / "logo.png")
+    Image.new("RGB", (64, 64), "red").save(small)
+    assert not preprocess_image(small)["processed"]
+    unreadable = preprocess_image(_not_an_image(tmp_path))
+    assert not unreadable["processed"] and "error" not in unreadable and "Could not read image" in unreadable["warning"]
+    assert local_path(f"file://{path}") == path and local_path("https://example.com/a.jpg") is None
+
+
+def test_local_photos_are_preprocessed_in_parallel_and_uploaded(monkeypatch, tmp_path):
+    """Varias fotos locales se procesan en paralelo y se suben como multipart con el informe de bytes ahorrados"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        api = facebook_api.FacebookAPI()
+        api.images = ImagePreprocessor(True, 2048, 85, workers=2)
+        try:
+            paths = [_phone_photo(str(tmp_path / f"IMG_{i}.jpg"), (2400, 1600)) for i in range(3)]
+            remote = server.media_url("remote.jpg")
+            result = api.post_media_to_facebook(paths + [remote], "receta de pizza casera")
+        finally:
+            api.images.close()
+
+        assert result["images_posted"] == 4 and not result["errors"]
+        report = result["preprocessing"]
+        assert report["images"] == report["processed"] == 3
+        assert report["bytes_saved"] == report["original_bytes"] - report["bytes"] > 0
+        assert result["publish_seconds"] >= report["seconds"]
+
+        uploaded = [server.data.objects[p["response"]["id"]] for p in result["posts_created"]]
+        assert sum(o["source"]["bytes"] for o in uploaded[:3]) == report["bytes"]
+        assert uploaded[3]["url"] == remote
+
+
+def _heic(path, size):
+    """Cabecera HEIC (ftyp heic) que Pillow no sabe leer sin plugin"""
+    with open(path, "wb") as f:
+        f.write(b"\x00\x00\x00\x18ftypheic\x00\x00\x00\x00mif1heic" + bytes(size))
+    return str(path)
+
+
+def test_photos_pillow_cannot_read_are_uploaded_unchanged(monkeypatch, tmp_path):
+    """Con el preprocesado activo, una foto HEIC se sube tal cual con un aviso; si es demasiado grande se rechaza antes"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        api = facebook_api.FacebookAPI()
+        api.images = ImagePreprocessor(True, 2048, 85)
+        photo = _heic(tmp_path / "IMG_0002.heic", 200_000)
+
+        result = api.post_image_to_facebook(photo, "Atardecer")
+        assert "error" not in result and result["preprocessing"]["processed"] == 0
+        assert "Could not read image" in result["preprocessing"]["warnings"][0]["warning"]
+        assert server.data.objects[result["id"]]["source"]["bytes"] == os.path.getsize(photo)
+
+        # Una HEIC de 15 MB no se puede reducir: no pasa la comprobación previa
+        server.reset_stats()
+        huge = _heic(tmp_path / "IMG_0003.heic", 15 * 1024 * 1024)
+        assert "limit is 10 MB" in api.post_image_to_facebook(huge, "Grande")["rejected"][0]["error"]
+        assert server.reset_stats().calls == 0
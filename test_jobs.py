@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test de la cola de trabajos en segundo plano
+"""
+
+import sys
+import os
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from jobs import JobQueue
+
+
+def test_job_runs_in_background_and_deduplicates_retries(tmp_path):
+    """El trabajo devuelve un ID al instante y un reintento no publica dos veces"""
+    release = threading.Event()
+    calls = []
+
+    def runner(kind, args):
+        calls.append((kind, args))
+        release.wait(5)
+        return {"success": True, "posted": len(args["media_urls"])}
+
+    queue = JobQueue(runner, str(tmp_path / "jobs.json"), workers=1)
+    args = {"media_urls": ["a.jpg", "b.mp4"], "content_prompt": "Recetas"}
+    job = queue.submit("post_media_to_facebook", args)
+    assert job["status"] == "queued" and not job["deduplicated"]
+
+    retry = queue.submit("post_media_to_facebook", dict(args))
+    assert retry["id"] == job["id"] and retry["deduplicated"]
+
+    release.set()
+    status = queue.wait(job["id"], timeout=5)
+    assert status["status"] == "succeeded"
+    assert status["result"] == {"success": True, "posted": 2}
+    assert len(calls) == 1
+
+
+def test_restart_resumes_queued_jobs_and_interrupts_running_ones(tmp_path):
+    """Tras reiniciar, lo pendiente se retoma y lo que estaba en curso no se repite"""
+    path = str(tmp_path / "jobs.json")
+    started, release = threading.Event(), threading.Event()
+
+    def blocking_runner(kind, args):
+        started.set()
+        release.wait(5)
+        return {"success": True}
+
+    queue = JobQueue(blocking_runner, path, workers=1)
+    running = queue.submit("create_storie_list_media", {"media_urls": ["1.jpg"]})
+    started.wait(5)
+    queued = queue.submit("create_storie_list_media", {"media_urls": ["2.jpg"]})
+    cancelled = queue.submit("create_storie_list_media", {"media_urls": ["3.jpg"]})
+    assert queue.cancel(cancelled["id"])["status"] == "cancelled"
+    assert "error" in queue.cancel(running["id"])
+    token_job = queue.submit("create_page_media_post", {"page_id": "1", "media_urls": ["4.jpg"],
+                                                        "content_prompt": "x", "page_access_token": "SECRETO"})
+    with open(path) as f:
+        assert "SECRETO" not in f.read()
+
+    # El primer servidor se detiene con un trabajo a medias; otro arranca con el mismo fichero
+    queue.close()
+    resumed = []
+    restarted = JobQueue(lambda kind, args: resumed.append(args) or {"success": True}, path, workers=1)
+    assert restarted.status(running["id"])["status"] == "interrupted"
+    assert restarted.status(token_job["id"])["status"] == "interrupted"
+    assert restarted.wait(queued["id"], timeout=5)["status"] == "succeeded"
+    assert restarted.status(cancelled["id"])["status"] == "cancelled"
+    assert resumed == [{"media_urls": ["2.jpg"]}]
+    release.set()
+
+
+def test_two_live_processes_share_the_jobs_file(tmp_path):
+    """Dos servidores con el mismo fichero no retoman ni interrumpen los trabajos del otro, ni los pierden"""
+    path = str(tmp_path / "jobs.json")
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def blocking_runner(kind, args):
+        calls.append(("first", args))
+        started.set()
+        release.wait(5)
+        return {"success": True}
+
+    first = JobQueue(blocking_runner, path, workers=1)
+    running = first.submit("create_storie_list_media", {"media_urls": ["1.jpg"]})
+    started.wait(5)
+    queued = first.submit("create_storie_list_media", {"media_urls": ["2.jpg"]})
+
+    second = JobQueue(lambda kind, args: calls.append(("second", args)) or {"success": True}, path, workers=1)
+    assert second.status(running["id"])["status"] == "running"
+    assert second.status(queued["id"])["status"] == "queued"
+    assert "error" in second.cancel(queued["id"])
+    # Un reintento desde la otra sesión no publica dos veces
+    assert second.submit("create_storie_list_media", {"media_urls": ["2.jpg"]})["id"] == queued["id"]
+    own = second.submit("create_storie_list_media", {"media_urls": ["3.jpg"]})
+    assert second.wait(own["id"], timeout=5)["status"] == "succeeded"
+
+    release.set()
+    assert second.wait(queued["id"], timeout=5)["status"] == "succeeded"
+    assert sorted(calls, key=str) == [("first", {"media_urls": ["1.jpg"]}), ("first", {"media_urls": ["2.jpg"]}),
+                             ("second", {"media_urls": ["3.jpg"]})]
+    # Ningún proceso ha borrado los trabajos del otro al guardar
+    third = JobQueue(lambda kind, args: {"success": True}, path, workers=1)
+    assert {j["id"]: j["status"] for j in third.list_jobs()} == {
+        running["id"]: "succeeded", queued["id"]: "succeeded", own["id"]: "succeeded"}
+
+
+def test_startup_resumes_pending_jobs_without_a_tool_call(monkeypatch, tmp_path):
+    """Al arrancar el servidor, los trabajos pendientes se retoman sin esperar a la primera llamada"""
+    import server as server_module
+    from lazy import Deferred
+
+    path = str(tmp_path / "jobs.json")
+    started, release = threading.Event(), threading.Event()
+    first = JobQueue(lambda kind, args: started.set() or release.wait(5) or {"success": True}, path, workers=1)
+    first.submit("create_storie_list_media", {"media_urls": ["1.jpg"]})
+    started.wait(5)
+    pending = first.submit("create_storie_list_media", {"media_urls": ["2.jpg"]})
+    first.close()
+
+    ran = threading.Event()
+    built = []
+    monkeypatch.setattr(server_module, "JOBS_FILE", path)
+    monkeypatch.setattr(server_module, "manager", Deferred(
+        lambda: built.append(JobQueue(lambda kind, args: ran.set() or {"success": True}, path, workers=1)) or built[0]))
+    server_module._start_background_work()
+    assert ran.wait(5) and built[0].wait(pending["id"], timeout=5)["status"] == "succeeded"
+
+    # Sin trabajos pendientes no se construye nada
+    built.clear()
+    server_module._start_background_work()
+    assert built == []
+    release.set()
+
+
+def test_progress_of_a_fast_job_is_written_about_once_a_second(monkeypatch, tmp_path):
+    """Cien elementos terminados en ráfaga no reescriben el fichero cien veces; el resultado final sí se guarda"""
+    from progress import Progress
+
+    path = str(tmp_path / "jobs.json")
+    writes = []
+    write = JobQueue._write
+    monkeypatch.setattr(JobQueue, "_write", lambda self: writes.append(1) or write(self))
+
+    def runner(kind, args):
+        progress = Progress(100)
+        for i in range(100):
+            progress.step(f"Comment {i}", {"success": True}, {"comment_id": str(i)})
+        return {"success": True}
+
+    queue = JobQueue(runner, path, workers=1)
+    job = queue.submit("bulk_delete_comments", {"comment_ids": [str(i) for i in range(100)]})
+    assert queue.wait(job["id"], timeout=5)["status"] == "succeeded"
+    # Encolar, empezar, el primer elemento y terminar
+    assert len(writes) <= 5
+    queue.close()
+    assert JobQueue(runner, path).status(job["id"])["result"] == {"success": True}
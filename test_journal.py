@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Test del modo grabación/reproducción del tráfico de Graph
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from journal import GraphRecorder, GraphReplayer
+
+
+def test_recorded_session_replays_without_tokens(tmp_path):
+    """Las respuestas grabadas se reproducen en orden y sin tokens en disco"""
+    path = str(tmp_path / "session.jsonl.gz")
+    recorder = GraphRecorder(path)
+    next_page = "https://graph.facebook.com/v22.0/1/posts?access_token=SECRETO&after=abc"
+    for i in range(2):
+        recorder.record("GET", "1/posts", {"fields": "id", "access_token": "SECRETO"}, None, 200, 0.05,
+                        {"data": [{"id": f"1_{i}"}], "paging": {"next": next_page}})
+    recorder.record("POST", "1/feed", {"message": "Hola", "access_token": "SECRETO"}, None, 200, 0.1, {"id": "1_9"})
+    recorder.close()
+
+    import gzip
+    with gzip.open(path, "rt") as f:
+        assert "SECRETO" not in f.read()
+
+    replayer = GraphReplayer(path)
+    params = {"fields": "id", "access_token": "OTRO_TOKEN"}
+    assert replayer.respond("GET", "1/posts", dict(params))["data"] == [{"id": "1_0"}]
+    assert replayer.respond("GET", "1/posts", dict(params))["data"] == [{"id": "1_1"}]
+    # Agotadas las respuestas grabadas se repite la última
+    assert replayer.respond("GET", "1/posts", dict(params))["data"] == [{"id": "1_1"}]
+    assert replayer.respond("POST", "1/feed", {"message": "Hola"}) == {"id": "1_9"}
+
+    missing = replayer.respond("GET", "1/insights", {"metric": "post_impressions"})
+    assert missing["error"]["type"] == "ReplayMiss"
+    assert replayer.misses == 1
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test de las métricas por herramienta y por endpoint de Graph
+"""
+
+import sys
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from metrics import MetricsRegistry, endpoint_template
+
+
+def test_graph_calls_are_attributed_to_the_tool():
+    """Las llamadas a Graph, también desde otros hilos, cuentan para la herramienta en curso"""
+    registry = MetricsRegistry()
+    with registry.tool_call("get_my_stories"):
+        registry.record_graph_call("GET", "123/stories", 0.02, "10", 50, 120)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            record = registry.propagate(registry.record_graph_call)
+            for endpoint in ("123/photos", "123/videos"):
+                executor.submit(record, "GET", endpoint, 0.01, None, 50, 900).result()
+    registry.hit("capability_cache")
+
+    snapshot = registry.snapshot()
+    tool = snapshot["tools"]["get_my_stories"]
+    assert tool["calls"] == 1
+    assert tool["graph_calls_per_call"] == 3
+    assert tool["network_ms_total"] == 40.0
+    assert snapshot["graph_endpoints"]["GET {id}/stories"]["errors"] == {"10": 1}
+    assert snapshot["graph_endpoints"]["GET {id}/photos"]["bytes_received"] == 900
+    assert snapshot["hits"] == {"capability_cache": 1}
+
+    text = registry.prometheus()
+    assert 'facebook_mcp_tool_graph_requests_total{tool="get_my_stories"} 3' in text
+    assert 'facebook_mcp_graph_errors_total{method="GET",endpoint="{id}/stories",code="10"} 1' in text
+    assert 'facebook_mcp_graph_request_duration_seconds_bucket{method="GET",endpoint="{id}/photos",le="+Inf"} 1' in text
+
+
+def test_endpoint_template_groups_object_ids():
+    """Los IDs de objetos se agrupan para no crear una serie por publicación"""
+    assert endpoint_template("1000_2000/comments") == "{id}/comments"
+    assert endpoint_template("555") == "{id}"
+    assert endpoint_template("me/messages") == "me/messages"
+    assert endpoint_template("v3001/insights") == "v3001/insights"
+
+
+def test_a_second_server_on_the_same_metrics_port_keeps_running(monkeypatch, caplog):
+    """Importar el servidor no abre el puerto; si otro proceso ya lo tiene, solo se avisa"""
+    import socket
+    import urllib.request
+    import server as server_module
+
+    taken = socket.socket()
+    taken.bind(("127.0.0.1", 0))
+    taken.listen()
+    try:
+        monkeypatch.setattr(server_module, "METRICS_PORT", taken.getsockname()[1])
+        server_module._serve_metrics()
+        assert "not served on port" in caplog.text
+    finally:
+        taken.close()
+
+    free = socket.socket()
+    free.bind(("127.0.0.1", 0))
+    port = free.getsockname()[1]
+    free.close()
+    monkeypatch.setattr(server_module, "METRICS_PORT", port)
+    server_module._serve_metrics()
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+        assert b"facebook_mcp" in response.read()
+
+
+def test_pagination_and_size_tools_are_measured_like_the_others(monkeypatch):
+    """get_more_results y get_output_size_stats pasan por el mismo decorador: se miden y respetan el presupuesto"""
+    import inspect
+    import anyio
+    import server as server_module
+    from compact import OutputShaper
+
+    registry = MetricsRegistry()
+    shaper = OutputShaper(False, 8000, 500, registry)
+    monkeypatch.setattr(server_module, "metrics", registry)
+    monkeypatch.setattr(server_module, "output", shaper)
+    parameters = inspect.signature(server_module.get_more_results).parameters
+    assert list(parameters) == ["handle", "budget", "ctx"]
+
+    first = shaper.shape("get_page_posts", {"data": [{"id": str(i), "message": "x" * 200} for i in range(50)]}, budget=2000)
+    handle = first["pagination"]["more"][0]["handle"]
+    more = anyio.run(lambda: server_module.get_more_results(handle=handle, budget=3000))
+    assert more["data"] and len(json.dumps(more)) <= 3000 and "pagination" in more
+    assert "error" in anyio.run(lambda: server_module.get_more_results(handle="no-existe"))
+    assert "get_page_posts" in anyio.run(lambda: server_module.get_output_size_stats())
+
+    tools = registry.snapshot()["tools"]
+    assert tools["get_more_results"]["calls"] == 2 and tools["get_output_size_stats"]["calls"] == 1
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Test de los modelos compactos de Graph (Post, Comment, ...) y su conversión en el borde MCP
+"""
+
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import facebook_api
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+from models import Comment, Post, decode_page, loads, to_plain
+
+
+def test_models_behave_like_the_decoded_json():
+    """Un comentario se lee como el dict original y vuelve a serlo sin pérdidas"""
+    raw = {"id": "1_2", "message": "Hola", "from": {"id": "7", "name": "Ana"}, "reactions": {"summary": {"total_count": 3}}}
+    page = decode_page(loads(json.dumps({"data": [raw, dict(raw, id="1_3")], "paging": {}})), Comment)
+    comment = page["data"][0]
+
+    assert isinstance(comment, Comment)
+    assert comment["id"] == "1_2" and comment.get("missing", "x") == "x"
+    assert comment.from_ == {"id": "7", "name": "Ana"} and comment.parent is None
+    assert comment == raw and {**comment} == raw and "reactions" in comment
+    # Los objetos de una página con los mismos campos comparten el índice de claves
+    assert comment._shape is page["data"][1]._shape
+    assert to_plain(page) == {"data": [raw, dict(raw, id="1_3")], "paging": {}}
+    assert json.dumps(to_plain(page))
+
+
+def test_api_returns_models_and_tools_return_dicts(monkeypatch):
+    """La API devuelve modelos y el resultado de la herramienta MCP solo contiene dicts"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        api = facebook_api.FacebookAPI()
+
+        posts = api.get_posts()
+        assert posts["data"] and all(isinstance(p, Post) for p in posts["data"])
+        comments = api.get_comments(posts["data"][0].id)
+        assert all(isinstance(c, Comment) for c in comments["data"])
+
+        plain = to_plain(comments)
+        assert type(plain["data"][0]) is dict
+        assert json.loads(json.dumps(plain)) == plain
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test del ejecutor de planes (varias operaciones en una sola llamada)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import facebook_api
+import manager as manager_module
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+from plans import parse_reference, resolve_path
+
+
+def test_references_resolve_paths_and_leave_literals():
+    """"$paso.ruta" se sustituye; un texto con "$" que no nombra un paso se queda igual"""
+    steps = {"last", "negative"}
+    assert parse_reference("$last.data.id", steps) == ("last", ["data", "id"])
+    assert parse_reference("$negative[*].id", steps) == ("negative", ["*", "id"])
+    assert parse_reference("$5 de descuento", steps) is None
+    assert parse_reference("$otro.id", steps) is None
+    assert resolve_path([{"id": "a"}, {"id": "b"}], ["*", "id"]) == ["a", "b"]
+    assert resolve_path({"data": [{"id": "x"}, {"id": "y"}]}, ["data", -1, "id"]) == "y"
+
+
+def _manager(monkeypatch, tmp_path, server):
+    monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+    monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+    monkeypatch.setattr(manager_module, "JOBS_FILE", str(tmp_path / "jobs.json"))
+    return manager_module.Manager()
+
+
+def test_plan_folds_dependent_writes_into_one_batch(monkeypatch, tmp_path):
+    """Publicar, comentar la publicación y contar fans cuesta una sola petición batch"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        m = _manager(monkeypatch, tmp_path, server)
+        comment_ids = server.data.edges[(server.data.edges[(PAGE_ID, "posts")][0], "comments")][:3]
+
+        server.reset_stats()
+        result = m.execute_plan([
+            {"id": "post", "op": "post_to_facebook", "args": {"message": "Nueva receta"}},
+            {"id": "edit", "op": "update_post", "args": {"post_id": "$post.id", "new_message": "Receta: $5 el plato"}},
+            {"id": "hide", "op": "bulk_hide_comments", "args": {"comment_ids": comment_ids}},
+            {"id": "fans", "op": "get_page_fan_count"},
+        ])
+        assert server.reset_stats().calls == 1
+
+        assert result["succeeded"] == 4 and result["graph_batches"] == 1
+        post_id = result["steps"]["post"]["result"]["id"]
+        assert server.data.objects[post_id]["message"] == "Receta: $5 el plato"
+        assert result["steps"]["fans"]["result"] == 15234
+        assert all(server.data.objects[c]["is_hidden"] in (True, "true") for c in comment_ids)
+
+
+def test_plan_runs_branches_and_skips_after_failures(monkeypatch, tmp_path):
+    """Las ramas independientes siguen aunque otra falle; lo que depende del fallo se omite"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        m = _manager(monkeypatch, tmp_path, server)
+        result = m.execute_plan([
+            {"id": "last", "op": "get_my_last_post", "args": {"profile": "id"}},
+            {"id": "comments", "op": "get_post_comments", "args": {"post_id": "$last.data.id"}},
+            {"id": "negative", "op": "filter_negative_comments", "args": {"comments": "$comments"}},
+            {"id": "count", "op": "get_number_of_comments", "args": {"post_id": "$last.data.id"}},
+            {"id": "broken", "op": "delete_post", "args": {"post_id": "no-existe"}},
+            {"id": "after", "op": "reply_to_comment", "args": {"post_id": "x", "comment_id": "y", "message": "z"},
+             "depends_on": ["broken"]},
+        ])
+
+        steps = result["steps"]
+        assert steps["count"]["result"] == len(steps["comments"]["result"]["data"])
+        assert isinstance(steps["negative"]["result"], list)
+        assert steps["broken"]["status"] == "failed"
+        assert steps["after"]["status"] == "skipped"
+        assert (result["succeeded"], result["failed"], result["skipped"]) == (4, 1, 1)
+
+        assert "cycle" in m.execute_plan([
+            {"id": "a", "op": "delete_post", "args": {"post_id": "$b.id"}},
+            {"id": "b", "op": "delete_post", "args": {"post_id": "$a.id"}},
+        ])["error"]
+        assert "unknown operation" in m.execute_plan([{"id": "a", "op": "execute_plan", "args": {"steps": []}}])["error"]
+
+
+def test_batched_deletes_leave_the_search_index(monkeypatch, tmp_path):
+    """Los borrados que van en una petición batch también quitan del índice la publicación y sus comentarios"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        m = _manager(monkeypatch, tmp_path, server)
+        post_id, other = server.data.edges[(PAGE_ID, "posts")][:2]
+        comments = server.data.edges[(other, "comments")][:3]
+        m.api.search.add(post_id, "post", "Receta de pizza", post_id=post_id)
+        m.api.search.add(f"{post_id}_1", "comment", "Qué buena pizza", post_id=post_id)
+        for cid in comments:
+            m.api.search.add(cid, "comment", "Pizza fría", post_id=other)
+
+        result = m.execute_plan([
+            {"id": "post", "op": "delete_post", "args": {"post_id": post_id}},
+            {"id": "one", "op": "delete_comment", "args": {"comment_id": comments[0]}},
+            {"id": "rest", "op": "bulk_delete_comments", "args": {"comment_ids": comments[1:]}},
+            {"id": "missing", "op": "delete_comment", "args": {"comment_id": "no-existe"}},
+        ])
+        assert result["graph_batches"] == 1 and result["succeeded"] == 3
+        assert len(m.api.search) == 0
+
+
+def test_text_that_looks_like_a_batch_reference_is_encoded(monkeypatch, tmp_path):
+    """Solo las referencias generadas por el plan van sin codificar; el texto del usuario no puede añadir campos"""
+    from plans import _BatchReference, _form
+
+    text = "{result=x} gratis&published=false"
+    assert _form({"message": text}) == "message=%7Bresult%3Dx%7D%20gratis%26published%3Dfalse"
+    assert _form({"message": _BatchReference("{result=post:$.id}")}) == "message={result=post:$.id}"
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        m = _manager(monkeypatch, tmp_path, server)
+        result = m.execute_plan([
+            {"id": "a", "op": "post_to_facebook", "args": {"message": text}},
+            {"id": "b", "op": "post_to_facebook", "args": {"message": "otra"}},
+        ])
+        assert result["graph_batches"] == 1
+        post = server.data.objects[result["steps"]["a"]["result"]["id"]]
+        assert post["message"] == text and "published" not in post
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test de las comprobaciones previas de medios (tipo real, tamaño y duración) antes de subir nada
+"""
+
+import sys
+import os
+import struct
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import requests
+
+import facebook_api
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+from preflight import MB, MediaInspector, check, inspect_file, sniff
+
+
+def _box(kind, payload):
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def _mp4(path, seconds):
+    """MP4 mínimo: ftyp + moov/mvhd con la duración indicada (escala de tiempo 1000)"""
+    mvhd = _box(b"mvhd", bytes(4) + struct.pack(">III", 0, 0, 1000) + struct.pack(">I", int(seconds * 1000)) + bytes(80))
+    with open(path, "wb") as f:
+        f.write(_box(b"ftyp", b"isom" + bytes(4) + b"isomiso2") + _box(b"mdat", bytes(1000)) + _box(b"moov", mvhd))
+    return str(path)
+
+
+def test_local_files_are_identified_by_their_bytes(tmp_path):
+    """El tipo sale de los bytes mágicos, no de la extensión, y la duración del vídeo de su cabecera"""
+    clip = _mp4(tmp_path / "portada.jpg", 90)
+    info = inspect_file(clip)
+    assert info["type"] == "video" and info["format"] == "mp4" and info["seconds"] == 90
+    assert check(info, "post") is None
+    assert "60 s" in check(info, "story")
+
+    assert sniff(b"\x89PNG\r\n\x1a\n....") == ("image", "png")
+    assert sniff(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == ("image", "webp")
+    assert sniff(b"hola") is None
+    big_photo = {"type": "image", "format": "jpeg", "bytes": 15 * MB, "checked": "magic"}
+    assert "limit is 10 MB" in check(big_photo, "post")
+    # Si se va a preprocesar, una foto local grande pasa: se comprueba ya reducida
+    assert check(big_photo, "post", shrink_photos=True) is None
+    # Salvo si el preprocesado no sabe leerla
+    assert "limit is 10 MB" in check({**big_photo, "format": "heic"}, "post", shrink_photos=True)
+
+
+def test_bad_media_are_rejected_before_any_upload(monkeypatch, tmp_path):
+    """Un lote con medios inválidos no sube nada; las respuestas HEAD se reutilizan"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        api = facebook_api.FacebookAPI()
+        photo = server.media_url("foto.jpg")
+        huge = server.media_url("pelicula.mp4", size=2048 * MB)
+        page = server.media_url("oferta", "text/html")
+
+        server.reset_stats()
+        result = api.post_media_to_facebook([photo, huge, page, server.media_url("borrada.png") + "x"], "Recetas")
+        stats = server.reset_stats()
+        assert stats.endpoints == {"HEAD /media": 4}
+        assert [r["media_url"] for r in result["rejected"]] == [huge, page, server.media_url("borrada.png") + "x"]
+        assert "nothing was uploaded" in result["error"]
+
+        # Un vídeo con extensión de foto se detecta antes de subirlo
+        clip = _mp4(tmp_path / "foto.jpg", 30)
+        assert "Expected image, got: video" in api.post_image_to_facebook(clip, "Foto")["error"]
+
+        result = api.post_media_to_facebook([photo, clip], "Recetas")
+        assert result["images_posted"] == 1 and result["videos_posted"] == 1
+        # foto.jpg ya estaba en caché: ninguna petición HEAD nueva
+        assert "HEAD /media" not in server.reset_stats().endpoints
+
+
+def test_urls_of_unknown_type_are_left_to_graph(monkeypatch):
+    """Una URL sin extensión cuyo HEAD falla (405 o sin conexión) pasa con un aviso y la decide Graph"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        api = facebook_api.FacebookAPI()
+        render = "https://cdn.example.com/render?id=123"
+
+        def head(url):
+            if "id=123" in url:
+                return 405, {}
+            raise requests.ConnectionError("sin conexión")
+
+        api.media = MediaInspector(head)
+        info = api.media.inspect([render])[render]
+        assert info["type"] == "file" and info["unknown"] and "405" in info["warning"]
+        assert check(info, "post") is None and check(info, "story") is None
+
+        server.reset_stats()
+        result = api.post_image_to_facebook(render, "Render")
+        assert "error" not in result and server.reset_stats().endpoints == {"POST /{id}.0/{id}/photos": 1}
+        offline = "https://cdn.example.com/render?id=456"
+        assert api.post_media_to_facebook([offline], "Recetas")["images_posted"] == 1
+        assert api.metrics.snapshot()["events"]["media_unchecked"] == 2
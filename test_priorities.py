@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test del planificador de peticiones a Graph: prioridades y reparto justo entre sesiones
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import facebook_api
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+from deadlines import Cancelled, Deadline, enforcing
+from priorities import BULK, INTERACTIVE, NORMAL, RequestScheduler, prioritized
+
+
+def _queue_up(scheduler, order, flows):
+    """Encola una petición por flujo, en este orden, y devuelve sus hilos"""
+    threads = []
+    for priority, session in flows:
+        def request(priority=priority, session=session):
+            with prioritized(priority, session), scheduler.slot():
+                order.append((priority, session))
+        queued = scheduler.queued
+        thread = threading.Thread(target=request)
+        thread.start()
+        while scheduler.queued == queued:
+            time.sleep(0.001)
+        threads.append(thread)
+    return threads
+
+
+def test_interactive_requests_skip_the_bulk_backlog_and_sessions_take_turns():
+    """Con el hueco ocupado, la lectura interactiva sale antes que las masivas, y dos sesiones masivas se alternan"""
+    waits = []
+    scheduler = RequestScheduler(1, on_wait=lambda priority, seconds, queued: waits.append((priority, queued)))
+    order = []
+    blocker = scheduler.slot()
+    blocker.__enter__()
+    threads = _queue_up(scheduler, order, [(BULK, "a")] * 4 + [(BULK, "b")] * 4 + [(NORMAL, "c"), (INTERACTIVE, "d")])
+    assert scheduler.queued == 10 and scheduler.in_flight == 1
+    blocker.__exit__(None, None, None)
+    for thread in threads:
+        thread.join()
+
+    assert order[0] == (INTERACTIVE, "d") and order[1] == (NORMAL, "c")
+    assert [session for _, session in order[2:]] == ["a", "b"] * 4
+    assert scheduler.in_flight == 0 and scheduler.queued == 0
+    assert waits[0] == (NORMAL, False) and sum(queued for _, queued in waits) == 10
+
+
+def test_a_queued_request_stops_with_its_deadline():
+    """Una petición en cola se abandona al cancelarse la llamada y no ocupa hueco"""
+    scheduler = RequestScheduler(1)
+    deadline = Deadline()
+    errors = []
+
+    def request():
+        with enforcing(deadline):
+            try:
+                with scheduler.slot():
+                    pass
+            except Cancelled as e:
+                errors.append(e.reason)
+
+    with scheduler.slot():
+        thread = threading.Thread(target=request)
+        thread.start()
+        while not scheduler.queued:
+            time.sleep(0.001)
+        deadline.cancel()
+        thread.join(2)
+        assert errors == ["Cancelled by the client"] and scheduler.queued == 0
+    assert scheduler.in_flight == 0
+    with scheduler.slot():
+        assert scheduler.in_flight == 1
+    with pytest.raises(ValueError):
+        with prioritized("urgent"):
+            pass
+
+
+def test_fan_count_is_not_stuck_behind_bulk_hides(monkeypatch):
+    """Con Graph saturado por ocultaciones masivas, el número de fans apenas espera; el retraso se mide por clase"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=40, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        api = facebook_api.FacebookAPI()
+        api.scheduler = RequestScheduler(2, on_wait=api.metrics.record_queue_wait)
+        comments = server.data.edges[(f"{PAGE_ID}_100000", "comments")][:24]
+
+        def hide(ids, session):
+            with prioritized(BULK, session):
+                for comment_id in ids:
+                    api.hide_comment(comment_id)
+
+        workers = [threading.Thread(target=hide, args=(comments[i::6], f"agent-{i % 2}")) for i in range(6)]
+        for worker in workers:
+            worker.start()
+        while api.scheduler.queued < 3:
+            time.sleep(0.005)
+        start = time.perf_counter()
+        with prioritized(INTERACTIVE, "agent-2"):
+            fans = api._request("GET", PAGE_ID, {"fields": "fan_count"})
+        fan_count_seconds = time.perf_counter() - start
+        for worker in workers:
+            worker.join()
+
+        assert fans["fan_count"] == 15234
+        # Espera como mucho a que termine una petición en curso, no a las que hay en cola
+        assert fan_count_seconds < 0.2
+        queues = api.metrics.snapshot()["graph_queue"]
+        assert queues[INTERACTIVE]["requests"] == 1 and queues[BULK]["requests"] == 24
+        assert queues[BULK]["queued"] > 0 and queues[BULK]["avg_wait_ms"] > queues[INTERACTIVE]["avg_wait_ms"]
+        assert 'facebook_mcp_graph_queue_seconds_count{priority="bulk"} 24' in api.metrics.prometheus()
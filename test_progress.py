@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test de las notificaciones de progreso y los resultados parciales de las operaciones masivas
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import anyio
+from mcp.shared.memory import create_connected_server_and_client_session
+
+import facebook_api
+import manager as manager_module
+import server as server_module
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+from jobs import JobQueue
+from progress import Progress
+
+
+def test_bulk_tool_sends_a_notification_per_item(monkeypatch, tmp_path):
+    """Cada comentario borrado llega al cliente como notificación de progreso antes del resultado"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        monkeypatch.setattr(manager_module, "JOBS_FILE", str(tmp_path / "jobs.json"))
+        monkeypatch.setattr(server_module, "manager", manager_module.Manager())
+        post_id = server.data.edges[(PAGE_ID, "posts")][0]
+        comment_ids = server.data.edges[(post_id, "comments")][:3]
+        updates = []
+
+        async def on_progress(done, total, message):
+            updates.append((done, total, message))
+
+        async def main():
+            async with create_connected_server_and_client_session(server_module.mcp) as session:
+                return await session.call_tool("bulk_delete_comments", {"comment_ids": comment_ids},
+                                               progress_callback=on_progress)
+
+        result = anyio.run(main)
+        assert not result.isError
+        assert [(done, total) for done, total, _ in updates] == [(1, 3), (2, 3), (3, 3)]
+        assert [message for _, _, message in updates] == [f"Comment {cid}: ok" for cid in comment_ids]
+
+
+def test_job_keeps_the_items_it_finished(tmp_path):
+    """Un trabajo que falla a mitad conserva lo que ya publicó, y el progreso se ve mientras corre"""
+    seen = []
+
+    def runner(kind, args):
+        progress = Progress(len(args["media_urls"]))
+        for url in args["media_urls"][:2]:
+            progress.step(url, {"id": f"post_{url}"}, {"media_url": url, "response": {"id": f"post_{url}"}})
+            seen.append(queue.list_jobs()[0]["progress"])
+        raise ConnectionError("upload cortado")
+
+    queue = JobQueue(runner, str(tmp_path / "jobs.json"), workers=1)
+    job = queue.submit("post_media_to_facebook", {"media_urls": ["a.jpg", "b.jpg", "c.mp4"], "content_prompt": "x"})
+    status = queue.wait(job["id"], timeout=5)
+
+    assert seen[-1] == {"done": 2, "total": 3, "message": "b.jpg: ok (post_b.jpg)"}
+    assert status["status"] == "failed"
+    assert [item["media_url"] for item in status["partial_results"]] == ["a.jpg", "b.jpg"]
+    # Lo parcial sobrevive a un reinicio del servidor
+    restarted = JobQueue(runner, str(tmp_path / "jobs.json"), workers=1)
+    assert len(restarted.status(job["id"])["partial_results"]) == 2
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test del calendario de publicaciones programadas y la programación masiva
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import facebook_api
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+from scheduling import ScheduleCalendar
+
+
+def test_calendar_rejects_collisions_and_invalid_entries():
+    """Se rechazan choques con el calendario, dentro del lote y fuera de la ventana de Graph"""
+    now = 1_800_000_000
+    calendar = ScheduleCalendar(ttl=300)
+    calendar.load([{"id": "p1", "message": "Ya programada", "scheduled_publish_time": now + 7200}])
+
+    results = calendar.validate([
+        {"message": "Choca con p1", "publish_time": now + 7200 + 600},
+        {"message": "Bien", "publish_time": now + 4 * 3600},
+        {"message": "Choca con la anterior", "publish_time": now + 4 * 3600 + 60},
+        {"message": "Demasiado pronto", "publish_time": now + 60},
+        {"message": "", "publish_time": now + 10 * 3600},
+        {"message": "Fecha ISO", "publish_time": "2027-01-16T08:00:00Z"},
+    ], min_gap=1800, now=now)
+
+    assert [r["status"] for r in results] == ["ok" if i in (1, 5) else "rejected" for i in range(6)]
+    assert "p1" in results[0]["errors"][0]
+    assert results[5]["publish_time"] == now + 86400
+    assert [p["id"] for p in calendar.between(now, now + 86400)] == ["p1"]
+
+
+def test_bulk_schedule_uses_batched_requests(monkeypatch):
+    """120 publicaciones largas se envían en 3 peticiones batch (en el cuerpo, no en la URL) y quedan en el calendario"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        api = facebook_api.FacebookAPI()
+        start = int(time.time()) // 3600 * 3600 + 2 * 86400
+        # ~2 KB por mensaje: 50 en la URL superarían cualquier límite de longitud
+        entries = [{"message": f"Post {i}: " + "receta de pizza casera " * 90, "publish_time": start + i * 3600}
+                   for i in range(120)]
+
+        server.reset_stats()
+        result = api.schedule_posts_bulk(entries)
+        stats = server.reset_stats()
+
+        assert result["scheduled"] == 120 and result["rejected"] == 0, result
+        # 1 lectura del calendario + 3 lotes de 50
+        assert stats.calls == 4
+
+        again = api.schedule_posts_bulk(entries[:1], dry_run=True)
+        assert again["rejected"] == 1
+
+        listed = api.list_scheduled_posts(start, start + 23 * 3600)
+        assert listed["count"] == 24
+        assert api.list_scheduled_posts(start, start + 23 * 3600, refresh=True)["count"] == 24
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test del índice local de búsqueda de comentarios y de su sincronización incremental
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import facebook_api
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+from search import SearchIndex, tokenize
+
+
+def _index():
+    index = SearchIndex()
+    index.add("c1", "comment", "¿Dónde está mi PEDIDO #A-1234? Llevo una semana esperando", post_id="p1",
+              author_id="u1", author_name="Ana", created_time=1_750_000_000)
+    index.add("c2", "comment", "La receta de la pizza margarita es genial", post_id="p1",
+              author_id="u2", author_name="Luis", created_time=1_750_000_600)
+    index.add("c3", "comment", "Pizza, pizza y más pizza", post_id="p2", author_id="u1", author_name="Ana",
+              created_time=1_750_001_200)
+    index.add("p1", "post", "Nueva receta: pizza casera", post_id="p1", created_time=1_749_999_000)
+    return index
+
+
+def test_index_matches_accents_prefixes_and_order_numbers():
+    """Sin distinguir tildes ni mayúsculas, por prefijo y por número de pedido, con filtros"""
+    index = _index()
+    assert tokenize("Pedido #A-1234") == ["pedido", "a", "1234"]
+
+    assert [r["id"] for r in index.search("donde esta mi pedido")["results"]] == ["c1"]
+    found = index.search("1234")
+    assert found["total"] == 1 and found["results"][0]["author"] == {"id": "u1", "name": "Ana"}
+    # Todas las palabras deben aparecer; puntúa más la más repetida y, a igualdad, el texto más corto
+    assert [r["id"] for r in index.search("pizza")["results"]] == ["c3", "p1", "c2"]
+    assert index.search("pizza pedido")["total"] == 0
+    # "margari" no está en el índice: se busca como prefijo
+    assert index.search("margari")["terms"] == {"margari": ["margarita"]}
+    assert [r["id"] for r in index.search("rec*")["results"]] == ["p1", "c2"]
+
+    assert [r["id"] for r in index.search("pizza", kind="comment", author_id="u1")["results"]] == ["c3"]
+    assert [r["id"] for r in index.search("pizza", post_id="p1", kind="comment")["results"]] == ["c2"]
+    assert [r["id"] for r in index.search("pizza", since=1_750_000_000, until=1_750_001_000)["results"]] == ["c2"]
+
+    # Editar reemplaza el documento; borrar lo quita de los resultados
+    assert index.add("c3", "comment", "Ya no hablo de comida", post_id="p2") and not index.add(
+        "c3", "comment", "Ya no hablo de comida", post_id="p2")
+    assert index.remove("c2") and not index.remove("c2")
+    assert [r["id"] for r in index.search("pizza")["results"]] == ["p1"]
+    assert len(index) == 3 and index.ids("comment") == {"c1", "c3"}
+
+
+def test_search_syncs_incrementally_and_serves_from_the_index(monkeypatch):
+    """La primera búsqueda lee los comentarios en bloques de 50; después solo relee las publicaciones que cambian"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        monkeypatch.setattr(facebook_api, "SEARCH_SYNC_DAYS", 10 * 365)
+        api = facebook_api.FacebookAPI()
+        posts = server.data.edges[(PAGE_ID, "posts")]
+
+        server.reset_stats()
+        found = api.search_comments("pizza receta")
+        # Listado de publicaciones (100 por página) más una lectura multi-ID por cada 50
+        assert server.reset_stats().calls == -(-len(posts) // 100) + -(-len(posts) // 50)
+        assert found["sync"]["posts_refreshed"] == len(posts) and found["total"] > 0
+        assert all(r["kind"] == "comment" for r in found["results"])
+        assert found["results"] == sorted(found["results"], key=lambda r: -r["score"])
+
+        # Dentro del TTL no hay ninguna llamada
+        again = api.search_comments("pizza receta", limit=5)
+        assert server.reset_stats().calls == 0 and "sync" not in again and len(again["results"]) == 5
+
+        # Un comentario nuevo en una publicación: solo se relee esa
+        server.data.create("comment", posts[3], "comments", {
+            "message": "¿Hacéis envíos a Cáceres?", "from": {"id": "7777", "name": "Marta"},
+            "is_hidden": False, "like_count": 0, "comment_count": 0,
+        })
+        sync = api.sync_search_index()
+        assert sync["posts_refreshed"] == 1 and sync["comments_added"] == 1
+        assert server.reset_stats().calls == -(-len(posts) // 100) + 1
+        new = api.search_comments("caceres envios")["results"]
+        assert len(new) == 1 and new[0]["post_id"] == posts[3] and new[0]["author"]["name"] == "Marta"
+
+        # Borrar un comentario lo quita del índice sin esperar a la sincronización
+        assert "error" not in api.delete_comment(new[0]["id"])
+        assert api.search_comments("caceres envios")["total"] == 0
+
+        # Las publicaciones también se pueden buscar
+        posts_found = api.search_comments("pizza", kind="post", limit=100)["results"]
+        assert posts_found and all(r["kind"] == "post" and r["id"] == r["post_id"] for r in posts_found)
+        assert "error" in api.search_comments("pizza", kind="likes")
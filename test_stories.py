@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Test de get_my_stories: recurso a fotos y vídeos recientes cuando el endpoint de historias no está disponible
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import facebook_api
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+
+
+def _calls(stats, edge):
+    return sum(n for endpoint, n in stats.endpoints.items() if endpoint.startswith("GET") and endpoint.endswith(f"/{edge}"))
+
+
+def test_stories_fall_back_to_recent_media_newest_first(monkeypatch):
+    """Sin historias, se leen fotos y vídeos a la vez (una página de cada) y se mezclan de más reciente a más antiguo"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        api = facebook_api.FacebookAPI()
+        media = [server.data.objects[i] for kind in ("photos", "videos") for i in server.data.edges[(PAGE_ID, kind)]]
+        newest = sorted(media, key=lambda m: m["created_time"], reverse=True)
+
+        server.reset_stats()
+        result = api.get_my_stories()
+        stats = server.reset_stats()
+        # Sin límite: las 25 más recientes, con una sola página por cada tipo
+        assert result["source"] == "fallback_media_endpoint" and result["limit_applied"] == 25
+        assert [m["id"] for m in result["data"]] == [m["id"] for m in newest[:25]]
+        assert (_calls(stats, "stories"), _calls(stats, "photos"), _calls(stats, "videos")) == (1, 1, 1)
+
+        # El endpoint de historias ya se sabe que falla: no se vuelve a pedir
+        few = api.get_my_stories(5)
+        stats = server.reset_stats()
+        assert [m["id"] for m in few["data"]] == [m["id"] for m in newest[:5]] and few["total_count"] == 5
+        assert (_calls(stats, "stories"), _calls(stats, "photos"), _calls(stats, "videos")) == (0, 1, 1)
+
+        # Un límite mayor que la biblioteca la devuelve entera, sin pasarse
+        everything = api.get_my_stories(500)
+        assert [m["id"] for m in everything["data"]] == [m["id"] for m in newest]
+        assert {m["media_type"] for m in everything["data"]} == {"photo", "video"}
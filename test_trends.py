@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test del historial de métricas por publicación y del cálculo de publicaciones en tendencia
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import facebook_api
+import manager as manager_module
+from benchmarks.fake_graph import PAGE_ID, FakeGraphConfig, FakeGraphServer
+from trends import BUCKET, RAW_WINDOW, RETENTION, EngagementHistory, PostSeries, parse_window
+
+
+def test_series_downsamples_old_samples_and_interpolates():
+    """Lo reciente se guarda tal cual, lo antiguo a una muestra por hora y lo caducado se borra"""
+    series = PostSeries()
+    start = 1_700_000_000 // BUCKET * BUCKET
+    for k in range(0, 8 * 86400 // 300):
+        series.add(start + k * 300, (k, 2 * k, 0))
+    end = series.last_time
+    assert all(t >= end - RAW_WINDOW for t in series.times)
+    assert len(series.times) == RAW_WINDOW // 300 + 1
+    # Una muestra (la última) por hora en el nivel antiguo, y nada más viejo que la retención
+    assert len({t // BUCKET for t in series.old_times}) == len(series.old_times)
+    assert series.first_time >= end - RETENTION
+    assert len(series) < 7 * 24 + RAW_WINDOW // 300 + 2
+    # 16 bytes por muestra
+    assert series.times.itemsize + 3 * series.values.itemsize == 16
+
+    k = (end - 3 * 86400 - start) // 300
+    assert series.at(end - 3 * 86400) == [k, 2 * k, 0]
+    # A mitad de camino entre las dos últimas muestras
+    last = series.last()[0]
+    assert series.at(end - 150) == [last - 0.5, 2 * last - 1, 0]
+    assert parse_window("90m") == 5400 and parse_window("1d") == 86400 and parse_window(30) == 30
+
+
+def test_trending_ranks_accelerating_posts_without_graph_calls(monkeypatch, tmp_path):
+    """Una muestra cuesta una lectura multi-ID por cada 50 publicaciones; la tendencia no llama a Graph"""
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        monkeypatch.setattr(manager_module, "JOBS_FILE", str(tmp_path / "jobs.json"))
+        manager = manager_module.Manager()
+        assert "error" in manager.get_trending_posts("1h")
+
+        posts = server.data.edges[(PAGE_ID, "posts")]
+        steady, viral = server.data.objects[posts[0]], server.data.objects[posts[1]]
+        server.reset_stats()
+        for k in range(6):
+            # Muestras cada 10 minutos, con la hora fijada por el test
+            sample = manager.api.sample_engagement(10 * 365 * 86400)
+            assert "error" not in sample and len(sample["posts"]) == len(posts)
+            manager.trends.history.record(1_750_000_000 + k * 600, sample["posts"])
+            steady["reactions"] += 30
+            viral["reactions"] += 10 * k * k
+        # Listado de publicaciones más una lectura multi-ID por cada 50
+        assert server.reset_stats().calls == 6 * (1 + -(-len(posts) // 50))
+
+        report = manager.get_trending_posts("1h", limit=3)
+        assert server.reset_stats().calls == 0
+        assert report["posts_tracked"] == len(posts) and report["samples"] == 6
+        first, second = report["posts"][:2]
+        assert (first["id"], second["id"]) == (viral["id"], steady["id"])
+        assert second["velocity"] == 180.0 and second["acceleration"] == 0
+        assert first["velocity_by_metric"]["reactions"] == first["velocity"]
+
+        by_acceleration = manager.get_trending_posts("1h", sort="acceleration")["posts"]
+        assert by_acceleration[0]["id"] == viral["id"] and by_acceleration[0]["acceleration"] > 0
+        assert "error" in manager.get_trending_posts("ayer")
+
+
+def test_history_forgets_posts_without_recent_samples():
+    """Las publicaciones que dejan de muestrearse desaparecen tras la retención"""
+    history = EngagementHistory()
+    history.record(1000, {"a": {"reactions": 1}, "b": {"reactions": 1}})
+    history.record(1000 + RETENTION + 1, {"a": {"reactions": 5}})
+    assert history.trending(3600)["posts_tracked"] == 1
+
+
+def test_sampling_starts_with_the_server(monkeypatch, tmp_path):
+    """Con el intervalo configurado, el muestreo empieza al arrancar el servidor y no con la primera llamada"""
+    import server as server_module
+    from lazy import Deferred
+
+    with FakeGraphServer(FakeGraphConfig(latency_ms=0, jitter_ms=0)) as server:
+        monkeypatch.setattr(facebook_api, "GRAPH_API_BASE_URL", server.base_url)
+        monkeypatch.setattr(facebook_api, "PAGE_ID", PAGE_ID)
+        monkeypatch.setattr(manager_module, "JOBS_FILE", str(tmp_path / "jobs.json"))
+        monkeypatch.setattr(server_module, "TRENDS_INTERVAL", 3600)
+        monkeypatch.setattr(manager_module, "TRENDS_INTERVAL", 3600)
+        deferred = Deferred(manager_module.Manager)
+        monkeypatch.setattr(server_module, "manager", deferred)
+
+        server_module._start_background_work()
+        trends = deferred.trends
+        try:
+            assert trends.running
+            for _ in range(100):
+                if trends.history.samples:
+                    break
+                time.sleep(0.02)
+            assert trends.history.samples == 1 and trends.last_error is None
+        finally:
+            trends.stop()
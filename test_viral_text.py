@@ -5,9 +5,11 @@ Test del generador de texto viral
 
 import sys
 import os
+import time
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from facebook_api import FacebookAPI
+from captions import CaptionEngine, load_caption_data
 
 def test_viral_text_generation():
     """Prueba el generador de texto viral"""
@@ -32,5 +34,75 @@ def test_viral_text_generation():
         print("-" * 60)
         print()
 
+def test_seeded_captions_are_reproducible():
+    """Con la misma semilla se obtienen los mismos textos"""
+    data = load_caption_data()
+    first = CaptionEngine(data, seed=42)
+    second = CaptionEngine(data, seed=42)
+    
+    prompt = "Tutorial de cocina para hacer pizza casera"
+    assert [first.generate(prompt) for _ in range(20)] == [second.generate(prompt) for _ in range(20)]
+    assert first.generate_batch(prompt, 10, seed=7) == second.generate_batch(prompt, 10, seed=7)
+
+
+def test_generate_captions_batch_has_no_repeats():
+    """Un lote de N variantes no repite ningún texto"""
+    api = FacebookAPI()
+    
+    captions = api.generate_captions("Rutina de ejercicios para principiantes", 500)
+    assert len(captions) == 500
+    assert len(set(captions)) == 500
+    assert all("Rutina de ejercicios para principiantes" in c or "RUTINA DE EJERCICIOS PARA PRINCIPIANTES" in c for c in captions)
+
+
+def test_caption_generation_benchmark():
+    """Micro-benchmark del generador de texto viral"""
+    engine = CaptionEngine(load_caption_data(), seed=0)
+    prompt = "Reseña de producto tecnológico innovador"
+    iterations = 20000
+    
+    start = time.perf_counter()
+    for _ in range(iterations):
+        engine.generate(prompt)
+    single = (time.perf_counter() - start) / iterations
+    
+    start = time.perf_counter()
+    batch = engine.generate_batch(prompt, iterations)
+    batched = (time.perf_counter() - start) / iterations
+    
+    print(f"\ngenerate():       {single * 1e6:.2f} µs/texto")
+    print(f"generate_batch(): {batched * 1e6:.2f} µs/texto ({len(set(batch))} distintos)")
+    assert len(set(batch)) == iterations
+
+
+def test_batch_takes_turns_between_templates():
+    """Un lote pequeño usa varias plantillas aunque una tenga muchas más combinaciones"""
+    data = {
+        "pools": {"big": [f"frase {i}" for i in range(1000)], "small": ["uno", "dos"]},
+        "templates": ["{prompt}: {big}", "{small} — {prompt}", "{prompt_upper} {year}"],
+    }
+    engine = CaptionEngine(data, seed=3)
+    batch = engine.generate_batch("Receta", 6)
+    assert len(set(batch)) == 6
+    assert sum(":" in c for c in batch) == 3 and sum("—" in c for c in batch) == 2
+    assert sum(c.startswith("RECETA") for c in batch) == 1
+    # Cuando las plantillas pequeñas se agotan, la grande completa el lote
+    assert len(set(engine.generate_batch("Receta", 50))) == 50
+    assert len(engine.generate_batch("Receta", 5000)) == engine.total_variants == 1003
+
+
+
+def test_empty_or_negative_batch_returns_nothing(monkeypatch, tmp_path):
+    """n=0 o negativo devuelve un lote vacío al momento; la herramienta lo rechaza con un error"""
+    import manager as manager_module
+
+    engine = CaptionEngine(load_caption_data(), seed=1)
+    assert engine.generate_batch("Receta", 0) == [] and engine.generate_batch("Receta", -1) == []
+    monkeypatch.setattr(manager_module, "JOBS_FILE", str(tmp_path / "jobs.json"))
+    manager = manager_module.Manager()
+    assert "error" in manager.generate_captions("Receta", 0) and "error" in manager.generate_captions("Receta", -5)
+    assert manager.generate_captions("Receta", 2)["count"] == 2
+
 if __name__ == "__main__":
-    test_viral_text_generation()
\ No newline at end of file
+    test_viral_text_generation()
+    test_caption_generation_benchmark()
@@ -0,0 +1,264 @@
+import re
+import threading
+import time
+from array import array
+from typing import Any, Callable
+
+# Counters sampled per post, stored in this order
+METRICS = ("reactions", "comments", "shares")
+
+# Samples younger than this are kept as taken; older ones are downsampled to
+# one per BUCKET (the last of each bucket: counters only grow)
+RAW_WINDOW = 6 * 3600
+BUCKET = 3600
+
+# Samples older than this are dropped, and so are posts with nothing newer
+RETENTION = 7 * 86400
+
+_WINDOW = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*$")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "": 1}
+_WIDTH = len(METRICS)
+
+
+def parse_window(window: str | int | float) -> float:
+    """Seconds in a window given as seconds or as "30m", "2h", "1d"."""
+    if isinstance(window, (int, float)):
+        seconds = float(window)
+    else:
+        match = _WINDOW.match(window)
+        if not match:
+            raise ValueError(f"Invalid window: {window!r} (use e.g. '30m', '2h' or '1d')")
+        seconds = float(match.group(1)) * _UNITS[match.group(2)]
+    if seconds <= 0:
+        raise ValueError("window must be positive")
+    return seconds
+
+
+class PostSeries:
+    """Counter history of one post in two tiers of flat unsigned arrays.
+
+    Each sample is a timestamp in `times` and len(METRICS) counters in
+    `values`, 16 bytes in all. Recent samples are kept as taken; older ones
+    move to the coarse tier at one sample per bucket.
+    """
+
+    __slots__ = ("times", "values", "old_times", "old_values")
+
+    def __init__(self):
+        self.times = array("I")
+        self.values = array("I")
+        self.old_times = array("I")
+        self.old_values = array("I")
+
+    def __len__(self) -> int:
+        return len(self.old_times) + len(self.times)
+
+    def add(self, timestamp: int, counts: tuple[int, ...], raw_window: int = RAW_WINDOW, bucket: int = BUCKET,
+            retention: int = RETENTION) -> None:
+        """Append a sample, then downsample and drop what got old."""
+        if self.times and timestamp <= self.times[-1]:
+            return
+        self.times.append(timestamp)
+        self.values.extend(counts)
+        moved = 0
+        while moved < len(self.times) - 1 and self.times[moved] < timestamp - raw_window:
+            t = self.times[moved]
+            if self.old_times and self.old_times[-1] // bucket == t // bucket:
+                self.old_times[-1] = t
+                self.old_values[-_WIDTH:] = self.values[moved * _WIDTH:(moved + 1) * _WIDTH]
+            else:
+                self.old_times.append(t)
+                self.old_values.extend(self.values[moved * _WIDTH:(moved + 1) * _WIDTH])
+            moved += 1
+        if moved:
+            del self.times[:moved]
+            del self.values[:moved * _WIDTH]
+        expired = 0
+        while expired < len(self.old_times) and self.old_times[expired] < timestamp - retention:
+            expired += 1
+        if expired:
+            del self.old_times[:expired]
+            del self.old_values[:expired * _WIDTH]
+
+    def _time(self, i: int) -> int:
+        n = len(self.old_times)
+        return self.old_times[i] if i < n else self.times[i - n]
+
+    def _counts(self, i: int) -> array:
+        n = len(self.old_times)
+        if i < n:
+            return self.old_values[i * _WIDTH:(i + 1) * _WIDTH]
+        return self.values[(i - n) * _WIDTH:(i - n + 1) * _WIDTH]
+
+    @property
+    def first_time(self) -> int:
+        return self._time(0)
+
+    @property
+    def last_time(self) -> int:
+        return self.times[-1]
+
+    def last(self) -> tuple[int, ...]:
+        return tuple(self.values[-_WIDTH:])
+
+    def at(self, timestamp: float) -> list[float]:
+        """Counters at `timestamp`, linearly interpolated between the samples around it."""
+        lo, hi = 0, len(self) - 1
+        if timestamp <= self._time(lo):
+            return list(self._counts(lo))
+        if timestamp >= self._time(hi):
+            return list(self._counts(hi))
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if self._time(mid) <= timestamp:
+                lo = mid
+            else:
+                hi = mid
+        t0, t1 = self._time(lo), self._time(hi)
+        share = (timestamp - t0) / (t1 - t0)
+        return [a + (b - a) * share for a, b in zip(self._counts(lo), self._counts(hi))]
+
+
+class EngagementHistory:
+    """Engagement counter series of recent posts, and their velocity.
+
+    Fed by `record` with one sample of many posts at a time (see
+    Snapshotter); queries only read the stored series, never Graph.
+    """
+
+    def __init__(self, raw_window: int = RAW_WINDOW, bucket: int = BUCKET, retention: int = RETENTION):
+        self.raw_window = raw_window
+        self.bucket = bucket
+        self.retention = retention
+        self._series: dict[str, PostSeries] = {}
+        # Message, created_time and permalink of each post, for display
+        self._posts: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.samples = 0
+        self.last_sample: int | None = None
+
+    def record(self, timestamp: int, posts: dict[str, dict[str, Any]]) -> None:
+        """Store one sample: the counters of each post (see METRICS) at `timestamp`."""
+        with self._lock:
+            for post_id, post in posts.items():
+                series = self._series.get(post_id)
+                if series is None:
+                    series = self._series[post_id] = PostSeries()
+                series.add(timestamp, tuple(post.get(metric, 0) for metric in METRICS),
+                           self.raw_window, self.bucket, self.retention)
+                self._posts[post_id] = {k: post[k] for k in ("message", "created_time", "permalink_url") if k in post}
+            for post_id in [p for p, s in self._series.items() if s.last_time < timestamp - self.retention]:
+                del self._series[post_id]
+                del self._posts[post_id]
+            self.samples += 1
+            self.last_sample = timestamp
+
+    def trending(self, window: float, limit: int = 10, sort: str = "velocity") -> dict[str, Any]:
+        """Posts ranked by how fast their engagement grew over the last `window` seconds.
+
+        Velocity is the engagement (reactions + comments + shares) gained per
+        hour over the window, up to each post's last sample. Acceleration is
+        the change in that rate between the window's two halves, per hour.
+        Posts sampled for less than the window are measured over what there is
+        ("span_seconds"); posts with a single sample are left out.
+
+        Args:
+            window: Seconds to look back
+            limit: Posts returned
+            sort: "velocity" or "acceleration"
+
+        Returns:
+            dict: Ranked "posts" with their current counters, velocity (total and
+            per metric) and acceleration, plus how many posts were considered
+        """
+        if sort not in ("velocity", "acceleration"):
+            raise ValueError("sort must be 'velocity' or 'acceleration'")
+        rows, warming_up = [], 0
+        with self._lock:
+            for post_id, series in self._series.items():
+                end = series.last_time
+                start = max(series.first_time, end - window)
+                if len(series) < 2 or end <= start:
+                    warming_up += 1
+                    continue
+                hours = (end - start) / 3600
+                before, middle, now = series.at(start), series.at(start + (end - start) / 2), series.at(end)
+                gained = [b - a for a, b in zip(before, now)]
+                recent_rate = (sum(now) - sum(middle)) / (hours / 2)
+                earlier_rate = (sum(middle) - sum(before)) / (hours / 2)
+                rows.append({
+                    "id": post_id,
+                    **self._posts.get(post_id, {}),
+                    **dict(zip(METRICS, series.last())),
+                    "engagement": sum(series.last()),
+                    "gained": round(sum(gained)),
+                    "velocity": round(sum(gained) / hours, 2),
+                    "velocity_by_metric": {m: round(g / hours, 2) for m, g in zip(METRICS, gained)},
+                    "acceleration": round((recent_rate - earlier_rate) / (hours / 2), 2),
+                    "span_seconds": end - start,
+                    "last_sample": end,
+                })
+            samples, last_sample = self.samples, self.last_sample
+        rows.sort(key=lambda r: r[sort], reverse=True)
+        return {
+            "window_seconds": window,
+            "sort": sort,
+            "posts": rows[:limit],
+            "posts_tracked": len(rows) + warming_up,
+            "posts_warming_up": warming_up,
+            "samples": samples,
+            "last_sample": last_sample,
+        }
+
+
+class Snapshotter:
+    """Samples engagement counters into an EngagementHistory in the background.
+
+    `sample()` returns {"time": unix seconds, "posts": {post_id: counters and
+    post info}}; a sample that fails is skipped and its error kept.
+
+    Args:
+        sample: Reads the current counters of the posts to track
+        history: Where samples are stored
+        interval: Seconds between samples
+    """
+
+    def __init__(self, sample: Callable[[], dict[str, Any]], history: EngagementHistory, interval: float):
+        self._sample = sample
+        self.history = history
+        self.interval = interval
+        self.last_error: str | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="engagement-snapshots", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and not self._stop.is_set()
+
+    def sample_once(self) -> None:
+        try:
+            snapshot = self._sample()
+        except Exception as e:  # one failed sample (network, rate limit) must not end sampling
+            self.last_error = f"{type(e).__name__}: {e}"
+            return
+        if "error" in snapshot:
+            self.last_error = str(snapshot["error"])
+            if not snapshot.get("posts"):
+                return
+        else:
+            self.last_error = None
+        self.history.record(snapshot["time"], snapshot["posts"])
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.sample_once()
+            self._stop.wait(max(self.interval - (time.monotonic() - started), 0))